@@ -12,6 +12,7 @@ This module maintains global state for inventory, secrets handlers, and other
 objects that need to be shared across Kapitan's execution.
 """
 
+import threading
 from argparse import Namespace
 from typing import Any
 
@@ -44,6 +45,10 @@ kapitan_input_kadet = None
 # bumps the same shared CacheMetrics across processes.
 input_cache_metrics: dict | None = None
 
+# Guards the objects above that are created lazily on first use, so targets
+# compiled on threads (compile --executor threads) create them only once.
+lock = threading.RLock()
+
 
 def reset_cache():
     global \
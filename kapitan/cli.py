@@ -18,17 +18,23 @@ import sys
 import yaml
 
 from kapitan import cached, defaults, setup_logging
+from kapitan.client import DEFAULT_SOCKET
+from kapitan.errors import KapitanError
 from kapitan.initialiser import initialise_skeleton
 from kapitan.inputs.jsonnet import select_jsonnet_runtime
 from kapitan.inventory import AVAILABLE_BACKENDS, InventoryBackends
 from kapitan.lint import start_lint
+from kapitan.outputs import write_changed_paths
 from kapitan.profiling import add_profiling_arguments, cpu_profile, memory_profile
 from kapitan.refs.base import RefController, Revealer
 from kapitan.refs.cmd_parser import handle_refs_command
 from kapitan.resources import generate_inventory, resource_callbacks, search_imports
+from kapitan.server import serve
+from kapitan.sharding import merge_shards, parse_shard
 from kapitan.targets import compile_targets
 from kapitan.utils import check_version, from_dot_kapitan, searchvar
 from kapitan.version import DESCRIPTION, PROJECT_NAME, VERSION
+from kapitan.watch import watch_compile
 
 
 logger = logging.getLogger(__name__)
@@ -71,6 +77,22 @@ def trigger_compile(args):
     if not args.ignore_version_check:
         check_version()
 
+    if args.merge_shards:
+        if args.shard is not None:
+            logger.error("--merge-shards and --shard can't be used together")
+            sys.exit(1)
+        try:
+            diff = merge_shards(args.merge_shards, args.output_path)
+        except KapitanError as e:
+            logger.error(e)
+            sys.exit(1)
+        if args.changed_paths_output:
+            write_changed_paths(
+                args.changed_paths_output,
+                [os.path.join("compiled", path) for path in diff.modified],
+            )
+        return
+
     if getattr(args, "yaml_use_rapidyaml", False):
         from kapitan.yaml_ryml import HAS_RYML
 
@@ -81,10 +103,17 @@ def trigger_compile(args):
                 "Install with `uv pip install kapitan[rapidyaml]`."
             )
 
+    if (args.check or args.diff) and (args.watch or args.shard is not None):
+        logger.error("--check and --diff can't be used with --watch or --shard")
+        sys.exit(1)
+
     ref_controller = RefController(args.refs_path, embed_refs=args.embed_refs)
     # cache controller for use in reveal_maybe jinja2 filter
     cached.ref_controller_obj = ref_controller
     cached.revealer_obj = Revealer(ref_controller)
+    if args.watch:
+        watch_compile(args.inventory_path, search_paths, ref_controller, args)
+        return
     try:
         compile_targets(
             inventory_path=args.inventory_path,
@@ -97,6 +126,14 @@ def trigger_compile(args):
         sys.exit(1)
 
 
+def trigger_serve(args):
+    try:
+        serve(build_parser(), args)
+    except KapitanError as e:
+        logger.error(e)
+        sys.exit(1)
+
+
 def build_parser():
     parser = argparse.ArgumentParser(prog=PROJECT_NAME, description=DESCRIPTION)
     parser.add_argument("--version", action="version", version=VERSION)
@@ -154,6 +191,17 @@ def build_parser():
         ),
     )
 
+    inventory_backend_parser.add_argument(
+        "--inventory-cache",
+        action="store_true",
+        default=from_dot_kapitan("inventory_backend", "inventory-cache", False),
+        help=(
+            "Store the rendered inventory in $XDG_CACHE_HOME/kapitan/inventory and "
+            "load it instead of rendering again while the inventory files, backend "
+            "and flags are unchanged (default: off)"
+        ),
+    )
+
     eval_parser = subparser.add_parser(
         "eval", aliases=["e"], help="evaluate jsonnet file"
     )
@@ -269,7 +317,42 @@ def build_parser():
         type=int,
         default=from_dot_kapitan("compile", "parallelism", None),
         metavar="INT",
-        help="Number of concurrent compile processes, default is min(len(targets), available CPU count)",
+        help="Number of concurrent compile processes, default is min(len(targets), "
+        "available CPU count), lowered to fit the memory limit based on the memory "
+        "used by previous compiles of the targets",
+    )
+    compile_parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=from_dot_kapitan("compile", "max-tasks-per-worker", None),
+        metavar="INT",
+        help="replace a compile process with a fresh one after it compiled INT "
+        "tasks, returning the memory it used",
+    )
+    compile_parser.add_argument(
+        "--max-worker-memory",
+        type=int,
+        default=from_dot_kapitan("compile", "max-worker-memory", None),
+        metavar="MB",
+        help="replace the compile processes with fresh ones once a task leaves "
+        "one of them using more than MB megabytes of memory (RSS)",
+    )
+    compile_parser.add_argument(
+        "--max-tool-processes",
+        type=int,
+        default=from_dot_kapitan("compile", "max-tool-processes", None),
+        metavar="INT",
+        help="Number of external tools (helm, kustomize, cue, external inputs) "
+        "running at once across all compile processes, default is the available "
+        "CPU count",
+    )
+    compile_parser.add_argument(
+        "--executor",
+        choices=["processes", "threads"],
+        default=from_dot_kapitan("compile", "executor", None),
+        help="compile targets on a pool of processes or on threads of the "
+        "kapitan process, default is threads on free-threaded Python builds "
+        "and processes otherwise",
     )
     compile_parser.add_argument(
         "--indent",
@@ -314,6 +397,88 @@ def build_parser():
         action="store_true",
         default=from_dot_kapitan("compile", "cache", False),
     )
+    compile_parser.add_argument(
+        "--incremental",
+        help="only compile targets whose inventory or input files changed since the "
+        "last incremental compile, leaving the compiled output of other targets "
+        "untouched",
+        action="store_true",
+        default=from_dot_kapitan("compile", "incremental", False),
+    )
+    compile_parser.add_argument(
+        "--target-cache",
+        help="restore targets from $XDG_CACHE_HOME/kapitan/targets when their "
+        "inventory, input files and tool versions match an earlier compile, and "
+        "store the output of the targets that were compiled",
+        action="store_true",
+        default=from_dot_kapitan("compile", "target-cache", False),
+    )
+    compile_parser.add_argument(
+        "--changed-paths-output",
+        type=str,
+        default=from_dot_kapitan("compile", "changed-paths-output", None),
+        metavar="FILE",
+        help="write the compiled files that were added, changed or removed to FILE, "
+        "one path per line",
+    )
+    compile_parser.add_argument(
+        "--check",
+        help="compile into a temporary directory and compare with the compiled output "
+        "without modifying it, exit with 1 if files would be added, changed or removed",
+        action="store_true",
+        default=from_dot_kapitan("compile", "check", False),
+    )
+    compile_parser.add_argument(
+        "--diff",
+        help="like --check, also printing a unified diff of the out of date files",
+        action="store_true",
+        default=from_dot_kapitan("compile", "diff", False),
+    )
+    compile_parser.add_argument(
+        "--report-json",
+        type=str,
+        default=from_dot_kapitan("compile", "report-json", None),
+        metavar="FILE",
+        help="write per target compile metrics (wall time, time per input type, "
+        "files and bytes written, cache hits and misses, RSS) to FILE as JSON",
+    )
+    compile_parser.add_argument(
+        "--parallel-entries",
+        help="schedule every compile entry of a target as its own task on the process "
+        "pool instead of compiling targets one entry at a time",
+        action="store_true",
+        default=from_dot_kapitan("compile", "parallel-entries", False),
+    )
+    compile_parser.add_argument(
+        "--pipeline-writes",
+        help="write compiled files from a background thread, overlapping ref "
+        "compilation, serialisation and disk writes with evaluating the next input",
+        action="store_true",
+        default=from_dot_kapitan("compile", "pipeline-writes", False),
+    )
+    compile_parser.add_argument(
+        "--watch",
+        help="keep running and recompile the targets affected by changes to the "
+        "inventory or to files read while compiling (implies --incremental)",
+        action="store_true",
+        default=from_dot_kapitan("compile", "watch", False),
+    )
+    compile_parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        default=from_dot_kapitan("compile", "shard", None),
+        metavar="INDEX/TOTAL",
+        help="only compile the targets assigned to shard INDEX of TOTAL (e.g. 1/4), "
+        "leaving the output of other targets untouched",
+    )
+    compile_parser.add_argument(
+        "--merge-shards",
+        nargs="+",
+        default=from_dot_kapitan("compile", "merge-shards", None),
+        metavar="DIR",
+        help="assemble the compiled output of every shard, found in the output paths "
+        "DIR of 'compile --shard', into the output path instead of compiling",
+    )
     compile_parser.add_argument(
         "--ignore-version-check",
         help="ignore the version from .kapitan",
@@ -363,11 +528,13 @@ def build_parser():
         ),
     )
 
-    compile_selector_parser = compile_parser.add_mutually_exclusive_group()
+    # --targets and --labels combined select the targets matching both
+    compile_selector_parser = compile_parser.add_argument_group("target selection")
     compile_selector_parser.add_argument(
         "--targets",
         "-t",
-        help="targets to compile, default is all",
+        help="targets to compile, glob patterns (e.g. 'prod-*') select every "
+        "matching target, default is all",
         type=str,
         nargs="+",
         default=from_dot_kapitan("compile", "targets", []),
@@ -376,11 +543,12 @@ def build_parser():
     compile_selector_parser.add_argument(
         "--labels",
         "-l",
-        help="compile targets matching the labels, default is all",
+        help="compile targets matching the label selectors, e.g. env=prod, "
+        "'tier in (web,api)', 'tier!=db' or '!canary', default is all",
         type=str,
         nargs="*",
         default=from_dot_kapitan("compile", "labels", []),
-        metavar="key=value",
+        metavar="SELECTOR",
     )
 
     inventory_parser = subparser.add_parser(
@@ -686,6 +854,63 @@ def build_parser():
         default=from_dot_kapitan("init", "checkout_ref ", defaults.COPIER_TEMPLATE_REF),
         help=f"Cruft checkout_ref, default is {defaults.COPIER_TEMPLATE_REF}",
     )
+
+    serve_parser = subparser.add_parser(
+        "serve",
+        help="keep the inventory rendered and serve compile, inventory and reveal "
+        "requests over a Unix socket",
+        parents=[inventory_backend_parser],
+    )
+    serve_parser.set_defaults(func=trigger_serve, name="serve")
+
+    serve_parser.add_argument(
+        "--incremental",
+        help="compile requests incrementally, as with compile --incremental "
+        "(default). With --no-incremental, only requests passing --incremental are",
+        action=argparse.BooleanOptionalAction,
+        default=from_dot_kapitan("serve", "incremental", True),
+    )
+    serve_parser.add_argument(
+        "--socket",
+        default=from_dot_kapitan("serve", "socket", DEFAULT_SOCKET),
+        metavar="PATH",
+        help=f'set the Unix socket to listen on, default is "{DEFAULT_SOCKET}"',
+    )
+    serve_parser.add_argument(
+        "--inventory-path",
+        default=from_dot_kapitan("serve", "inventory-path", "./inventory"),
+        help='set inventory path, default is "./inventory"',
+    )
+    serve_parser.add_argument(
+        "--refs-path",
+        help='set refs path, default is "./refs"',
+        default=from_dot_kapitan("serve", "refs-path", "./refs"),
+    )
+    serve_parser.add_argument(
+        "--parallelism",
+        "-p",
+        type=int,
+        default=from_dot_kapitan("serve", "parallelism", None),
+        metavar="INT",
+        help="Number of compile processes kept running, default is the available "
+        "CPU count",
+    )
+    serve_parser.add_argument(
+        "--max-tasks-per-worker",
+        type=int,
+        default=from_dot_kapitan("serve", "max-tasks-per-worker", None),
+        metavar="INT",
+        help="replace a compile process with a fresh one after it compiled INT "
+        "tasks, returning the memory it used",
+    )
+    serve_parser.add_argument(
+        "--max-worker-memory",
+        type=int,
+        default=from_dot_kapitan("serve", "max-worker-memory", None),
+        metavar="MB",
+        help="replace the compile processes with fresh ones once a task leaves "
+        "one of them using more than MB megabytes of memory (RSS)",
+    )
     return parser
 
 
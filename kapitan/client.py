@@ -0,0 +1,85 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Thin client for ``kapitan serve``.
+
+Runs a kapitan command in a running server and prints its output::
+
+    python -m kapitan.client compile -t my-target
+    python -m kapitan.client --socket /tmp/kapitan.sock inventory -t my-target
+
+Only the standard library is imported here, so starting the client takes a
+fraction of the time needed to import kapitan and render the inventory.
+
+A request is one line of JSON holding the command line and the working
+directory of the client, the response is one line of JSON with the exit code
+and the captured stdout and stderr of the command.
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+
+DEFAULT_SOCKET = ".kapitan.sock"
+
+
+def send_message(sock: socket.socket, message: dict) -> None:
+    sock.sendall(json.dumps(message).encode() + b"\n")
+
+
+def recv_message(sock: socket.socket) -> dict | None:
+    """Read one message, None if the peer closed the connection first."""
+    with sock.makefile("rb") as fp:
+        line = fp.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+def request(socket_path: str, argv, cwd: str | None = None) -> dict:
+    """Run the command line argv in the server listening on socket_path."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(socket_path)
+        send_message(sock, {"argv": list(argv), "cwd": cwd or os.getcwd()})
+        response = recv_message(sock)
+    if response is None:
+        raise ConnectionError(f"kapitan server at {socket_path} closed the connection")
+    return response
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m kapitan.client",
+        description="run a kapitan command in a running `kapitan serve`",
+    )
+    parser.add_argument(
+        "--socket",
+        default=os.environ.get("KAPITAN_SOCKET", DEFAULT_SOCKET),
+        help=f'server socket, default is $KAPITAN_SOCKET or "{DEFAULT_SOCKET}"',
+    )
+    parser.add_argument("command", nargs=argparse.REMAINDER)
+    args = parser.parse_args(argv)
+    if not args.command:
+        parser.error("a kapitan command is required, e.g. compile -t my-target")
+
+    try:
+        response = request(args.socket, args.command)
+    except OSError as e:
+        print(
+            f"Can't reach a kapitan server at {args.socket}: {e}\n"
+            "Start one with `kapitan serve`",
+            file=sys.stderr,
+        )
+        return 1
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["exit_code"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,7 +1,9 @@
 import logging
 import os
 import subprocess
-from subprocess import DEVNULL, PIPE
+from subprocess import DEVNULL
+
+from kapitan.tool_runner import run_tool
 
 
 logger = logging.getLogger(__name__)
@@ -16,11 +18,9 @@ def helm_cli(helm_path, args, stdout=None, verbose=False, timeout=None):
         timeout = int(os.getenv("KAPITAN_HELM_TIMEOUT", "30"))
     try:
         logger.debug("launching helm with arguments: %s", args)
-        res = subprocess.run(
-            args=[helm_path] + args,
-            stderr=PIPE,
-            stdout=stdout or (PIPE if verbose else DEVNULL),
-            check=False,
+        res = run_tool(
+            [helm_path] + args,
+            stdout=stdout or (None if verbose else DEVNULL),
             timeout=timeout,
         )
         if verbose and not stdout:
@@ -0,0 +1,310 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Incremental compilation support.
+
+Every compiled target gets a fingerprint made of:
+
+- a digest of its rendered inventory,
+- a digest of the CLI flags that influence compiled output,
+- the kapitan version,
+- the digest of every file read while compiling it: expanded input paths,
+  jsonnet imports, jinja2 includes/imports, files read through jsonnet native
+  callbacks and ref files.
+
+Reads are recorded through :func:`track_dependency`, which is a no-op unless
+the caller is inside a :func:`tracking` block. Access to another target's
+inventory (``inventory_global``) is recorded as the :data:`GLOBAL_INVENTORY`
+pseudo-dependency, whose digest covers the whole rendered inventory.
+Input paths are also recorded unexpanded, together with the search paths they
+were looked up in (see :func:`track_lookup`), so a file newly matching a glob
+or shadowing an input path from an earlier search path changes the
+fingerprint too.
+
+Fingerprints are persisted per output path (see :func:`compile_state_dir`) so
+``kapitan compile --incremental`` only recompiles targets whose fingerprint
+changed and leaves the other ``compiled/<target>`` directories alone.
+
+This module only depends on the standard library at import time because it is
+imported from low level modules such as :mod:`kapitan.utils`.
+"""
+
+import contextlib
+import contextvars
+import glob
+import hashlib
+import json
+import logging
+import os
+from collections.abc import Mapping
+
+
+logger = logging.getLogger(__name__)
+
+# Pseudo dependency recorded when a target reads inventory of other targets.
+GLOBAL_INVENTORY = "@inventory_global"
+
+# Prefix of the pseudo dependencies recorded by track_lookup().
+LOOKUP_PREFIX = "@lookup:"
+
+# Digest recorded for dependencies that did not exist when fingerprinted.
+ABSENT = "absent"
+
+# CLI flags that change the compiled output of a target. Anything not listed
+# here (parallelism, verbosity, profiling, caching...) is output neutral.
+FINGERPRINT_ARGS = (
+    "reveal",
+    "embed_refs",
+    "refs_path",
+    "indent",
+    "prune",
+    "use_go_jsonnet",
+    "jinja2_filters",
+    "yaml_multiline_string_style",
+    "yaml_dump_null_as_empty",
+    "yaml_use_rapidyaml",
+    "compose_target_name",
+    "inventory_backend",
+)
+
+_tracked_dependencies: contextvars.ContextVar[set | None] = contextvars.ContextVar(
+    "kapitan_tracked_dependencies", default=None
+)
+
+
+@contextlib.contextmanager
+def tracking():
+    """Record every dependency tracked inside the block into the yielded set."""
+    dependencies: set[str] = set()
+    token = _tracked_dependencies.set(dependencies)
+    try:
+        yield dependencies
+    finally:
+        _tracked_dependencies.reset(token)
+
+
+def track_dependency(path) -> None:
+    """Record that the target being compiled read ``path``."""
+    dependencies = _tracked_dependencies.get()
+    if dependencies is not None and path:
+        dependencies.add(os.path.abspath(path))
+
+
+def track_global_inventory() -> None:
+    """Record that the target being compiled read the inventory of other targets."""
+    dependencies = _tracked_dependencies.get()
+    if dependencies is not None:
+        dependencies.add(GLOBAL_INVENTORY)
+
+
+def lookup_dependency(input_path: str, search_paths) -> str:
+    """Pseudo dependency of input_path looked up in search_paths."""
+    return LOOKUP_PREFIX + json.dumps([input_path, list(search_paths)])
+
+
+def parse_lookup(dependency: str) -> tuple[str, list[str]]:
+    """Input path and search paths of a lookup_dependency()."""
+    input_path, search_paths = json.loads(dependency[len(LOOKUP_PREFIX) :])
+    return input_path, search_paths
+
+
+def track_lookup(input_path: str, search_paths) -> None:
+    """Record that the target being compiled looked up input_path, which may
+    be a glob, in search_paths."""
+    dependencies = _tracked_dependencies.get()
+    if dependencies is not None:
+        dependencies.add(
+            lookup_dependency(input_path, [os.path.abspath(p) for p in search_paths])
+        )
+
+
+class TrackedMapping(Mapping):
+    """Read-only view of the global inventory that records any access to it."""
+
+    def __init__(self, mapping):
+        self._mapping = mapping
+
+    def __getitem__(self, key):
+        track_global_inventory()
+        return self._mapping[key]
+
+    def __iter__(self):
+        track_global_inventory()
+        return iter(self._mapping)
+
+    def __len__(self):
+        return len(self._mapping)
+
+
+def compile_state_dir(output_path: str) -> str:
+    """Return the directory holding compile state (fingerprints, stats) for
+    output_path."""
+    # Local import to avoid a cycle: kapitan.utils imports this module.
+    from kapitan.inputs.cache import cache_home
+
+    output_id = hashlib.sha256(
+        os.path.abspath(output_path).encode("utf-8")
+    ).hexdigest()[:16]
+    return cache_home("compile", output_id)
+
+
+def hash_object():
+    return hashlib.blake2b(digest_size=32)
+
+
+def path_digest(path: str) -> str:
+    """Digest of a file, or of every file name and content below a directory."""
+    h = hash_object()
+    if os.path.isfile(path):
+        with open(path, "rb") as fp:
+            while chunk := fp.read(65536):
+                h.update(chunk)
+    elif os.path.isdir(path):
+        for root, dirs, files in os.walk(path):
+            dirs.sort()
+            for name in sorted(files):
+                file_path = os.path.join(root, name)
+                h.update(os.path.relpath(file_path, path).encode("utf-8"))
+                h.update(b"\x00")
+                h.update(path_digest(file_path).encode("utf-8"))
+    else:
+        return ABSENT
+    return h.hexdigest()
+
+
+def lookup_digest(dependency: str) -> str:
+    """Digest of the paths a lookup_dependency() matches in each search path."""
+    input_path, search_paths = parse_lookup(dependency)
+    matches = []
+    for search_path in search_paths:
+        pattern = os.path.join(search_path, input_path)
+        if glob.has_magic(input_path):
+            found = sorted(glob.glob(pattern))
+        else:
+            found = [pattern] if os.path.lexists(pattern) else []
+        matches.append([os.path.relpath(path, search_path) for path in found])
+    return object_digest(matches)
+
+
+def dependency_digest(dependency: str) -> str:
+    """Digest of a file, directory or lookup dependency."""
+    if dependency.startswith(LOOKUP_PREFIX):
+        return lookup_digest(dependency)
+    return path_digest(dependency)
+
+
+def object_digest(obj) -> str:
+    """Digest of a JSON serialisable object, independent of key order."""
+    h = hash_object()
+    h.update(json.dumps(obj, sort_keys=True, default=str).encode("utf-8"))
+    return h.hexdigest()
+
+
+def args_digest(args) -> str:
+    """Digest of the CLI flags in :data:`FINGERPRINT_ARGS`."""
+    return object_digest({name: getattr(args, name, None) for name in FINGERPRINT_ARGS})
+
+
+def absolute_dependency(dependency: str) -> str:
+    """dependency with its paths made absolute, resolved against the working
+    directory."""
+    if dependency == GLOBAL_INVENTORY:
+        return dependency
+    if dependency.startswith(LOOKUP_PREFIX):
+        input_path, search_paths = parse_lookup(dependency)
+        return lookup_dependency(input_path, map(os.path.abspath, search_paths))
+    return os.path.abspath(dependency)
+
+
+def normalise_path(path: str) -> str:
+    """Store paths below the working directory as relative paths so target
+    cache entries are shared by checkouts of the project in other places."""
+    if path == GLOBAL_INVENTORY:
+        return path
+    if path.startswith(LOOKUP_PREFIX):
+        input_path, search_paths = parse_lookup(path)
+        return lookup_dependency(input_path, map(normalise_path, search_paths))
+    relative = os.path.relpath(path)
+    return path if relative.startswith(os.pardir) else relative
+
+
+class FingerprintStore:
+    """Persisted per-target fingerprints for an output path.
+
+    ``global_inventory`` is a callable returning the rendered inventory of all
+    targets; it is only evaluated (once) when a fingerprint needs it.
+    """
+
+    FILENAME = "fingerprints.json"
+
+    def __init__(self, output_path: str, global_inventory=None):
+        self.path = os.path.join(compile_state_dir(output_path), self.FILENAME)
+        self.global_inventory = global_inventory
+        self.entries: dict[str, dict] = self._load()
+        self._digests: dict[str, str] = {}
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable fingerprints at %s: %s", self.path, e)
+            return {}
+
+    def digest(self, dependency: str) -> str:
+        """Current digest of a dependency, memoised for the lifetime of the store."""
+        if dependency not in self._digests:
+            if dependency == GLOBAL_INVENTORY:
+                inventory = self.global_inventory() if self.global_inventory else {}
+                # a plain dict, the inventory may render its targets lazily
+                self._digests[dependency] = object_digest(dict(inventory))
+            else:
+                self._digests[dependency] = dependency_digest(dependency)
+        return self._digests[dependency]
+
+    def invalidate(self) -> None:
+        """Forget memoised digests, e.g. after compiling created or changed refs."""
+        self._digests.clear()
+
+    def is_fresh(self, target_name: str, base: dict, compiled_target_path: str) -> bool:
+        """True if target_name was compiled with the same fingerprint and its
+        compiled output is still in place."""
+        entry = self.entries.get(target_name)
+        if not entry or entry.get("base") != base:
+            return False
+        if not os.path.isdir(compiled_target_path):
+            return False
+        return all(
+            self.digest(dependency) == digest
+            for dependency, digest in entry.get("dependencies", {}).items()
+        )
+
+    def update(
+        self, target_name: str, target_full_path: str, base: dict, dependencies
+    ) -> None:
+        """Record the fingerprint of a freshly compiled target.
+
+        Dependencies are stored as absolute paths, so they are found again
+        from any working directory (e.g. by ``kapitan serve``).
+        """
+        absolute = sorted({absolute_dependency(d) for d in dependencies})
+        self.entries[target_name] = {
+            "target_full_path": target_full_path,
+            "base": base,
+            "dependencies": {d: self.digest(d) for d in absolute},
+        }
+
+    def remove(self, target_name: str) -> dict | None:
+        return self.entries.pop(target_name, None)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(self.entries, fp, sort_keys=True)
+        os.replace(tmp_path, self.path)
+        logger.debug("Saved %d target fingerprints to %s", len(self.entries), self.path)
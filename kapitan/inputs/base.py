@@ -6,10 +6,14 @@
 # SPDX-License-Identifier: Apache-2.0
 
 import abc
+import contextlib
+import contextvars
 import glob
 import json
 import logging
 import os
+import queue
+import threading
 from collections.abc import Mapping
 
 import toml
@@ -17,6 +21,7 @@ import yaml
 
 from kapitan import cached
 from kapitan.errors import CompileError, KapitanError
+from kapitan.incremental import track_dependency, track_lookup
 from kapitan.inventory.model.input_types import CompileInputTypeConfig, OutputType
 from kapitan.refs.base import Revealer
 from kapitan.utils import PrettyDumper, prune_empty
@@ -40,6 +45,67 @@ def _ensure_dir(path: str) -> None:
     _ENSURED_DIRS.add(path)
 
 
+# Compiled files queued for the output writer of a compile entry, before the
+# input type has to wait for the writer to catch up.
+OUTPUT_QUEUE_SIZE = 64
+
+
+class OutputWriter:
+    """
+    Reveal or compile refs, serialise and write compiled files in a thread,
+    see ``kapitan compile --pipeline-writes``.
+
+    Input types hand over every compiled object with :meth:`submit` and go on
+    evaluating the next one while the writer thread writes the previous ones,
+    in submission order. At most ``maxsize`` objects are queued, submit()
+    blocks when the writer falls behind.
+
+    A failed write is raised by the next submit() or when leaving the
+    context; once a write failed, or the input type raised, queued writes
+    are dropped.
+    """
+
+    def __init__(self, maxsize: int = OUTPUT_QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.error: BaseException | None = None
+        self.cancelled = False
+        self.thread = threading.Thread(
+            target=self._run, name="kapitan-output-writer", daemon=True
+        )
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is not None:
+            self.cancelled = True
+        self.queue.put(None)
+        self.thread.join()
+        if exc_type is None:
+            self._raise_error()
+
+    def _run(self):
+        while (item := self.queue.get()) is not None:
+            context, write, args = item
+            if self.cancelled or self.error is not None:
+                continue
+            try:
+                # e.g. dependency tracking reads context variables
+                context.run(write, *args)
+            except BaseException as e:
+                self.error = e
+
+    def _raise_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, write, *args) -> None:
+        """Call write(*args) in the writer thread."""
+        self._raise_error()
+        self.queue.put((contextvars.copy_context(), write, args))
+
+
 class InputType:
     """
     Abstract base class for input types.
@@ -58,6 +124,8 @@ class InputType:
         self.ref_controller = ref_controller
         self.target_name = target_name
         self.args = args
+        # set while compile_obj() runs with --pipeline-writes, see to_file()
+        self.output_writer: OutputWriter | None = None
 
     def compile_obj(self, comp_obj: CompileInputTypeConfig):
         """Process and compile all input paths defined in the compilation configuration.
@@ -105,7 +173,23 @@ class InputType:
         # ``multiprocessing.Pool`` in ``compile_targets``. Adding a nested
         # ThreadPool here would over-subscribe CPU and require auditing every
         # ``InputType`` subclass for thread-safety (kadet/jinja2/jsonnet hold
-        # mutable globals). We rely on per-target parallelism for scaling.
+        # mutable globals). We rely on per-target parallelism for scaling, or
+        # per-entry parallelism with ``--parallel-entries``. With
+        # ``--pipeline-writes`` only writing the output moves to a single
+        # thread, overlapping it with the evaluation of the next input. Later
+        # compile entries may read this entry's output, so every file is
+        # written before compile_obj() returns.
+        writer = (
+            OutputWriter() if getattr(self.args, "pipeline_writes", False) else None
+        )
+        with writer or contextlib.nullcontext():
+            self.output_writer = writer
+            try:
+                self._compile_input_paths(comp_obj, target_compile_path)
+            finally:
+                self.output_writer = None
+
+    def _compile_input_paths(self, comp_obj, target_compile_path):
         for input_path in comp_obj.input_paths:
             # Fast path: when ``input_path`` contains no glob metacharacters
             # (the common case for plain file references) skip ``glob.glob``
@@ -130,10 +214,24 @@ class InputType:
                     f"search_paths: {self.search_paths}"
                 )
 
+            # adding a file matching input_path must invalidate the target too
+            track_lookup(input_path, self.search_paths)
             for expanded_path in expanded_paths:
+                track_dependency(expanded_path)
                 self.compile_input_path(comp_obj, expanded_path, target_compile_path)
 
     def to_file(self, config: CompileInputTypeConfig, file_path, file_content):
+        """Write compiled content to file, see write_file().
+
+        Within compile_obj() the file is written by the output writer thread,
+        so file_content must not be modified afterwards.
+        """
+        if self.output_writer is not None:
+            self.output_writer.submit(self.write_file, config, file_path, file_content)
+        else:
+            self.write_file(config, file_path, file_content)
+
+    def write_file(self, config: CompileInputTypeConfig, file_path, file_content):
         """Write compiled content to file, handling different output types and revealing refs if needed.
 
         Args:
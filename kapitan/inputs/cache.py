@@ -1,3 +1,5 @@
+import contextlib
+import contextvars
 import hashlib
 import logging
 import multiprocessing
@@ -12,6 +14,28 @@ from kapitan.errors import CompileError
 
 logger = logging.getLogger(__name__)
 
+# Cache lookups of the target being compiled, see count_lookups().
+_lookup_counts: contextvars.ContextVar[dict | None] = contextvars.ContextVar(
+    "kapitan_cache_lookup_counts", default=None
+)
+
+
+@contextlib.contextmanager
+def count_lookups():
+    """Count the InputCache hits and misses inside the block into the yielded dict."""
+    counts = {"hits": 0, "misses": 0}
+    token = _lookup_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _lookup_counts.reset(token)
+
+
+def _count_lookup(outcome: str) -> None:
+    counts = _lookup_counts.get()
+    if counts is not None:
+        counts[outcome] += 1
+
 
 class CacheMetrics:
     """Process-safe counters for cache hits, misses and fills.
@@ -49,17 +73,22 @@ class CacheMetrics:
         }
 
 
+def cache_home(*sub_paths: str) -> str:
+    """Return the kapitan cache directory, optionally joined with sub_paths.
+
+    Resolves to ``$XDG_CACHE_HOME/kapitan`` and falls back to
+    ``$HOME/.cache/kapitan``.
+    """
+    if home := os.environ.get("XDG_CACHE_HOME"):
+        return os.path.join(home, "kapitan", *sub_paths)
+    if home := os.environ.get("HOME"):
+        return os.path.join(home, ".cache", "kapitan", *sub_paths)
+    raise CompileError("Could not get cache dir: $XDG_CACHE_HOME or $HOME not set.")
+
+
 class InputCache:
     def __init__(self, input_type_name: str, metrics: CacheMetrics | None = None):
-        if cache_home := os.environ.get("XDG_CACHE_HOME"):
-            self.input_cache_home = f"{cache_home}/kapitan/{input_type_name}"
-        elif cache_home := os.environ.get("HOME"):
-            self.input_cache_home = f"{cache_home}/.cache/kapitan/{input_type_name}"
-        else:
-            raise CompileError(
-                "Could not get cache dir: $XDG_CACHE_HOME or $HOME not set."
-            )
-
+        self.input_cache_home = cache_home(input_type_name)
         self.input_type_name = input_type_name
         self.kv_cache = {}
         self.metrics = metrics if metrics is not None else CacheMetrics()
@@ -89,15 +118,23 @@ class InputCache:
                         # ModuleNotFoundError is swallowed; treat that as a
                         # miss so the caller recomputes.
                         if output_obj is None:
-                            self.metrics.miss()
+                            self._miss()
                         else:
-                            self.metrics.hit()
+                            self._hit()
                         return output_obj
                 except FileNotFoundError:
                     pass
-        self.metrics.miss()
+        self._miss()
         return None
 
+    def _hit(self):
+        self.metrics.hit()
+        _count_lookup("hits")
+
+    def _miss(self):
+        self.metrics.miss()
+        _count_lookup("misses")
+
     def set(self, inputs_hash, output_obj, lock_retries=2):
         cached_path, cached_path_lock, sub_path = self.hash_paths(inputs_hash)
         for retry in range(lock_retries):
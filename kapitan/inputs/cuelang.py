@@ -1,7 +1,6 @@
 import logging
 import os
 import shutil
-import subprocess
 import tempfile
 
 import yaml
@@ -9,6 +8,7 @@ import yaml
 from kapitan.errors import KustomizeTemplateError
 from kapitan.inputs.base import InputType
 from kapitan.inventory.model.input_types import KapitanInputTypeCuelangConfig
+from kapitan.tool_runner import run_tool
 
 
 logger = logging.getLogger(__name__)
@@ -71,15 +71,8 @@ class Cuelang(InputType):
             config.output_filename if config.output_filename else "output.yaml"
         )
         output_file = os.path.join(compile_path, output_filename)
-        with open(output_file, "w") as f:
-            result = subprocess.run(
-                cmd,
-                stdout=f,
-                stderr=subprocess.PIPE,
-                text=True,
-                cwd=temp_input_dir,
-                check=False,
-            )
+        with open(output_file, "wb") as f:
+            result = run_tool(cmd, stdout=f, cwd=temp_input_dir)
             if result.returncode != 0:
-                err = f"Failed to run CUE export: {result.stderr}"
+                err = f"Failed to run CUE export: {result.stderr.decode()}"
                 raise KustomizeTemplateError(err)
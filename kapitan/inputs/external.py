@@ -8,10 +8,10 @@
 import logging
 import os
 import re
-import subprocess
 
 from kapitan.inputs.base import InputType
 from kapitan.inventory.model.input_types import KapitanInputTypeExternalConfig
+from kapitan.tool_runner import run_tool
 
 
 logger = logging.getLogger(__name__)
@@ -31,7 +31,7 @@ class External(InputType):
         """
         Sets environment variables for the external command.
         Propagates HOME and PATH environment variables if they are not explicitly set.
-        This is necessary because `subprocess.run()` with `env` set doesn't propagate
+        This is necessary because `run_tool()` with `env` set doesn't propagate
         environment variables from the current process.  We only propagate HOME or PATH if they
         exist in the Kapitan environment but aren't explicitly specified in `env_vars`. This
         prevents issues when spawning the subprocess due to `None` values in the subprocess's
@@ -89,20 +89,12 @@ class External(InputType):
                 env_vars,
             )
 
-            external_result = subprocess.run(
-                args_str,
-                env=env_vars,
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                shell=True,
-                encoding="utf-8",
-                check=False,
-            )
+            external_result = run_tool(args_str, env=env_vars, shell=True)
 
-            logger.debug("External stdout: %s.", external_result.stdout)
+            logger.debug("External stdout: %s.", external_result.stdout.decode("utf-8"))
             if external_result.returncode != 0:
                 raise ValueError(
-                    f"Executing external input with command '{args}' and env vars '{env_vars}' failed: {external_result.stderr}"
+                    f"Executing external input with command '{args}' and env vars '{env_vars}' failed: {external_result.stderr.decode('utf-8')}"
                 )
 
         except OSError as e:
@@ -9,6 +9,7 @@ import logging
 import os
 
 from kapitan import cached
+from kapitan.incremental import TrackedMapping
 from kapitan.inputs.base import CompiledFile, InputType
 from kapitan.inventory.model.input_types import KapitanInputTypeJinja2Config
 from kapitan.topics import current_target, topics
@@ -55,7 +56,7 @@ class Jinja2(InputType):
             # set ext_vars and inventory for jinja2 context
             context = {}
 
-            context["inventory_global"] = cached.global_inv
+            context["inventory_global"] = TrackedMapping(cached.global_inv)
             context["inventory"] = cached.global_inv[target_name]
             context["topics"] = topics
             context["input_params"] = input_params
@@ -21,6 +21,7 @@ from kadet import BaseModel, BaseObj, Dict
 from kapitan import cached
 from kapitan.defaults import KADET_COMPONENT_MODULE_PREFIX
 from kapitan.errors import CompileError
+from kapitan.incremental import track_global_inventory
 from kapitan.inputs.base import InputType
 from kapitan.inputs.cache import InputCache
 from kapitan.inventory.model.input_types import KapitanInputTypeKadetConfig
@@ -35,15 +36,36 @@ search_paths = contextvars.ContextVar("current search_paths in thread")
 
 
 @cache
-def inventory_global(lazy=False):
+def _inventory_global_kadet(lazy=False):
     # At hoc inventory for kadet
-    if not cached.inventory_global_kadet:
-        cached.inventory_global_kadet = Dict(cached.global_inv, default_box=lazy)
+    with cached.lock:
+        if not cached.inventory_global_kadet:
+            cached.inventory_global_kadet = Dict(cached.global_inv, default_box=lazy)
     return cached.inventory_global_kadet
 
 
+def inventory_global(lazy=False):
+    track_global_inventory()
+    return _inventory_global_kadet(lazy)
+
+
+@cache
+def _inventory_kadet(target_name, lazy=False):
+    # only wrap the target's own inventory, pool workers may hold a lazily
+    # loaded inventory snapshot
+    return Dict(cached.global_inv[target_name], default_box=lazy)
+
+
 def inventory(lazy=False):
-    return inventory_global(lazy)[current_target.get()]
+    return _inventory_kadet(current_target.get(), lazy)
+
+
+def clear_inventory_cache():
+    """Forget the kadet wrappers of the inventory, e.g. after it was re-rendered."""
+    cached.inventory_global_kadet = {}
+    _inventory_global_kadet.cache_clear()
+    _inventory_kadet.cache_clear()
+    inventory_digest.cache_clear()
 
 
 def topics(name=None, lazy=False):
@@ -295,9 +317,10 @@ class Kadet(InputType):
 
     def cacheable(self):
         if cached.args.cache:
-            if cached.kapitan_input_kadet is None:
-                metrics = (cached.input_cache_metrics or {}).get("kadet")
-                cached.kapitan_input_kadet = InputCache("kadet", metrics=metrics)
+            with cached.lock:
+                if cached.kapitan_input_kadet is None:
+                    metrics = (cached.input_cache_metrics or {}).get("kadet")
+                    cached.kapitan_input_kadet = InputCache("kadet", metrics=metrics)
 
             return cached.kapitan_input_kadet
         return False
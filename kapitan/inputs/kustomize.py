@@ -13,7 +13,6 @@ This module provides a Kustomize implementation for rendering overlays.
 import logging
 import os
 import shutil
-import subprocess
 import tempfile
 
 import yaml
@@ -21,6 +20,7 @@ import yaml
 from kapitan.errors import KustomizeTemplateError
 from kapitan.inputs.base import InputType
 from kapitan.inventory.model.input_types import KapitanInputTypeKustomizeConfig
+from kapitan.tool_runner import stream_tool
 
 
 logger = logging.getLogger(__name__)
@@ -92,7 +92,6 @@ class Kustomize(InputType):
                 f"Input path {input_path} must be a directory containing a kustomization.yaml file"
             )
 
-        result = None
         try:
             # Create a temporary directory for our kustomization
             temp_dir = tempfile.mkdtemp()
@@ -139,41 +138,48 @@ class Kustomize(InputType):
 
             # Build the kustomize command
             cmd = [self.kustomize_path, "build", temp_dir]
-
-            # Create temporary directory for output
-            output_dir = tempfile.mkdtemp()
-            output_file = os.path.join(output_dir, "output.yaml")
-
-            # Run kustomize build
-            with open(output_file, "w") as f:
-                result = subprocess.run(
-                    cmd, stdout=f, stderr=subprocess.PIPE, text=True, check=False
-                )
         except Exception as e:
             raise KustomizeTemplateError(
                 f"Failed to compile Kustomize overlay: {e!s}"
             ) from e
 
-        if result.returncode != 0:
-            raise KustomizeTemplateError(f"Kustomize build failed: {result.stderr}")
-
+        # Run kustomize build, parsing the documents as they are rendered. They
+        # are only written once it succeeded: a build failing halfway leaves no
+        # partial output, and its stderr is reported rather than a YAML error
+        # about truncated output.
+        parse_error = None
         try:
-            # Read and process the output
-            with open(output_file) as f:
-                for doc in yaml.safe_load_all(f):
-                    if doc:
-                        # Generate a unique filename based on kind and name
-                        kind = doc.get("kind", "").lower()
-                        name = doc.get("metadata", {}).get("name", "").lower()
-                        filename = (
-                            f"{name}-{kind}.yaml" if name and kind else "output.yaml"
-                        )
-
-                        # Write the document to the output file
-                        output_path = os.path.join(compile_path, filename)
-                        with open(output_path, "w") as out:
-                            yaml.dump(doc, out, default_flow_style=False)
+            with stream_tool(cmd) as kustomize:
+                try:
+                    documents = [
+                        doc for doc in yaml.safe_load_all(kustomize.stdout) if doc
+                    ]
+                except yaml.YAMLError as e:
+                    parse_error = e
+                    # let the tool run to completion to get its exit status
+                    kustomize.stdout.read()
+            result = kustomize.wait()
         except Exception as e:
             raise KustomizeTemplateError(
                 f"Failed to compile Kustomize overlay: {e!s}"
             ) from e
+
+        if result.returncode != 0:
+            raise KustomizeTemplateError(
+                f"Kustomize build failed: {result.stderr.decode()}"
+            )
+        if parse_error is not None:
+            raise KustomizeTemplateError(
+                f"Failed to compile Kustomize overlay: {parse_error!s}"
+            ) from parse_error
+
+        for doc in documents:
+            # Generate a unique filename based on kind and name
+            kind = doc.get("kind", "").lower()
+            name = doc.get("metadata", {}).get("name", "").lower()
+            filename = f"{name}-{kind}.yaml" if name and kind else "output.yaml"
+
+            # Write the document to the output file
+            output_path = os.path.join(compile_path, filename)
+            with open(output_path, "w") as out:
+                yaml.dump(doc, out, default_flow_style=False)
@@ -5,10 +5,12 @@
 #
 # SPDX-License-Identifier: Apache-2.0
 
+import copy
 import logging
 import multiprocessing as mp
 import os
 import time
+import traceback
 from functools import singledispatch
 
 import yaml
@@ -19,10 +21,15 @@ from kapitan.errors import InventoryError
 from kapitan.inventory import Inventory, InventoryTarget
 from kapitan.inventory.model import KapitanInventoryMetadata, KapitanInventoryParameters
 from kapitan.utils import available_cpu_count
-from omegaconf import ListMergeMode, OmegaConf
+from omegaconf import MISSING, Container, DictConfig, ListMergeMode, Node, OmegaConf
 
 from .migrate import migrate
-from .resolvers import register_resolvers
+from .resolvers import (
+    LITERAL_MARKER_PREFIX,
+    LITERAL_PATTERN,
+    process_literals,
+    register_resolvers,
+)
 
 
 logger = logging.getLogger(__name__)
@@ -47,6 +54,72 @@ def _handle_list(ob: list):
     return [keys_to_strings(v) for v in ob]
 
 
+class _Unresolved(Exception):
+    """the resolved config still holds interpolations, see _resolved_container()"""
+
+
+def _resolved_container(node: Node):
+    """
+    converts the resolved config node to a container, like
+    OmegaConf.to_container() followed by process_literals().
+    Raises _Unresolved when it still holds interpolations, e.g. produced by
+    escaped interpolations or by resolvers, which need another resolve pass.
+    """
+    if isinstance(node, Container):
+        if node._is_none():
+            return None
+        if node._is_missing():
+            return MISSING
+        if node._is_interpolation():
+            raise _Unresolved
+        if isinstance(node, DictConfig):
+            return {key: _resolved_container(node._get_node(key)) for key in node}
+        return [_resolved_container(node._get_node(i)) for i in range(len(node))]
+
+    value = node._value()
+    if isinstance(value, str):
+        if "${" in value:
+            raise _Unresolved
+        if LITERAL_MARKER_PREFIX in value:
+            # literal markers produced by ${escape:}
+            return LITERAL_PATTERN.sub(r"${\1}", value)
+    return value
+
+
+# inventory rendering targets in a pool worker, set by _init_worker()
+_worker_inventory = None
+
+
+def _init_worker(inventory) -> None:
+    """pool initializer: set up the inventory once per worker"""
+    global _worker_inventory
+    _worker_inventory = inventory
+    register_resolvers(inventory.inventory_path)
+
+
+def _render_target(target, inventory=None) -> tuple:
+    """
+    render target with inventory, the worker's by default. Returns
+    ((name, parameters, classes, applications, exports), None), or
+    (None, name) if rendering failed.
+    """
+    inventory = inventory or _worker_inventory
+    try:
+        inventory.load_target(target)
+    except Exception as e:
+        logger.error(f"{target.name}: could not render due to error {e}")
+        logger.debug(f"{target.name}: traceback: {traceback.format_exc()}")
+        return None, target.name
+    rendered = (
+        target.name,
+        target.parameters,
+        target.classes,
+        target.applications,
+        target.exports,
+    )
+    return rendered, None
+
+
 class OmegaConfTarget(InventoryTarget):
     resolved: bool = False
 
@@ -70,45 +143,65 @@ class OmegaConfTarget(InventoryTarget):
 
 class OmegaConfInventory(Inventory):
     def __init__(self, *args, **kwargs):
+        # merged class files, see load_class()
+        self._merged_classes = {}
         super().__init__(*args, **kwargs, target_class=OmegaConfTarget)
 
+    def source_paths(self) -> list[str]:
+        # user defined resolvers, see register_resolvers()
+        return super().source_paths() + [
+            os.path.join(self.inventory_path, "resolvers.py"),
+            os.path.join(os.getcwd(), "system/omegaconf/resolvers/resolvers.py"),
+        ]
+
     def render_targets(
         self,
         targets: list[OmegaConfTarget] = None,
         ignore_class_not_found: bool = False,
     ) -> None:
-        if not self.initialised:
-            manager = mp.Manager()
-            shared_targets = manager.dict()
-            with mp.Pool(min(len(targets), available_cpu_count())) as pool:
-                r = pool.map_async(
-                    self.inventory_worker,
-                    [(self, target, shared_targets) for target in targets.values()],
-                )
-                r.wait()
-
-                if not r.successful():
-                    raise OmegaConfRenderingError(
-                        "Error while loading the OmegaConf inventory"
-                    )
-
-            for target in shared_targets.values():
-                self.targets[target.name] = target
-
-    @staticmethod
-    def inventory_worker(zipped_args):
-        self, target, shared_targets = zipped_args
-        try:
+        if len(targets) == 1 or mp.current_process().daemon:
+            # e.g. a target looked up by compile -t, or rendered in a (daemonic)
+            # compile worker, which can't start a pool
             register_resolvers(self.inventory_path)
-            self.load_target(target)
-            shared_targets[target.name] = target
-
-        except Exception as e:
-            import traceback
+            try:
+                self._store_rendered(
+                    _render_target(target, self) for target in targets.values()
+                )
+            finally:
+                # class files may change before the next rendering, e.g. in watch
+                # mode. Pool workers drop theirs when they exit.
+                self._merged_classes = {}
+            return
+
+        processes = min(len(targets), available_cpu_count())
+        # a few chunks per worker keeps them busy while bounding IPC round trips
+        chunksize = max(1, len(targets) // (processes * 4))
+        with mp.Pool(processes, _init_worker, (self,)) as pool:
+            self._store_rendered(
+                pool.imap_unordered(
+                    _render_target, targets.values(), chunksize=chunksize
+                )
+            )
 
-            logger.error(f"{target.name}: could not render due to error {e}")
-            logger.debug(f"{target.name}: traceback: {traceback.format_exc()}")
-            raise
+    def _store_rendered(self, results) -> None:
+        """store the rendered targets in results, see _render_target()"""
+        failed = []
+        for rendered, error in results:
+            if error is not None:
+                failed.append(error)
+                continue
+            name, parameters, classes, applications, exports = rendered
+            target = self.targets[name]
+            target.parameters = parameters
+            target.classes = classes
+            target.applications = applications
+            target.exports = exports
+
+        if failed:
+            raise OmegaConfRenderingError(
+                f"Error while loading the OmegaConf inventory, could not render: "
+                f"{', '.join(sorted(failed))}"
+            )
 
     @cached(cache=LRUCache(maxsize=1024))
     def resolve_class_file_path(
@@ -190,7 +283,7 @@ class OmegaConfInventory(Inventory):
                 if self.ignore_class_not_found:
                     continue
                 raise InventoryError(f"Class {class_name} not found")
-            p, c, a, e = self.load_parameters_from_file(class_file)
+            p, c, a, e = self.load_class(class_file)
             if p:
                 parameters = OmegaConf.unsafe_merge(
                     parameters, p, list_merge_mode=ListMergeMode.EXTEND_UNIQUE
@@ -210,6 +303,44 @@ class OmegaConfInventory(Inventory):
         applications.extend(_applications)
         return parameters, classes, applications, exports
 
+    def load_class(self, class_file: str) -> tuple:
+        """
+        parameters, classes, applications and exports of class_file merged with
+        the classes it includes. They are merged once and shared by the targets
+        including class_file that are rendered by the same render_targets() call,
+        or pool worker.
+        """
+        merged = self._merged_classes.get(class_file)
+        if merged is None:
+            merged = self.load_parameters_from_file(class_file)
+            self._merged_classes[class_file] = merged
+        p, c, a, e = merged
+        # unsafe_merge() moves the nodes of p into the including parameters, which
+        # are resolved in place: hand out copies, copying nodes beats creating them
+        return copy.deepcopy(p), c, a, copy.deepcopy(e)
+
+    def target_class_files(self, target: OmegaConfTarget) -> list[str]:
+        # class names may be relative to the including file, resolve them like
+        # load_parameters_from_file() does
+        class_files = []
+        pending = [os.path.join(self.targets_path, target.path)]
+        while pending:
+            filename = pending.pop()
+            with open(filename) as f:
+                content = yaml.safe_load(f) or {}
+            for class_name in content.get("classes") or []:
+                class_file = self.resolve_class_file_path(
+                    class_name,
+                    class_parent_dir=os.path.dirname(
+                        filename.removeprefix(self.classes_path).removeprefix("/")
+                    ),
+                    class_parent_name=os.path.basename(filename),
+                )
+                if class_file and class_file not in class_files:
+                    class_files.append(class_file)
+                    pending.append(class_file)
+        return class_files
+
     def load_target(self, target: OmegaConfTarget):
         full_target_path = os.path.join(self.targets_path, target.path)
 
@@ -222,17 +353,21 @@ class OmegaConfInventory(Inventory):
         )
         load_parameters = time.perf_counter() - start
 
-        # First resolve pass - resolves all interpolations, escaped ones become unescaped
-        OmegaConf.resolve(p)
-        # Second resolve pass - resolves the previously escaped interpolations
-        OmegaConf.resolve(p)
-        # Convert to container with resolve=True to ensure all interpolations are resolved
-        resolved_params = OmegaConf.to_container(p, resolve=True)
-
-        # Process literal markers (from escape resolver) back to actual ${...} syntax
-        from .resolvers import process_literals
-
-        resolved_params = process_literals(resolved_params)
+        # First resolve pass - resolves all interpolations, escaped ones become unescaped.
+        # Second resolve pass, only if needed - resolves the previously escaped
+        # interpolations
+        for _ in range(2):
+            OmegaConf.resolve(p)
+            try:
+                # Converts to a container and processes the literal markers (from the
+                # escape resolver) back to actual ${...} syntax in a single traversal
+                resolved_params = _resolved_container(p)
+                break
+            except _Unresolved:
+                continue
+        else:
+            # Convert to container with resolve=True to ensure all interpolations are resolved
+            resolved_params = process_literals(OmegaConf.to_container(p, resolve=True))
 
         # Validate and construct KapitanInventoryParameters from the resolved dict
         target.parameters = KapitanInventoryParameters.model_validate(resolved_params)
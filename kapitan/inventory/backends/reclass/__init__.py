@@ -15,6 +15,16 @@ logger = logging.getLogger(__name__)
 
 
 class ReclassInventory(Inventory):
+    def source_paths(self) -> list[str]:
+        # reclass-config.yml may point nodes_uri and classes_uri elsewhere
+        reclass_config = get_reclass_config(
+            self.inventory_path, self.ignore_class_not_found, self.compose_target_name
+        )
+        return super().source_paths() + [
+            reclass_config["nodes_uri"],
+            reclass_config["classes_uri"],
+        ]
+
     def render_targets(
         self,
         targets: list[InventoryTarget] = None,
@@ -47,12 +57,19 @@ class ReclassInventory(Inventory):
                 storage, class_mappings, reclass.settings.Settings(reclass_config)
             )
             start = datetime.now(timezone.utc)
-            rendered_inventory = _reclass.inventory()
+            if targets is not None and targets.keys() < self.targets.keys():
+                # e.g. the targets changed since the cached inventory
+                rendered_nodes = {
+                    target_name: _reclass.nodeinfo(target_name)
+                    for target_name in targets
+                }
+            else:
+                rendered_nodes = _reclass.inventory()["nodes"]
             elapsed = datetime.now(timezone.utc) - start
             logger.debug(f"Inventory rendering with reclass took {elapsed}")
 
             # store parameters and classes
-            for target_name, rendered_target in rendered_inventory["nodes"].items():
+            for target_name, rendered_target in rendered_nodes.items():
                 self.targets[target_name].parameters = rendered_target["parameters"]
                 self.targets[target_name].classes = rendered_target["classes"]
                 self.targets[target_name].applications = rendered_target["applications"]
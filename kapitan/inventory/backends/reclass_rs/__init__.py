@@ -11,6 +11,15 @@ logger = logging.getLogger(__name__)
 
 
 class ReclassRsInventory(Inventory):
+    def source_paths(self) -> list[str]:
+        reclass_config = get_reclass_config(
+            self.inventory_path, self.ignore_class_not_found, self.compose_target_name
+        )
+        return super().source_paths() + [
+            reclass_config["nodes_uri"],
+            reclass_config["classes_uri"],
+        ]
+
     def _make_reclass_rs(self, ignore_class_not_found: bool):
         # Get Reclass config options with the same method that's used for `ReclassInventory`, but
         # disable the logic to normalise the `nodes_uri` and `classes_uri` options, since reclass-rs
@@ -31,11 +40,17 @@ class ReclassRsInventory(Inventory):
         try:
             r = self._make_reclass_rs(ignore_class_not_found)
             start = datetime.now(timezone.utc)
-            inv = r.inventory()
+            if targets is not None and targets.keys() < self.targets.keys():
+                # e.g. the targets changed since the cached inventory
+                nodes = {
+                    target_name: r.nodeinfo(target_name) for target_name in targets
+                }
+            else:
+                nodes = r.inventory().nodes
             elapsed = datetime.now(timezone.utc) - start
             logger.debug(f"Inventory rendering with reclass-rs took {elapsed}")
 
-            for target_name, nodeinfo in inv.nodes.items():
+            for target_name, nodeinfo in nodes.items():
                 self.targets[target_name].parameters = nodeinfo.parameters
                 self.targets[target_name].classes = nodeinfo.classes
                 self.targets[target_name].applications = nodeinfo.applications
@@ -0,0 +1,163 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Persistent cache of rendered inventories.
+
+With ``--inventory-cache`` the targets rendered by the inventory backend are
+stored in ``$XDG_CACHE_HOME/kapitan/inventory``, and later runs load them
+instead of rendering the inventory again.
+
+An entry is keyed by a digest of everything the rendering depends on: the
+contents of every file the backend reads (see
+:meth:`~kapitan.inventory.Inventory.source_paths`), the backend, the flags
+changing the rendering and the kapitan version.
+
+Every entry also holds the digest of each of those files and a reverse index
+mapping each file to the targets whose rendering read it (see
+:meth:`~kapitan.inventory.Inventory.source_index`). When the inventory
+changed, the last entry stored for the same backend and flags tells which
+files changed since, and only the targets reading them are rendered again.
+A changed file that isn't in the index, e.g. ``reclass-config.yml`` or a new
+class, renders the whole inventory.
+"""
+
+import logging
+import os
+import pickle
+import tempfile
+
+from kapitan.incremental import object_digest, path_digest
+from kapitan.inputs.cache import cache_home
+from kapitan.version import VERSION
+
+
+logger = logging.getLogger(__name__)
+
+
+def source_digests(inventory) -> dict[str, str]:
+    """Digest of every file read to render inventory, by path relative to it."""
+    digests = {}
+    for source_path in inventory.source_paths():
+        if os.path.isdir(source_path):
+            paths = (
+                os.path.join(root, name)
+                for root, _, files in os.walk(source_path)
+                for name in files
+            )
+        else:
+            paths = [source_path] if os.path.isfile(source_path) else []
+        for path in paths:
+            relative_path = os.path.relpath(path, inventory.inventory_path)
+            if relative_path not in digests:
+                digests[relative_path] = path_digest(path)
+    return digests
+
+
+def _base_key(inventory) -> str:
+    """Digest of what rendering inventory depends on besides its files."""
+    return object_digest(
+        {
+            "kapitan": VERSION,
+            "backend": f"{type(inventory).__module__}.{type(inventory).__qualname__}",
+            "inventory_path": os.path.abspath(inventory.original_inventory_path),
+            "compose_target_name": inventory.compose_target_name,
+            "ignore_class_not_found": inventory.ignore_class_not_found,
+        }
+    )
+
+
+def inventory_cache_key(inventory) -> str:
+    """Digest of the inventory files, backend and flags rendering inventory."""
+    return InventoryCache(inventory).key
+
+
+def _load(path: str):
+    try:
+        with open(path, "rb") as fp:
+            return pickle.load(fp)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        # e.g. written by an older pydantic, render again
+        logger.debug("Ignoring unreadable inventory cache entry %s: %s", path, e)
+        return None
+
+
+def _store(path: str, value) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # concurrent runs may store the same key: replace the file atomically
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            pickle.dump(value, fp, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+class InventoryCache:
+    """Cached renderings of an inventory, see the module docstring."""
+
+    def __init__(self, inventory):
+        self.inventory = inventory
+        self.digests = source_digests(inventory)
+        self.base_key = _base_key(inventory)
+        self.key = object_digest({"base": self.base_key, "sources": self.digests})
+
+    @staticmethod
+    def _entry_path(key: str) -> str:
+        return cache_home("inventory", key[:2], key[2:])
+
+    def _latest_path(self) -> str:
+        return cache_home("inventory", "latest", self.base_key)
+
+    def load(self) -> dict | None:
+        """Rendered targets of the inventory as it is now, None on a miss."""
+        entry = _load(self._entry_path(self.key))
+        if entry is None or entry["targets"].keys() != self.inventory.targets.keys():
+            return None
+        logger.debug("Loaded %d rendered targets from cache", len(entry["targets"]))
+        return entry["targets"]
+
+    def changed_targets(self) -> tuple[dict, set[str]] | None:
+        """Last stored rendering and the names of its targets that are stale.
+
+        Returns None when there is no earlier rendering or a changed file isn't
+        in its index. Targets added since are not included.
+        """
+        latest_key = _load(self._latest_path())
+        entry = _load(self._entry_path(latest_key)) if latest_key else None
+        if entry is None:
+            return None
+        changed_paths = {
+            path
+            for path in self.digests.keys() | entry["digests"].keys()
+            if self.digests.get(path) != entry["digests"].get(path)
+        }
+        targets_path = os.path.relpath(
+            self.inventory.targets_path, self.inventory.inventory_path
+        )
+        changed = set()
+        for path in changed_paths:
+            if path in entry["index"]:
+                changed |= entry["index"][path]
+            elif not path.startswith(targets_path + os.sep):
+                logger.debug("Inventory file %s is not in the cache index", path)
+                return None
+        # removed targets are dropped, added ones are rendered by the caller
+        changed &= self.inventory.targets.keys()
+        return entry["targets"], changed
+
+    def store(self, targets: dict) -> None:
+        """Store the rendered targets of the inventory as it is now."""
+        index = {
+            os.path.relpath(path, self.inventory.inventory_path): names
+            for path, names in self.inventory.source_index().items()
+        }
+        entry = {"targets": targets, "digests": self.digests, "index": index}
+        _store(self._entry_path(self.key), entry)
+        _store(self._latest_path(), self.key)
+        logger.debug("Stored %d rendered targets in cache", len(targets))
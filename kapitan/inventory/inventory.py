@@ -8,16 +8,23 @@
 import functools
 import logging
 import os
+import threading
 from abc import ABC, abstractmethod
+from collections import defaultdict
+from collections.abc import Mapping
 
 from pydantic import BaseModel, ConfigDict, Field
 
 from kapitan.errors import InventoryError
+from kapitan.inventory.labels import LabelIndex
 from kapitan.inventory.model import KapitanInventoryParameters
 
 
 logger = logging.getLogger(__name__)
 
+# Serialises rendering pending targets, e.g. from the threads of --executor threads
+_render_lock = threading.RLock()
+
 
 class InventoryTarget(BaseModel):
     model_config = ConfigDict(extra="forbid", validate_assignment=True)
@@ -38,6 +45,9 @@ class Inventory(ABC):
         initialise=True,
         target_class=InventoryTarget,
         enable_class_wildcards: bool = False,
+        *,
+        cache: bool = False,
+        lazy: bool = False,
     ):
         # Pre-expand wildcard class entries (kapicorp/kapitan#1084) into a
         # temporary mirror of the inventory tree so all backends see only
@@ -62,15 +72,21 @@ class Inventory(ABC):
         self.targets: dict[str, target_class] = {}
         self.ignore_class_not_found = ignore_class_not_found
         self.target_class = target_class
+        self.cache = cache
+        self.lazy = lazy
+        # targets only rendered once looked up, see render_pending()
+        self._pending: set[str] = set()
 
         if initialise:
             self.__initialise(ignore_class_not_found=ignore_class_not_found)
 
     @functools.cached_property
-    def inventory(self) -> dict:
+    def inventory(self) -> Mapping:
         """
         get all targets from inventory
         """
+        if self._pending:
+            return LazyInventory(self)
 
         return {
             target.name: target.model_dump(by_alias=True)
@@ -98,6 +114,8 @@ class Inventory(ABC):
         Topic parameters from each participating target are collected under
         ``parameters.targets.<target_name>`` of the resulting topic entry.
         """
+        # any target may produce a topic
+        self.render_pending()
         topics: dict[str, dict[str, dict]] = {}
         for target in self.targets.values():
             target_topics = getattr(target.parameters.kapitan, "topics", None) or {}
@@ -121,6 +139,14 @@ class Inventory(ABC):
             for name, targets in topics.items()
         }
 
+    @functools.cached_property
+    def label_index(self) -> LabelIndex:
+        """
+        index of the targets by their labels, see kapitan.inventory.labels
+        """
+        self.render_pending()
+        return LabelIndex(self.targets)
+
     def consumed_topics(self, target_name: str) -> set[str]:
         """Return the set of topic names ``target_name`` has opted into consuming.
 
@@ -138,7 +164,7 @@ class Inventory(ABC):
         accidental strings like ``"true"`` are rejected so foot-guns surface
         as undeclared-topic errors rather than silent cache stalls.
         """
-        target = self.targets.get(target_name)
+        target = self.get_target(target_name)
         if target is None:
             return set()
         target_topics = getattr(target.parameters.kapitan, "topics", None) or {}
@@ -184,18 +210,135 @@ class Inventory(ABC):
 
                     self.targets[target.name] = target
 
-            self.render_targets(
-                self.targets, ignore_class_not_found=ignore_class_not_found
-            )
+            if self.cache:
+                self.__render_cached_targets()
+            elif self.lazy:
+                self._pending = set(self.targets)
+            else:
+                self.render_targets(
+                    self.targets, ignore_class_not_found=ignore_class_not_found
+                )
             self.initialised = True
         return self.initialised
 
+    def __render_cached_targets(self) -> None:
+        """
+        load the rendered targets from the inventory cache, rendering the targets
+        whose inventory files changed since, see kapitan.inventory.cache
+        """
+        from kapitan.inventory.cache import InventoryCache
+
+        cache = InventoryCache(self)
+        targets = cache.load()
+        if targets is not None:
+            logger.info("Loaded rendered inventory from cache")
+            self.targets = targets
+            return
+
+        if not self.__render_changed_targets(cache):
+            self.render_targets(
+                self.targets, ignore_class_not_found=self.ignore_class_not_found
+            )
+        try:
+            cache.store(self.targets)
+        except OSError as e:
+            logger.warning(f"Could not store the rendered inventory in cache: {e}")
+
+    def __render_changed_targets(self, cache) -> bool:
+        """
+        render only the targets changed since the last cached rendering, returns
+        False if the whole inventory has to be rendered
+        """
+        changed_targets = cache.changed_targets()
+        if changed_targets is None:
+            return False
+        previous, changed = changed_targets
+        changed |= self.targets.keys() - previous.keys()
+        for name in self.targets.keys() - changed:
+            self.targets[name] = previous[name]
+        logger.info(
+            f"Rendering {len(changed)} of {len(self.targets)} targets changed "
+            "since the cached inventory"
+        )
+        if changed:
+            self.render_targets(
+                {name: self.targets[name] for name in changed},
+                ignore_class_not_found=self.ignore_class_not_found,
+            )
+        removed = previous.keys() - self.targets.keys()
+        exports = {
+            name: getattr(previous.get(name), "exports", {})
+            for name in changed | removed
+        }
+        if self._exports_changed(exports):
+            logger.debug("Exports of changed targets changed, rendering all targets")
+            return False
+        return True
+
+    def _exports_changed(self, previous_exports: dict) -> bool:
+        """
+        whether the exports of the targets in previous_exports changed: inventory
+        queries of other targets read them, so those have to be rendered again
+        """
+        return any(
+            (self.targets[name].exports if name in self.targets else {})
+            != (exports or {})
+            for name, exports in previous_exports.items()
+        )
+
+    def source_paths(self) -> list[str]:
+        """
+        paths of the files and directories the rendering of the inventory reads
+        """
+        return [
+            self.targets_path,
+            self.classes_path,
+            os.path.join(self.inventory_path, "reclass-config.yml"),
+        ]
+
+    @functools.cached_property
+    def _class_files(self) -> dict[str, list[str]]:
+        """
+        paths of the files defining each class name below classes_path
+        """
+        class_files = defaultdict(list)
+        for root, _, files in os.walk(self.classes_path):
+            for file in files:
+                path = os.path.join(root, file)
+                class_name = self._class_name(path)
+                if class_name is not None:
+                    class_files[class_name].append(path)
+        return class_files
+
+    def target_class_files(self, target: InventoryTarget) -> list[str]:
+        """
+        paths of the class files read to render target
+        """
+        return [
+            path
+            for class_name in target.classes
+            for path in self._class_files.get(class_name, ())
+        ]
+
+    def source_index(self) -> dict[str, set[str]]:
+        """
+        map the paths of the target and class files to the names of the targets
+        whose rendering reads them
+        """
+        index = defaultdict(set)
+        for name, target in self.targets.items():
+            index[os.path.join(self.targets_path, target.path)].add(name)
+            for path in self.target_class_files(target):
+                index[path].add(name)
+        return dict(index)
+
     def get_target(
         self, target_name: str, ignore_class_not_found: bool = False
     ) -> InventoryTarget:
         """
         helper function to get rendered InventoryTarget object for single target
         """
+        self.render_pending([target_name])
         return self.targets.get(target_name)
 
     def get_targets(
@@ -210,13 +353,36 @@ class Inventory(ABC):
             target_names = []
 
         if target_names:
+            self.render_pending(target_names)
             return {
                 target_name: self.targets[target_name]
                 for target_name in target_names
                 if target_name in self.targets
             }
+        self.render_pending()
         return self.targets
 
+    def render_pending(self, target_names=None) -> None:
+        """
+        render the targets in target_names, all by default, that a lazy inventory
+        didn't render yet
+        """
+        if not self._pending:
+            return
+        with _render_lock:
+            if target_names is None:
+                pending = set(self._pending)
+            else:
+                pending = self._pending.intersection(target_names)
+            if not pending:
+                return
+            logger.debug(f"Rendering {len(pending)} targets on demand")
+            self.render_targets(
+                {name: self.targets[name] for name in pending},
+                ignore_class_not_found=self.ignore_class_not_found,
+            )
+            self._pending -= pending
+
     def get_parameters(
         self, target_names: str | list[str], ignore_class_not_found: bool = False
     ) -> dict:
@@ -243,6 +409,85 @@ class Inventory(ABC):
         """
         raise NotImplementedError
 
+    def rerender_targets(self, target_names) -> None:
+        """
+        render target_names again, e.g. after their inventory files changed.
+        Every target is rendered again if their exports changed.
+        """
+        exports = {
+            name: self.targets[name].exports
+            for name in target_names
+            if name not in self._pending
+        }
+        targets = {
+            name: self.target_class(name=name, path=self.targets[name].path)
+            for name in target_names
+        }
+        self.render_targets(targets, ignore_class_not_found=self.ignore_class_not_found)
+        self._pending.difference_update(target_names)
+        if self._exports_changed(exports):
+            self.render_targets(
+                self.targets, ignore_class_not_found=self.ignore_class_not_found
+            )
+            self._pending.clear()
+            target_names = self.targets.keys()
+        # compiling sets kapitan.vars.target_full_path on the rendered targets:
+        # only dump the targets rendered again
+        if "inventory" in self.__dict__:
+            for name in target_names:
+                self.inventory[name] = self.targets[name].model_dump(by_alias=True)
+        for name in ("topics", "label_index", "_class_files"):
+            self.__dict__.pop(name, None)
+
+    def _class_name(self, path: str) -> str | None:
+        """
+        name of the class defined by the file at path, None if it isn't a class file
+        """
+        relative_path = os.path.relpath(os.path.abspath(path), self.classes_path)
+        name, ext = os.path.splitext(relative_path)
+        if relative_path.startswith(os.pardir) or ext not in (".yml", ".yaml"):
+            return None
+        name = name.replace(os.sep, ".")
+        # classes/app/init.yml defines class app
+        return name.removesuffix(".init")
+
+    def targets_affected_by(self, paths) -> set[str] | None:
+        """
+        names of the targets whose rendering depends on the inventory files in paths.
+        Returns None when that can't be told from the rendered targets, e.g. when
+        a target was added or removed or a class isn't used by any target.
+        """
+        self.render_pending()
+        classes_path = os.path.abspath(self.classes_path)
+        targets_path = os.path.abspath(self.targets_path)
+        target_names = {
+            os.path.join(targets_path, target.path): name
+            for name, target in self.targets.items()
+        }
+        affected = set()
+        for path in paths:
+            path = os.path.abspath(path)
+            if path.startswith(targets_path + os.sep):
+                name = target_names.get(path)
+                if name is None or not os.path.exists(path):
+                    return None
+                affected.add(name)
+            elif path.startswith(classes_path + os.sep):
+                class_name = self._class_name(path)
+                if class_name is None:
+                    continue
+                users = {
+                    name
+                    for name, target in self.targets.items()
+                    if class_name in target.classes
+                }
+                if not users:
+                    return None
+                affected |= users
+            else:
+                return None
+        return affected
+
     def migrate(self):
         """
         migrate the inventory, e.g. change interpolation syntax to new syntax
@@ -250,3 +495,35 @@ class Inventory(ABC):
 
     def __getitem__(self, key):
         return self.inventory[key]
+
+
+class LazyInventory(Mapping):
+    """
+    inventory of every target of a lazy inventory, rendering the targets when
+    they are looked up. Iterating renders every target.
+    """
+
+    def __init__(self, inventory: Inventory):
+        self._inventory = inventory
+        self._dumps = {}
+
+    def __getitem__(self, name):
+        if name not in self._dumps:
+            target = self._inventory.get_target(name)
+            if target is None:
+                raise KeyError(name)
+            self._dumps[name] = target.model_dump(by_alias=True)
+        return self._dumps[name]
+
+    def __setitem__(self, name, value):
+        self._dumps[name] = value
+
+    def __iter__(self):
+        self._inventory.render_pending()
+        return iter(self._inventory.targets)
+
+    def __len__(self):
+        return len(self._inventory.targets)
+
+    def __contains__(self, name):
+        return name in self._inventory.targets
@@ -0,0 +1,112 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Select targets by their ``parameters.kapitan.labels``.
+
+Selectors follow the Kubernetes label selector syntax, requirements separated
+by commas must all match:
+
+- ``key=value`` (or ``key==value``) and ``key!=value``
+- ``key in (value1,value2)`` and ``key notin (value1,value2)``
+- ``!key``: targets without the label
+
+As in Kubernetes, ``!=`` and ``notin`` also match targets without the label.
+Selectors are evaluated as set operations on a :class:`LabelIndex`, built once
+per rendered inventory, instead of comparing the labels of every target.
+"""
+
+import re
+from dataclasses import dataclass
+
+
+_SET_REQUIREMENT = re.compile(r"^\s*([^\s!=,()]+)\s+(in|notin)\s+\(([^()]*)\)\s*$")
+_REQUIREMENT = re.compile(r"^\s*([^\s!=,()]+)\s*(==|!=|=)\s*([^\s!=,()]*)\s*$")
+_ABSENT_REQUIREMENT = re.compile(r"^\s*!\s*([^\s!=,()]+)\s*$")
+
+
+@dataclass(frozen=True)
+class Requirement:
+    """One requirement of a selector, operator is one of =, !=, in, notin, !."""
+
+    key: str
+    operator: str
+    values: frozenset = frozenset()
+
+
+def _split_requirements(selector: str) -> list[str]:
+    """Split selector on the commas that aren't inside a value list."""
+    parts, depth, start = [], 0, 0
+    for i, char in enumerate(selector):
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            parts.append(selector[start:i])
+            start = i + 1
+    parts.append(selector[start:])
+    return parts
+
+
+def parse_selector(selector: str) -> list[Requirement]:
+    """Parse selector, raises ValueError if it isn't valid."""
+    requirements = []
+    for part in _split_requirements(selector):
+        if match := _SET_REQUIREMENT.match(part):
+            key, operator, values = match.groups()
+            values = frozenset(value.strip() for value in values.split(","))
+            requirements.append(Requirement(key, operator, values - {""}))
+        elif match := _REQUIREMENT.match(part):
+            key, operator, value = match.groups()
+            operator = "=" if operator == "==" else operator
+            requirements.append(Requirement(key, operator, frozenset([value])))
+        elif match := _ABSENT_REQUIREMENT.match(part):
+            requirements.append(Requirement(match.group(1), "!"))
+        else:
+            raise ValueError(f"invalid label selector '{selector}'")
+    return requirements
+
+
+class LabelIndex:
+    """Target names by label key and value."""
+
+    def __init__(self, targets):
+        # label key -> label value -> target names
+        self.index: dict[str, dict[str, set[str]]] = {}
+        self.names: set[str] = set()
+        for name, target in targets.items():
+            self.names.add(name)
+            if not target.parameters or not target.parameters.kapitan:
+                continue
+            for key, value in target.parameters.kapitan.labels.items():
+                self.index.setdefault(key, {}).setdefault(value, set()).add(name)
+
+    def _matching(self, key: str, values) -> set[str]:
+        """Targets whose label key has one of values."""
+        by_value = self.index.get(key, {})
+        return set().union(*(by_value.get(value, ()) for value in values))
+
+    def _labelled(self, key: str) -> set[str]:
+        return set().union(*self.index.get(key, {}).values())
+
+    def match(self, requirement: Requirement) -> set[str]:
+        """Targets matching requirement."""
+        if requirement.operator in ("=", "in"):
+            return self._matching(requirement.key, requirement.values)
+        if requirement.operator in ("!=", "notin"):
+            return self.names - self._matching(requirement.key, requirement.values)
+        return self.names - self._labelled(requirement.key)
+
+    def select(self, selectors) -> set[str]:
+        """Targets matching every requirement of every selector."""
+        requirements = [
+            requirement
+            for selector in selectors
+            for requirement in parse_selector(selector)
+        ]
+        selected = set(self.names)
+        for requirement in requirements:
+            selected &= self.match(requirement)
+        return selected
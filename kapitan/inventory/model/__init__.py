@@ -22,6 +22,9 @@ class KapitanInventorySettings(BaseModel):
     vars: KapitanEssentialVars = KapitanEssentialVars()
     labels: dict[str, str] = {}
     dependencies: list[DependencyTypeConfig] | None = []
+    # names of the targets whose compiled output this target reads, compiled
+    # before it (see kapitan.scheduling.target_dependencies)
+    depends_on: list[str] = []
     target_full_path: str = ""
     secrets: KapitanReferenceConfig | None = None
     validate_: list[dict] = Field(alias="validate", default=[])
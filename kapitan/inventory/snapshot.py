@@ -0,0 +1,188 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Inventory snapshots for compile pool workers.
+
+With the spawn and forkserver start methods, pool workers don't inherit the
+rendered inventory. Instead of pickling the whole ``cached`` state into every
+worker, the parent writes it once to a snapshot file in which every target,
+every ``inventory_global`` entry and the aggregated topics are pickled
+separately. Workers ``mmap`` the file (so the page cache is shared between
+them) and only unpickle the entries they actually look up.
+
+The targets a lazy inventory (see ``compile -t``) didn't render yet are not
+in the snapshot: workers render them with the inventory backend on lookup.
+
+Layout: the pickled entries back to back, then the pickled index mapping each
+entry to its ``(offset, length)``, then a fixed size trailer holding the
+offset and length of the index.
+"""
+
+import functools
+import logging
+import mmap
+import pickle
+import struct
+from collections.abc import Mapping
+
+from kapitan.errors import InventoryError
+from kapitan.inventory.inventory import Inventory
+
+
+logger = logging.getLogger(__name__)
+
+_TRAILER = struct.Struct("<QQ")
+
+# Inventory attributes stored as separate, lazily loaded entries.
+_LAZY_ATTRIBUTES = ("targets", "inventory", "topics", "_pending")
+
+
+class SnapshotMapping(Mapping):
+    """Read-only mapping that unpickles values from a snapshot on first access.
+
+    Keys indexed as None weren't rendered when the snapshot was written, their
+    values are returned by render instead.
+    """
+
+    def __init__(self, buffer, index: dict, render=None):
+        self._buffer = buffer
+        self._index = index
+        self._render = render
+        self._values = {}
+
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            entry = self._index[key]
+            if entry is None:
+                value = self._render(key)
+            else:
+                offset, length = entry
+                value = pickle.loads(self._buffer[offset : offset + length])
+            self._values[key] = value
+            return value
+
+    def __iter__(self):
+        return iter(self._index)
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, key):
+        return key in self._index
+
+
+class SnapshotInventory(Inventory):
+    """Read-only inventory restored from an :class:`InventorySnapshot`.
+
+    Targets, their rendered inventory and the aggregated topics are only
+    unpickled when looked up.
+    """
+
+    def __init__(self, buffer, index: dict):
+        # the inventory was rendered by the parent: skip Inventory.__init__
+        self.__dict__.update(index["attributes"])
+        self._buffer = buffer
+        self._index = index
+        self._pending = set()
+        self.targets = SnapshotMapping(buffer, index["targets"], self._render_target)
+
+    @functools.cached_property
+    def _backend(self) -> Inventory:
+        """inventory rendering the targets the snapshot doesn't hold"""
+        return self._index["backend"](
+            inventory_path=self.inventory_path,
+            compose_target_name=self.compose_target_name,
+            ignore_class_not_found=self.ignore_class_not_found,
+            lazy=True,
+        )
+
+    def _render_target(self, name: str):
+        return self._backend.get_target(name)
+
+    def _render_inventory(self, name: str) -> dict:
+        return self._backend.inventory[name]
+
+    @functools.cached_property
+    def inventory(self) -> Mapping:
+        return SnapshotMapping(
+            self._buffer, self._index["inventory"], self._render_inventory
+        )
+
+    @functools.cached_property
+    def topics(self) -> dict:
+        if self._index["topics"] is None:
+            return self._backend.topics
+        offset, length = self._index["topics"]
+        return pickle.loads(self._buffer[offset : offset + length])
+
+    def render_targets(self, targets=None, ignore_class_not_found=False):
+        raise InventoryError("Inventory snapshots are read-only")
+
+
+class InventorySnapshot:
+    """Handle to a snapshot file of the ``cached`` state, cheap to pickle."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    @classmethod
+    def write(cls, path: str, state: dict) -> "InventorySnapshot":
+        """Write state (see :func:`kapitan.cached.as_dict`) to path."""
+        inv = state["inv"]
+        # targets of a lazy inventory that weren't rendered yet, see Inventory.lazy
+        pending = getattr(inv, "_pending", set())
+        index = {"targets": {}, "inventory": {}, "backend": type(inv)}
+        with open(path, "wb") as fp:
+
+            def dump(value):
+                data = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+                offset = fp.tell()
+                fp.write(data)
+                return offset, len(data)
+
+            for name, target in inv.targets.items():
+                index["targets"][name] = None if name in pending else dump(target)
+            for name in inv.targets:
+                index["inventory"][name] = (
+                    None if name in pending else dump(state["global_inv"][name])
+                )
+            index["topics"] = None if pending else dump(inv.topics)
+            index["attributes"] = {
+                key: value
+                for key, value in vars(inv).items()
+                if key not in _LAZY_ATTRIBUTES
+            }
+            index["state"] = {
+                key: value
+                for key, value in state.items()
+                if key not in ("inv", "global_inv")
+            }
+
+            index_offset, index_length = dump(index)
+            fp.write(_TRAILER.pack(index_offset, index_length))
+            size = fp.tell()
+
+        logger.debug(
+            "Wrote inventory snapshot of %d targets (%d bytes) to %s",
+            len(index["targets"]),
+            size,
+            path,
+        )
+        return cls(path)
+
+    def load(self) -> dict:
+        """Map the snapshot and return a state dict for
+        :func:`kapitan.cached.from_dict`."""
+        with open(self.path, "rb") as fp:
+            # the mapping stays valid after the file is closed (or deleted)
+            buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        index_offset, index_length = _TRAILER.unpack(buffer[-_TRAILER.size :])
+        index = pickle.loads(buffer[index_offset : index_offset + index_length])
+
+        inv = SnapshotInventory(buffer, index)
+        return {**index["state"], "inv": inv, "global_inv": inv.inventory}
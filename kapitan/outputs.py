@@ -0,0 +1,245 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Commit compiled output into the output path.
+
+Targets are compiled into a staging directory first. Instead of replacing the
+whole ``compiled/`` tree, :func:`sync_tree` compares the staged tree with the
+existing output (size and mode first, then content, chunk by chunk) and only
+writes files that actually changed, deletes stale ones and leaves unchanged
+files (and their mtimes) untouched. This keeps downstream tooling that relies
+on mtimes or inode changes (rsync, git status, ArgoCD diffing) fast.
+
+``kapitan compile --check`` only compares the trees, with :func:`diff_trees`,
+and leaves the output path alone.
+"""
+
+import logging
+import os
+import shutil
+import stat
+from dataclasses import dataclass, field
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TreeDiff:
+    """Relative file paths that differ between a staged tree and its destination."""
+
+    added: list[str] = field(default_factory=list)
+    changed: list[str] = field(default_factory=list)
+    removed: list[str] = field(default_factory=list)
+    unchanged: list[str] = field(default_factory=list)
+
+    @property
+    def modified(self) -> list[str]:
+        """Every path that was (or would be) written or deleted, sorted."""
+        return sorted(self.added + self.changed + self.removed)
+
+    def extend(self, other: "TreeDiff", prefix: str = "") -> None:
+        """Merge other into this diff, prefixing its paths with prefix."""
+        for name in ("added", "changed", "removed", "unchanged"):
+            getattr(self, name).extend(
+                os.path.join(prefix, path) for path in getattr(other, name)
+            )
+
+
+CHUNK_SIZE = 65536
+
+
+def _same_content(src: str, dst: str) -> bool:
+    """Compare src and dst chunk by chunk, stopping at the first difference."""
+    with open(src, "rb") as src_fp, open(dst, "rb") as dst_fp:
+        while True:
+            chunk = src_fp.read(CHUNK_SIZE)
+            if chunk != dst_fp.read(CHUNK_SIZE):
+                return False
+            if not chunk:
+                return True
+
+
+def files_equal(src: str, dst: str) -> bool:
+    """True if src and dst have the same mode, size and content."""
+    src_stat = os.stat(src)
+    dst_stat = os.stat(dst)
+    if stat.S_IMODE(src_stat.st_mode) != stat.S_IMODE(dst_stat.st_mode):
+        return False
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if os.path.samestat(src_stat, dst_stat):
+        return True
+    return _same_content(src, dst)
+
+
+def _list_tree(root: str, exclude=()) -> tuple[set[str], set[str]]:
+    """Return (relative file paths, relative directory paths) below root.
+
+    Directories whose relative path is in exclude are skipped entirely.
+    """
+    files, dirs = set(), set()
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.relpath(dirpath, root)
+        dirnames[:] = [
+            name
+            for name in dirnames
+            if os.path.normpath(os.path.join(rel_dir, name)) not in exclude
+        ]
+        for name in dirnames:
+            dirs.add(os.path.normpath(os.path.join(rel_dir, name)))
+        for name in filenames:
+            files.add(os.path.normpath(os.path.join(rel_dir, name)))
+    return files, dirs
+
+
+def diff_trees(src: str, dst: str, exclude=()) -> TreeDiff:
+    """Compare the staged tree src with the existing tree dst."""
+    src_files, _ = _list_tree(src, exclude)
+    dst_files, _ = _list_tree(dst, exclude)
+    diff = TreeDiff()
+    for path in sorted(src_files):
+        if path not in dst_files:
+            diff.added.append(path)
+        elif files_equal(os.path.join(src, path), os.path.join(dst, path)):
+            diff.unchanged.append(path)
+        else:
+            diff.changed.append(path)
+    diff.removed = sorted(dst_files - src_files)
+    return diff
+
+
+def _replace_file(src: str, dst: str) -> None:
+    """Copy src over dst so readers never observe a partially written dst."""
+    tmp_path = os.path.join(
+        os.path.dirname(dst), f".{os.path.basename(dst)}.kapitan-tmp"
+    )
+    shutil.copy2(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+def sync_tree(src: str, dst: str, move: bool = False, exclude=()) -> TreeDiff:
+    """Make dst identical to src, writing only what differs.
+
+    Added and changed files are copied (moved with move, which needs src and
+    dst on the same filesystem), files missing from src are deleted together
+    with directories that are no longer in src. Unchanged files are not
+    touched, neither is anything below the relative directories in exclude.
+    Returns the applied :class:`TreeDiff`.
+    """
+    diff = diff_trees(src, dst, exclude)
+    _, src_dirs = _list_tree(src, exclude)
+    _, dst_dirs = _list_tree(dst, exclude)
+
+    # stale files go first: one of them may be in the way of a new directory
+    for path in diff.removed:
+        target_path = os.path.join(dst, path)
+        if os.path.lexists(target_path):
+            os.remove(target_path)
+        logger.debug("Removed %s", target_path)
+
+    os.makedirs(dst, exist_ok=True)
+    for path in sorted(src_dirs - dst_dirs):
+        os.makedirs(os.path.join(dst, path), exist_ok=True)
+
+    for path in diff.added + diff.changed:
+        target_path = os.path.join(dst, path)
+        if os.path.isdir(target_path):
+            # a directory in dst became a file in src
+            shutil.rmtree(target_path)
+        if move:
+            os.replace(os.path.join(src, path), target_path)
+        else:
+            _replace_file(os.path.join(src, path), target_path)
+        logger.debug("Updated %s", target_path)
+
+    for path in sorted(dst_dirs - src_dirs, key=len, reverse=True):
+        target_path = os.path.join(dst, path)
+        if os.path.isdir(target_path) and not os.path.islink(target_path):
+            shutil.rmtree(target_path)
+
+    return diff
+
+
+def commit_tree(src: str, dst: str, exclude=()) -> TreeDiff:
+    """Move the staged tree src into place at dst, writing only what differs.
+
+    src must be on the same filesystem as dst. A new dst is renamed into
+    place as a whole, an existing one is updated with :func:`sync_tree`.
+    """
+    if not os.path.lexists(dst) and not exclude:
+        os.makedirs(os.path.dirname(dst) or ".", exist_ok=True)
+        files, _ = _list_tree(src)
+        os.rename(src, dst)
+        return TreeDiff(added=sorted(files))
+    return sync_tree(src, dst, move=True, exclude=exclude)
+
+
+def remove_stale_paths(root: str, keep, dry_run: bool = False) -> list[str]:
+    """Remove everything below root that isn't inside one of the relative keep paths.
+
+    Returns the relative paths of the removed files, which are only listed
+    with dry_run.
+    """
+    keep = {os.path.normpath(path) for path in keep}
+    # parents of kept paths are kept, but not what else they contain
+    parents = set()
+    for path in keep:
+        while path := os.path.dirname(path):
+            parents.add(path)
+    removed = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        rel_dir = os.path.normpath(os.path.relpath(dirpath, root))
+        for name in list(dirnames) + filenames:
+            rel_path = os.path.normpath(os.path.join(rel_dir, name))
+            if rel_path in keep or rel_path in parents:
+                continue
+            path = os.path.join(dirpath, name)
+            if name in dirnames and not os.path.islink(path):
+                files, _ = _list_tree(path)
+                removed.extend(os.path.join(rel_path, file) for file in files)
+                if not dry_run:
+                    shutil.rmtree(path)
+            else:
+                removed.append(rel_path)
+                if not dry_run:
+                    os.remove(path)
+            if not dry_run:
+                logger.debug("Removed %s", path)
+        dirnames[:] = [
+            name
+            for name in dirnames
+            if os.path.normpath(os.path.join(rel_dir, name)) in parents
+        ]
+    return sorted(removed)
+
+
+def merge_tree(src: str, dst: str) -> list[str]:
+    """Move every file below src into dst, replacing existing files.
+
+    src and dst must be on the same filesystem. Returns the relative paths of
+    the moved files.
+    """
+    files, dirs = _list_tree(src)
+    for path in sorted(dirs):
+        target_path = os.path.join(dst, path)
+        if os.path.lexists(target_path) and not os.path.isdir(target_path):
+            os.remove(target_path)
+        os.makedirs(target_path, exist_ok=True)
+    for path in sorted(files):
+        target_path = os.path.join(dst, path)
+        if os.path.isdir(target_path) and not os.path.islink(target_path):
+            shutil.rmtree(target_path)
+        os.makedirs(os.path.dirname(target_path), exist_ok=True)
+        os.replace(os.path.join(src, path), target_path)
+    shutil.rmtree(src)
+    return sorted(files)
+
+
+def write_changed_paths(path: str, changed_paths: list[str]) -> None:
+    """Write changed_paths to path, one per line."""
+    with open(path, "w") as fp:
+        fp.writelines(f"{changed_path}\n" for changed_path in changed_paths)
+    logger.debug("Wrote %d changed paths to %s", len(changed_paths), path)
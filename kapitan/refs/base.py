@@ -24,6 +24,7 @@ from kapitan.errors import (
     RefFromFuncError,
     RefHashMismatchError,
 )
+from kapitan.incremental import track_dependency
 from kapitan.refs import KapitanReferencesTypes
 from kapitan.refs.functions import eval_func, get_func_lookup
 from kapitan.utils import PrettyDumper, StrEnum, list_all_paths
@@ -168,6 +169,7 @@ class PlainRefBackend:
         # remove the substring notation, if any
         ref_file_path = re.sub(REF_TOKEN_SUBVAR_PATTERN, "", ref_path)
         full_ref_path = os.path.join(self.path, ref_file_path)
+        track_dependency(full_ref_path)
         ref = self.ref_type.from_path(full_ref_path, **self.ref_kwargs)
 
         if ref is not None:
@@ -21,8 +21,9 @@ class AWSKMSError(KapitanError):
 
 
 def awskms_obj():
-    if not cached.awskms_obj:
-        cached.awskms_obj = boto3.session.Session().client("kms")
+    with cached.lock:
+        if not cached.awskms_obj:
+            cached.awskms_obj = boto3.session.Session().client("kms")
     return cached.awskms_obj
 
 
@@ -31,12 +31,13 @@ class GoogleKMSError(KapitanError):
 
 
 def gkms_obj():
-    if not cached.gkms_obj:
-        # If --verbose is set, show requests from googleapiclient (which are actually logging.INFO)
-        if logger.getEffectiveLevel() > logging.DEBUG:
-            logging.getLogger("googleapiclient.discovery").setLevel(logging.ERROR)
-        kms_client = gcloud.build("cloudkms", "v1", cache_discovery=False)
-        cached.gkms_obj = kms_client.projects().locations().keyRings().cryptoKeys()
+    with cached.lock:
+        if not cached.gkms_obj:
+            # If --verbose is set, show requests from googleapiclient (which are actually logging.INFO)
+            if logger.getEffectiveLevel() > logging.DEBUG:
+                logging.getLogger("googleapiclient.discovery").setLevel(logging.ERROR)
+            kms_client = gcloud.build("cloudkms", "v1", cache_discovery=False)
+            cached.gkms_obj = kms_client.projects().locations().keyRings().cryptoKeys()
     return cached.gkms_obj
 
 
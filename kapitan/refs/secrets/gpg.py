@@ -35,8 +35,9 @@ class GPGError(Exception):
 
 
 def gpg_obj(*args, **kwargs):
-    if not cached.gpg_obj:
-        cached.gpg_obj = gnupg.GPG(*args, **kwargs)
+    with cached.lock:
+        if not cached.gpg_obj:
+            cached.gpg_obj = gnupg.GPG(*args, **kwargs)
     return cached.gpg_obj
 
 
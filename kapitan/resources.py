@@ -22,8 +22,9 @@ import yaml
 from kapitan import __file__ as kapitan_install_path
 from kapitan import cached
 from kapitan.errors import CompileError, InventoryError
+from kapitan.incremental import track_dependency, track_global_inventory
 from kapitan.inventory import Inventory, get_inventory_backend
-from kapitan.topics import topics
+from kapitan.topics import current_target, topics
 from kapitan.utils import (
     PrettyDumper,
     StrEnum,
@@ -145,6 +146,7 @@ def yaml_load(search_paths, name):
         logger.debug("yaml_load trying file %s", _full_path)
         if os.path.exists(_full_path) and name.endswith((".yml", ".yaml")):
             logger.debug("yaml_load found file at %s", _full_path)
+            track_dependency(_full_path)
             try:
                 with open(_full_path) as f:
                     return json.dumps(yaml.safe_load(f.read()))
@@ -163,6 +165,7 @@ def yaml_load_stream(search_paths, name):
         logger.debug("yaml_load_stream trying file %s", _full_path)
         if os.path.exists(_full_path) and name.endswith((".yml", ".yaml")):
             logger.debug("yaml_load_stream found file at %s", _full_path)
+            track_dependency(_full_path)
             try:
                 with open(_full_path) as f:
                     _obj = yaml.load_all(f.read(), Loader=yaml.SafeLoader)
@@ -182,6 +185,7 @@ def read_file(search_paths, name):
         logger.debug("read_file trying file %s", full_path)
         if os.path.exists(full_path):
             logger.debug("read_file found file at %s", full_path)
+            track_dependency(full_path)
             with open(full_path, newline="") as f:
                 return f.read()
 
@@ -197,6 +201,7 @@ def file_exists(search_paths, name):
         logger.debug("file_exists trying file %s", full_path)
         if os.path.exists(full_path):
             logger.debug("file_exists found file at %s", full_path)
+            track_dependency(full_path)
             return {"exists": True, "path": full_path}
 
     return {"exists": False, "path": ""}
@@ -208,6 +213,7 @@ def dir_files_list(search_paths, name):
         full_path = os.path.join(path, name)
         logger.debug("dir_files_list trying directory %s", full_path)
         if os.path.exists(full_path):
+            track_dependency(full_path)
             return [
                 f
                 for f in os.listdir(full_path)
@@ -243,6 +249,7 @@ def search_imports(cwd, import_str, search_paths):
     full_import_path = os.path.normpath(os.path.join(cwd, import_str))
 
     if full_import_path in JSONNET_CACHE:
+        track_dependency(full_import_path)
         return full_import_path, JSONNET_CACHE[full_import_path].encode()
 
     if not os.path.exists(full_import_path):
@@ -280,6 +287,7 @@ def search_imports(cwd, import_str, search_paths):
     )
 
     normalised_path_content = ""
+    track_dependency(normalised_path)
     with open(normalised_path) as f:
         normalised_path_content = f.read()
         JSONNET_CACHE[normalised_path] = normalised_path_content
@@ -324,10 +332,14 @@ def inventory(
     inv = get_inventory(full_inv_path)
 
     if target_name:
+        if target_name != current_target.get():
+            track_global_inventory()
         target = inv.get_target(target_name)
         return target.model_dump(by_alias=True)
 
-    return inv.inventory
+    track_global_inventory()
+    # a plain dict, pool workers may hold a lazily loaded inventory snapshot
+    return dict(inv.inventory)
 
 
 def generate_inventory(args):
@@ -409,6 +421,16 @@ def get_inventory(inventory_path, ignore_class_not_found: bool = False) -> Inven
         migrator = backend(inventory_path=inventory_path, initialise=False)
         migrator.migrate()
 
+    # with compile -t or inventory -t only the requested targets are rendered,
+    # the other targets are rendered when looked up, see Inventory.render_pending
+    inventory_cache = getattr(cached.args, "inventory_cache", False) is True
+    requested_targets = getattr(cached.args, "targets", None)
+    target_name = getattr(cached.args, "target_name", None)
+    if not isinstance(requested_targets, list):
+        requested_targets = []
+    if isinstance(target_name, str) and target_name:
+        requested_targets = [target_name]
+
     logger.debug(f"Using {backend.__name__} as inventory backend")
     try:
         enable_class_wildcards = (
@@ -420,6 +442,8 @@ def get_inventory(inventory_path, ignore_class_not_found: bool = False) -> Inven
             compose_target_name=compose_target_name,
             ignore_class_not_found=ignore_class_not_found,
             enable_class_wildcards=enable_class_wildcards,
+            cache=inventory_cache,
+            lazy=not inventory_cache and bool(requested_targets),
         )
     except InventoryError:
         sys.exit(1)
@@ -0,0 +1,350 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Cost-aware scheduling of compile tasks.
+
+Wall-clock compile durations of every target are persisted per output path
+(next to the incremental fingerprints, see
+:func:`kapitan.incremental.compile_state_dir`). On later runs targets are
+dispatched longest-first (LPT scheduling) so a few slow, helm heavy targets do
+not end up being compiled last on a single core while every other worker is
+idle. Targets without history get an estimate derived from their compile
+entries.
+
+The peak RSS of the worker while it compiled each target is persisted too,
+so the default parallelism can be bounded by the memory available (see
+:func:`memory_bounded_workers`).
+
+Targets reading the compiled output of other targets declare them in
+``parameters.kapitan.depends_on``. Targets of a run are then scheduled as a
+graph (see :func:`target_dependencies` and :func:`run_task_graph`): a target
+is dispatched as soon as the targets it depends on are compiled.
+"""
+
+import heapq
+import json
+import logging
+import os
+import queue
+from collections import defaultdict
+
+from kapitan.errors import CompileError, KapitanError
+from kapitan.incremental import compile_state_dir
+
+
+logger = logging.getLogger(__name__)
+
+# Relative cost of a compile entry by input type, used for targets that were
+# never compiled before. Input types shelling out to external binaries are
+# usually the slowest.
+INPUT_TYPE_WEIGHTS = {
+    "helm": 4.0,
+    "kustomize": 2.0,
+    "cuelang": 2.0,
+    "external": 2.0,
+}
+DEFAULT_INPUT_TYPE_WEIGHT = 1.0
+
+# Seconds per unit of weight when there is no history at all.
+DEFAULT_SECONDS_PER_WEIGHT = 0.1
+
+# Targets are batched into pool tasks of at least this many estimated seconds,
+# so runs with thousands of tiny targets aren't dominated by per-task IPC.
+TASK_BATCH_SECONDS = 0.25
+
+# Minimum number of pool tasks per worker, so batching doesn't hurt balance.
+MIN_TASKS_PER_WORKER = 4
+
+# Weight of the latest measurement in the stored (moving average) duration.
+SMOOTHING = 0.5
+
+
+def memory_bounded_workers(memory: int, worker_rss: int) -> int:
+    """Number of workers of worker_rss bytes each that fit in memory, at least 1."""
+    return max(1, memory // max(worker_rss, 1))
+
+
+def target_weight(target_config) -> float:
+    """Size heuristic for a target: the weighted number of its compile entries."""
+    weight = 0.0
+    for compile_config in target_config.compile:
+        weight += INPUT_TYPE_WEIGHTS.get(
+            compile_config.input_type, DEFAULT_INPUT_TYPE_WEIGHT
+        )
+    return max(weight, DEFAULT_INPUT_TYPE_WEIGHT)
+
+
+def predict_makespan(costs, workers: int) -> float:
+    """Wall-clock time of running costs, in the given order, on workers processes.
+
+    Every task goes to the worker that becomes idle first, which is how
+    ``Pool.imap_unordered`` hands out tasks with ``chunksize=1``.
+    """
+    finish_times = [0.0] * max(workers, 1)
+    for cost in costs:
+        heapq.heapreplace(finish_times, finish_times[0] + cost)
+    return max(finish_times)
+
+
+def batch_tasks(names, estimates: dict[str, float], workers: int) -> list[list]:
+    """Group names, in dispatch order, into batches compiled as one pool task.
+
+    Consecutive names are added to a batch until its estimated duration
+    reaches the batch size, so slow targets keep a task of their own while
+    tiny ones are sent together. The batch size shrinks for short runs so
+    every worker still gets MIN_TASKS_PER_WORKER tasks.
+    """
+    total = sum(estimates[name] for name in names)
+    batch_seconds = min(
+        TASK_BATCH_SECONDS, total / (max(workers, 1) * MIN_TASKS_PER_WORKER)
+    )
+    batches = []
+    batch, cost = [], 0.0
+    for name in names:
+        batch.append(name)
+        cost += estimates[name]
+        if cost >= batch_seconds:
+            batches.append(batch)
+            batch, cost = [], 0.0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+class CompileStats:
+    """Persisted per-target compile durations and worker RSS for an output path."""
+
+    FILENAME = "stats.json"
+
+    def __init__(self, output_path: str):
+        try:
+            self.path = os.path.join(compile_state_dir(output_path), self.FILENAME)
+        except KapitanError as e:
+            logger.debug("Not recording compile durations: %s", e)
+            self.path = None
+        self.durations: dict[str, float]
+        self.rss: dict[str, int]
+        self.durations, self.rss = self._load()
+
+    def _load(self) -> tuple[dict, dict]:
+        """Return the recorded (durations, rss)."""
+        if self.path is None:
+            return {}, {}
+        try:
+            with open(self.path) as fp:
+                stats = json.load(fp)
+            return stats.get("durations", {}), stats.get("peak_rss", {})
+        except FileNotFoundError:
+            return {}, {}
+        except (OSError, ValueError, AttributeError) as e:
+            logger.warning("Ignoring unreadable compile stats at %s: %s", self.path, e)
+            return {}, {}
+
+    def _seconds_per_weight(self, target_objs) -> float:
+        """Average seconds per unit of weight over targets with history."""
+        seconds = weight = 0.0
+        for target_config in target_objs:
+            duration = self.durations.get(target_config.vars.target)
+            if duration is not None:
+                seconds += duration
+                weight += target_weight(target_config)
+        if not weight:
+            return DEFAULT_SECONDS_PER_WEIGHT
+        return seconds / weight
+
+    def estimates(self, target_objs) -> dict[str, float]:
+        """Estimated compile duration in seconds, keyed by target name."""
+        seconds_per_weight = self._seconds_per_weight(target_objs)
+        estimates = {}
+        for target_config in target_objs:
+            target_name = target_config.vars.target
+            duration = self.durations.get(target_name)
+            if duration is None:
+                duration = target_weight(target_config) * seconds_per_weight
+            estimates[target_name] = duration
+        return estimates
+
+    def peak_rss(self, target_names) -> int | None:
+        """Largest peak RSS recorded for a worker compiling any of target_names."""
+        return max(
+            (self.rss[name] for name in target_names if name in self.rss),
+            default=None,
+        )
+
+    def record(self, target_name: str, duration: float, rss: int | None = None) -> None:
+        previous = self.durations.get(target_name)
+        if previous is not None:
+            duration = SMOOTHING * duration + (1 - SMOOTHING) * previous
+        self.durations[target_name] = round(duration, 4)
+        if rss is not None:
+            self.rss[target_name] = rss
+
+    def save(self) -> None:
+        if self.path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with open(tmp_path, "w") as fp:
+                json.dump(
+                    {"durations": self.durations, "peak_rss": self.rss},
+                    fp,
+                    sort_keys=True,
+                )
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning("Could not save compile stats to %s: %s", self.path, e)
+            return
+        logger.debug(
+            "Saved compile durations of %d targets to %s",
+            len(self.durations),
+            self.path,
+        )
+
+
+def order_longest_first(target_objs, estimates: dict[str, float]) -> list:
+    """Sort target_objs by descending estimated duration (LPT order).
+
+    The sort is stable, so targets with equal estimates keep inventory order.
+    """
+    return sorted(
+        target_objs, key=lambda target: estimates[target.vars.target], reverse=True
+    )
+
+
+def find_cycle(dependencies: dict) -> list | None:
+    """A dependency cycle as [a, b, ..., a], or None if dependencies form a DAG."""
+    visited = set()
+    for start in dependencies:
+        if start in visited:
+            continue
+        # depth first, path holds the keys being visited and their pending
+        # dependencies
+        path = [(start, iter(sorted(dependencies.get(start, ()))))]
+        on_path = {start}
+        visited.add(start)
+        while path:
+            key, pending = path[-1]
+            dependency = next(pending, None)
+            if dependency is None:
+                on_path.discard(key)
+                path.pop()
+            elif dependency in on_path:
+                keys = [key for key, _ in path]
+                return keys[keys.index(dependency) :] + [dependency]
+            elif dependency not in visited:
+                visited.add(dependency)
+                on_path.add(dependency)
+                path.append(
+                    (dependency, iter(sorted(dependencies.get(dependency, ()))))
+                )
+    return None
+
+
+def target_dependencies(target_objs, known_targets) -> dict[str, set[str]]:
+    """The ``depends_on`` targets of target_objs that are compiled along with them.
+
+    Dependencies on known targets that are not compiled in this run are left
+    out: their compiled output is expected to be in place already. Raises
+    CompileError for unknown targets and dependency cycles.
+    """
+    declared = {target.vars.target: list(target.depends_on) for target in target_objs}
+    for target_name, depends_on in declared.items():
+        unknown = sorted(set(depends_on) - set(known_targets))
+        if unknown:
+            raise CompileError(
+                f"Target {target_name} depends on unknown targets: {unknown}"
+            )
+    cycle = find_cycle(declared)
+    if cycle:
+        raise CompileError(f"Target dependency cycle: {' -> '.join(cycle)}")
+    return {
+        target_name: {name for name in depends_on if name in declared}
+        for target_name, depends_on in declared.items()
+    }
+
+
+def order_dependencies_first(target_objs, dependencies: dict) -> list:
+    """Sort target_objs so every target comes after the targets it depends on.
+
+    Otherwise the order of target_objs is kept, so LPT order is preserved as
+    far as the dependencies allow. dependencies must not have cycles.
+    """
+    position = {target.vars.target: i for i, target in enumerate(target_objs)}
+    remaining = {
+        name: {
+            dependency
+            for dependency in dependencies.get(name, ())
+            if dependency in position
+        }
+        for name in position
+    }
+    dependents = defaultdict(list)
+    for name, keys in remaining.items():
+        for dependency in keys:
+            dependents[dependency].append(name)
+
+    ready = [position[name] for name, keys in remaining.items() if not keys]
+    heapq.heapify(ready)
+    ordered = []
+    while ready:
+        target = target_objs[heapq.heappop(ready)]
+        ordered.append(target)
+        for dependent in dependents[target.vars.target]:
+            remaining[dependent].discard(target.vars.target)
+            if not remaining[dependent]:
+                heapq.heappush(ready, position[dependent])
+    return ordered
+
+
+def run_task_graph(pool, worker, tasks: dict, dependencies: dict, on_result) -> None:
+    """Run worker(task) for every task once all the tasks it depends on completed.
+
+    ``tasks`` maps a key to the argument passed to worker and is dispatched in
+    its iteration order. ``dependencies`` maps a key to the keys it waits for.
+    ``on_result(key, result)`` is called in the calling thread as results come
+    in, before any task depending on ``key`` is dispatched. With ``pool=None``
+    the tasks run serially in the calling process.
+
+    The first failing task re-raises its exception here.
+    """
+    remaining = {key: set(dependencies.get(key, ())) for key in tasks}
+    dependents = defaultdict(list)
+    for key, keys in remaining.items():
+        for dependency in keys:
+            dependents[dependency].append(key)
+
+    ready = [key for key in tasks if not remaining[key]]
+    done = queue.SimpleQueue()
+    running = completed = 0
+
+    while completed < len(tasks):
+        for key in ready:
+            if pool is None:
+                done.put((key, True, worker(tasks[key])))
+            else:
+                pool.apply_async(
+                    worker,
+                    (tasks[key],),
+                    callback=lambda result, key=key: done.put((key, True, result)),
+                    error_callback=lambda e, key=key: done.put((key, False, e)),
+                )
+            running += 1
+        ready = []
+
+        if not running:
+            blocked = sorted(str(key) for key in tasks if remaining[key])
+            raise KapitanError(f"Tasks can never run, dependencies missing: {blocked}")
+
+        key, succeeded, result = done.get()
+        running -= 1
+        completed += 1
+        if not succeeded:
+            raise result
+        on_result(key, result)
+        for dependent in dependents[key]:
+            remaining[dependent].discard(key)
+            if not remaining[dependent]:
+                ready.append(dependent)
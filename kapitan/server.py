@@ -0,0 +1,217 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+``kapitan serve``: a long-lived process answering kapitan commands.
+
+The server renders the inventory once and keeps it, the ref controllers and a
+:class:`kapitan.targets.CompilePool` warm between requests. It runs
+``compile``, ``inventory`` and ``refs --reveal`` command lines sent over a
+local Unix socket by :mod:`kapitan.client`, one at a time.
+
+Before every request the inventory, the refs and every file read by earlier
+compiles are checked for changes, which are handled as in
+``kapitan compile --watch`` (see :class:`kapitan.watch.CompileWatch`):
+affected targets are rendered again. Compiles are incremental unless the
+server was started with ``--no-incremental``.
+"""
+
+import contextlib
+import io
+import logging
+import os
+import socket
+import socketserver
+import sys
+import tempfile
+
+from kapitan import cached
+from kapitan.client import recv_message, send_message
+from kapitan.errors import KapitanError
+from kapitan.refs.base import RefController, Revealer
+from kapitan.refs.cmd_parser import ref_reveal
+from kapitan.resources import generate_inventory, get_inventory
+from kapitan.targets import CompilePool, worker_memory_limit, worker_task_limit
+from kapitan.tool_runner import new_tool_slots
+from kapitan.utils import available_cpu_count
+from kapitan.watch import CompileWatch, PollingWatcher
+
+
+logger = logging.getLogger(__name__)
+
+SERVED_COMMANDS = ("compile", "inventory", "refs")
+
+
+def exit_code(error: SystemExit) -> int:
+    """Exit code of a command exiting with error, like the interpreter's."""
+    if error.code is None:
+        return 0
+    if isinstance(error.code, int):
+        return error.code
+    # sys.exit("message") prints the message and fails
+    print(error.code, file=sys.stderr)
+    return 1
+
+
+class RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        message = recv_message(self.request)
+        if message is None:
+            return
+        send_message(self.request, self.server.run(message["argv"], message["cwd"]))
+
+
+class CompileServer(socketserver.UnixStreamServer):
+    """Serve kapitan command lines on socket_path.
+
+    parser is the kapitan argument parser requests are parsed with, args the
+    parsed ``kapitan serve`` arguments.
+    """
+
+    def __init__(self, socket_path, parser, args, compile_pool):
+        self.parser = parser
+        self.args = args
+        self.inventory_path = os.path.abspath(args.inventory_path)
+        # CompileWatch turns args.incremental on for itself
+        self.incremental = args.incremental
+        self.compile_pool = compile_pool
+        self.ref_controllers = {}
+        self.watch = CompileWatch(self.inventory_path, [], None, args)
+        self.watch.watcher = PollingWatcher(
+            [self.inventory_path, os.path.abspath(args.refs_path)]
+        )
+        super().__init__(socket_path, RequestHandler)
+
+    def server_bind(self):
+        # the socket reveals refs, only the user running the server may connect
+        umask = os.umask(0o177)
+        try:
+            super().server_bind()
+        finally:
+            os.umask(umask)
+
+    def ref_controller(self, refs_path, embed_refs=False) -> RefController:
+        key = (os.path.abspath(refs_path), embed_refs)
+        if key not in self.ref_controllers:
+            self.ref_controllers[key] = RefController(refs_path, embed_refs=embed_refs)
+        return self.ref_controllers[key]
+
+    def refresh(self) -> None:
+        """Drop the state derived from files changed since the last request."""
+        changed = self.watch.watcher.poll()
+        if not changed:
+            return
+        logger.info("%d files changed", len(changed))
+        # revealed refs are cached by the ref controllers
+        self.ref_controllers = {}
+        cached.args = self.args
+        self.watch.apply(changed, self.compile_pool)
+
+    def run(self, argv, cwd) -> dict:
+        """Run the command line argv from cwd, return its exit code and output."""
+        stdout, stderr = io.StringIO(), io.StringIO()
+        handler = logging.StreamHandler(stderr)
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        root_logger = logging.getLogger()
+        root_logger.addHandler(handler)
+        server_cwd = os.getcwd()
+        code = 0
+        try:
+            os.chdir(cwd)
+            with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                try:
+                    code = self._run(argv)
+                except SystemExit as e:
+                    code = exit_code(e)
+        except Exception as e:
+            logger.error("%s", e)
+            logger.debug("Request %s failed", argv, exc_info=True)
+            code = 1
+        finally:
+            os.chdir(server_cwd)
+            root_logger.removeHandler(handler)
+        logger.info("Served %s with exit code %d", " ".join(argv), code)
+        return {
+            "exit_code": code,
+            "stdout": stdout.getvalue(),
+            "stderr": stderr.getvalue(),
+        }
+
+    def _run(self, argv) -> int:
+        args = self.parser.parse_args(argv)
+        name = getattr(args, "name", None)
+        if name not in SERVED_COMMANDS or (name == "refs" and not args.reveal):
+            raise KapitanError(
+                "kapitan serve only runs compile, inventory and refs --reveal"
+            )
+        if os.path.abspath(args.inventory_path) != self.inventory_path:
+            raise KapitanError(
+                f"kapitan serve was started for the inventory in {self.inventory_path}"
+            )
+        self.refresh()
+        cached.args = args
+        if name == "compile":
+            return self._compile(args)
+        if name == "inventory":
+            generate_inventory(args)
+            return 0
+        if "-" in (args.file, args.ref_file):
+            raise KapitanError("kapitan serve can't reveal from stdin")
+        ref_reveal(args, self.ref_controller(args.refs_path))
+        return 0
+
+    def _compile(self, args) -> int:
+        if args.watch or args.shard or args.merge_shards:
+            raise KapitanError(
+                "--watch, --shard and --merge-shards are not supported by kapitan serve"
+            )
+        ref_controller = self.ref_controller(args.refs_path, args.embed_refs)
+        cached.ref_controller_obj = ref_controller
+        cached.revealer_obj = Revealer(ref_controller)
+        self.watch.args = args
+        self.watch.args.incremental = args.incremental or self.incremental
+        self.watch.search_paths = [os.path.abspath(path) for path in args.search_paths]
+        self.watch.ref_controller = ref_controller
+        return 0 if self.watch.compile(self.compile_pool) else 1
+
+    def server_close(self):
+        super().server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.server_address)
+
+
+def _remove_stale_socket(socket_path) -> None:
+    """Remove socket_path if no server is listening on it any more."""
+    if not os.path.exists(socket_path):
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        try:
+            sock.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)
+            return
+    raise KapitanError(f"A kapitan server is already listening on {socket_path}")
+
+
+def serve(parser, args) -> None:
+    """Render the inventory and serve requests until interrupted."""
+    _remove_stale_socket(args.socket)
+    get_inventory(args.inventory_path)
+    processes = args.parallelism or available_cpu_count()
+    with (
+        tempfile.TemporaryDirectory(prefix="kapitan-serve-") as seed_path,
+        CompilePool(
+            processes,
+            seed_path,
+            maxtasksperchild=worker_task_limit(args),
+            tool_slots=new_tool_slots(args),
+            max_rss=worker_memory_limit(args),
+        ) as compile_pool,
+        CompileServer(args.socket, parser, args, compile_pool) as server,
+    ):
+        logger.info("Serving on %s, press Ctrl+C to stop", args.socket)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            logger.info("Stopped serving")
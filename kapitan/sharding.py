@@ -0,0 +1,222 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Split a compile across machines.
+
+``kapitan compile --shard INDEX/TOTAL`` compiles only the targets assigned to
+one of TOTAL shards and records them in a shard manifest next to its
+``compiled/`` directory. The assignment is a hash of the target name, so every
+machine agrees on it without sharing any state and a target stays on the same
+shard when other targets are added or removed.
+
+``kapitan compile --merge-shards DIR [DIR ...]`` checks that the manifests
+found in the shard output paths cover every shard exactly once and assembles
+their output into ``compiled/``.
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from dataclasses import dataclass
+
+from kapitan.errors import CompileError
+from kapitan.outputs import TreeDiff, sync_tree
+
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = ".kapitan-shards"
+
+
+@dataclass(frozen=True)
+class Shard:
+    """One of total shards, index is 1-based."""
+
+    index: int
+    total: int
+
+    def __str__(self):
+        return f"{self.index}/{self.total}"
+
+    @property
+    def manifest_name(self) -> str:
+        return f"shard-{self.index}-of-{self.total}.json"
+
+
+def parse_shard(value: str) -> Shard:
+    """argparse type for --shard INDEX/TOTAL."""
+    try:
+        index, total = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{value}', expected INDEX/TOTAL, e.g. 1/4"
+        ) from None
+    if total < 1 or not 1 <= index <= total:
+        raise argparse.ArgumentTypeError(
+            f"invalid shard '{value}', INDEX must be between 1 and TOTAL"
+        )
+    return Shard(index, total)
+
+
+def shard_of(target_name: str, total: int) -> int:
+    """1-based shard a target is compiled on."""
+    digest = hashlib.blake2b(target_name.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % total + 1
+
+
+def shard_targets(target_names, shard: Shard) -> list:
+    """The target_names assigned to shard, in their original order."""
+    return [name for name in target_names if shard_of(name, shard.total) == shard.index]
+
+
+def write_shard_manifest(
+    output_path: str, shard: Shard, target_objs, selected, complete: bool
+) -> str:
+    """Record the targets compiled by shard in output_path.
+
+    selected holds every target selected before sharding and complete tells
+    whether that was every target of the inventory, so the merge step knows
+    whether it may remove the output of targets that no longer exist.
+    Targets of the shard missing from target_objs, e.g. without kapitan
+    parameters, are recorded as skipped.
+    """
+    manifest_dir = os.path.join(output_path, MANIFEST_DIR)
+    os.makedirs(manifest_dir, exist_ok=True)
+    path = os.path.join(manifest_dir, shard.manifest_name)
+    targets = {target.vars.target: target.target_full_path for target in target_objs}
+    manifest = {
+        "index": shard.index,
+        "total": shard.total,
+        "complete": complete,
+        "selected": sorted(selected),
+        "targets": targets,
+        "skipped": sorted(set(shard_targets(selected, shard)) - set(targets)),
+    }
+    with open(path, "w") as fp:
+        json.dump(manifest, fp, indent=2, sort_keys=True)
+    logger.info(
+        "Shard %s: compiled %d/%d targets", shard, len(target_objs), len(selected)
+    )
+    return path
+
+
+def _load_manifests(shard_paths) -> list[tuple[str, dict]]:
+    """Return (shard output path, manifest) for every manifest found."""
+    manifests = []
+    for shard_path in shard_paths:
+        manifest_dir = os.path.join(shard_path, MANIFEST_DIR)
+        if not os.path.isdir(manifest_dir):
+            raise CompileError(f"No shard manifests found in {shard_path}")
+        for name in sorted(os.listdir(manifest_dir)):
+            if not name.endswith(".json"):
+                continue
+            with open(os.path.join(manifest_dir, name)) as fp:
+                manifests.append((shard_path, json.load(fp)))
+    return manifests
+
+
+def _check_manifests(manifests) -> None:
+    """Raise CompileError unless manifests are one complete, consistent set."""
+    totals = {manifest["total"] for _, manifest in manifests}
+    if len(totals) != 1:
+        raise CompileError(
+            f"Shard manifests disagree on the number of shards: {totals}"
+        )
+    total = totals.pop()
+
+    indexes = sorted(manifest["index"] for _, manifest in manifests)
+    duplicates = sorted({index for index in indexes if indexes.count(index) > 1})
+    if duplicates:
+        raise CompileError(f"Shards found more than once: {duplicates}")
+    missing = sorted(set(range(1, total + 1)) - set(indexes))
+    if missing:
+        raise CompileError(f"Missing output of shards {missing} (of {total})")
+
+    selections = {tuple(manifest["selected"]) for _, manifest in manifests}
+    if len(selections) != 1:
+        raise CompileError(
+            "Shards were compiled with different target selections or inventories"
+        )
+    # selected targets without kapitan parameters are skipped by their shard
+    covered = [
+        name
+        for _, manifest in manifests
+        for name in [*manifest["targets"], *manifest.get("skipped", [])]
+    ]
+    if sorted(covered) != list(selections.pop()):
+        raise CompileError("Shard manifests don't cover the selected targets")
+
+
+def _copy_target(src: str, dst: str, exclude) -> None:
+    """Copy the tree src to dst, skipping the directories in exclude."""
+    for root, dirs, filenames in os.walk(src):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) not in exclude]
+        target_root = os.path.join(dst, os.path.relpath(root, src))
+        os.makedirs(target_root, exist_ok=True)
+        for name in filenames:
+            shutil.copy2(os.path.join(root, name), os.path.join(target_root, name))
+
+
+def merge_shards(shard_paths, output_path: str) -> TreeDiff:
+    """Assemble the compiled output of every shard into output_path/compiled.
+
+    When the shards compiled every target of the inventory, output of
+    targets that no longer exist is removed. Only files that changed are
+    written, see :func:`kapitan.outputs.sync_tree`.
+    """
+    manifests = _load_manifests(shard_paths)
+    if not manifests:
+        raise CompileError(f"No shard manifests found in {', '.join(shard_paths)}")
+    _check_manifests(manifests)
+
+    compile_path = os.path.join(output_path, "compiled")
+    target_paths = {
+        target_full_path: shard_path
+        for shard_path, manifest in manifests
+        for target_full_path in manifest["targets"].values()
+    }
+    os.makedirs(output_path, exist_ok=True)
+    # stage everything first: a shard path may be output_path itself
+    staging_path = tempfile.mkdtemp(prefix=".kapitan-merge-", dir=output_path)
+    try:
+        for target_full_path, shard_path in target_paths.items():
+            src = os.path.join(shard_path, "compiled", target_full_path)
+            if not os.path.isdir(src):
+                logger.debug("Target %s has no compiled output", target_full_path)
+                continue
+            # nested targets (--compose-target-name) come from their own shard
+            exclude = {
+                os.path.join(shard_path, "compiled", other)
+                for other in target_paths
+                if other.startswith(target_full_path + os.sep)
+            }
+            _copy_target(src, os.path.join(staging_path, target_full_path), exclude)
+
+        if all(manifest["complete"] for _, manifest in manifests):
+            diff = sync_tree(staging_path, compile_path)
+        else:
+            diff = TreeDiff()
+            for target_full_path in sorted(target_paths):
+                diff.extend(
+                    sync_tree(
+                        os.path.join(staging_path, target_full_path),
+                        os.path.join(compile_path, target_full_path),
+                    ),
+                    prefix=target_full_path,
+                )
+    finally:
+        shutil.rmtree(staging_path)
+
+    logger.info(
+        "Merged %d targets from %d shards into %s",
+        len(target_paths),
+        len(manifests),
+        compile_path,
+    )
+    return diff
@@ -0,0 +1,240 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Content-addressed cache of whole compiled targets.
+
+With ``kapitan compile --target-cache`` the ``compiled/<target>`` tree of every
+compiled target is stored in ``$XDG_CACHE_HOME/kapitan/targets``. Targets are
+looked up before compiling and, on a hit, restored without running any of
+their compile entries, whatever their input types.
+
+A target is looked up in two steps, like the incremental fingerprints (see
+:mod:`kapitan.incremental`):
+
+- its key is a digest of what is known before compiling it: the fingerprint
+  base (rendered inventory, output relevant flags, kapitan version, consumed
+  topics), the search paths and the versions of the tools its compile entries
+  run (helm, kustomize, cue, the jsonnet runtime).
+- every key holds a few entries, each listing the files read while compiling
+  the target together with their digests and the produced tree. The first
+  entry whose files all still have the recorded digests is a hit.
+
+File contents are stored once as blobs named after their digest and mode.
+Blobs are copied in and out of the cache rather than hard linked, so tools
+editing files in ``compiled/`` in place never modify a cached blob.
+"""
+
+import functools
+import json
+import logging
+import os
+import shutil
+import stat
+import subprocess
+
+from kapitan.incremental import (
+    GLOBAL_INVENTORY,
+    dependency_digest,
+    normalise_path,
+    object_digest,
+    path_digest,
+)
+from kapitan.inputs.cache import cache_home
+from kapitan.inventory.model.input_types import InputTypes
+
+
+logger = logging.getLogger(__name__)
+
+# Entries kept per key, most recently stored first.
+MAX_ENTRIES = 8
+
+TOOL_VERSION_TIMEOUT = 30
+
+
+@functools.cache
+def tool_version(*command: str) -> str:
+    """Output of command, run once per process, used as a tool version."""
+    try:
+        result = subprocess.run(
+            command,
+            capture_output=True,
+            check=False,
+            timeout=TOOL_VERSION_TIMEOUT,
+        )
+    except (OSError, subprocess.TimeoutExpired) as e:
+        logger.debug("Could not get version of %s: %s", command[0], e)
+        return "unknown"
+    return result.stdout.decode(errors="replace").strip() or f"exit {result.returncode}"
+
+
+def _jsonnet_version(use_go: bool) -> str:
+    from kapitan.inputs.jsonnet import select_jsonnet_runtime
+
+    try:
+        return getattr(select_jsonnet_runtime(use_go), "version", "unknown")
+    except ImportError:
+        return "missing"
+
+
+def tool_versions(target_config, args) -> dict[str, str]:
+    """Versions of the external tools and runtimes the target compiles with."""
+    versions = {}
+    for compile_config in target_config.compile:
+        input_type = compile_config.input_type
+        if input_type == InputTypes.HELM:
+            helm_path = compile_config.helm_path or os.getenv(
+                "KAPITAN_HELM_PATH", "helm"
+            )
+            versions[f"helm:{helm_path}"] = tool_version(helm_path, "version")
+        elif input_type == InputTypes.KUSTOMIZE:
+            kustomize_path = getattr(args, "kustomize_path", None) or "kustomize"
+            versions[f"kustomize:{kustomize_path}"] = tool_version(
+                kustomize_path, "version"
+            )
+        elif input_type == InputTypes.CUELANG:
+            cue_path = getattr(args, "cue_path", None) or "cue"
+            versions[f"cue:{cue_path}"] = tool_version(cue_path, "version")
+        elif input_type == InputTypes.JSONNET:
+            use_go = bool(getattr(args, "use_go_jsonnet", False))
+            versions["jsonnet"] = _jsonnet_version(use_go)
+    return versions
+
+
+class TargetCache:
+    """Compiled target trees in the kapitan cache.
+
+    ``global_inventory`` is a callable returning the rendered inventory of all
+    targets, only evaluated when an entry depends on it.
+    """
+
+    def __init__(self, global_inventory=None, path=None):
+        self.path = path or cache_home("targets")
+        self.global_inventory = global_inventory
+        self._digests: dict[str, str] = {}
+
+    def key(self, base: dict, search_paths, tools: dict) -> str:
+        """Cache key of a target from what is known before compiling it."""
+        return object_digest(
+            {
+                "base": base,
+                "search_paths": [normalise_path(path) for path in search_paths],
+                "tools": tools,
+            }
+        )
+
+    def digest(self, dependency: str) -> str:
+        """Current digest of a dependency, memoised for the lifetime of the cache."""
+        if dependency not in self._digests:
+            if dependency == GLOBAL_INVENTORY:
+                inventory = self.global_inventory() if self.global_inventory else {}
+                # a plain dict, the inventory may render its targets lazily
+                self._digests[dependency] = object_digest(dict(inventory))
+            else:
+                self._digests[dependency] = dependency_digest(dependency)
+        return self._digests[dependency]
+
+    def invalidate(self) -> None:
+        """Forget memoised digests, e.g. after compiling created or changed refs."""
+        self._digests.clear()
+
+    def _manifest_path(self, key: str) -> str:
+        return os.path.join(self.path, "manifests", key[:2], f"{key[2:]}.json")
+
+    def _blob_path(self, blob: str) -> str:
+        return os.path.join(self.path, "blobs", blob[:2], blob[2:])
+
+    def _load_entries(self, key: str) -> list[dict]:
+        try:
+            with open(self._manifest_path(key)) as fp:
+                return json.load(fp)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable target cache entry %s: %s", key, e)
+            return []
+
+    def lookup(self, key: str) -> dict | None:
+        """The entry stored for key whose dependencies are unchanged, if any."""
+        for entry in self._load_entries(key):
+            if all(
+                self.digest(dependency) == digest
+                for dependency, digest in entry["dependencies"].items()
+            ):
+                return entry
+        return None
+
+    def restore(self, entry: dict, path: str) -> bool:
+        """Recreate the tree of entry at path, False if a blob went missing."""
+        try:
+            for directory in entry["dirs"]:
+                os.makedirs(os.path.join(path, directory), exist_ok=True)
+            os.makedirs(path, exist_ok=True)
+            for name, link in entry["links"].items():
+                os.symlink(link, os.path.join(path, name))
+            for name, blob in entry["files"].items():
+                shutil.copy2(self._blob_path(blob), os.path.join(path, name))
+        except FileNotFoundError as e:
+            logger.warning("Ignoring incomplete target cache entry: %s", e)
+            shutil.rmtree(path, ignore_errors=True)
+            return False
+        return True
+
+    def _store_blob(self, file_path: str) -> str:
+        mode = stat.S_IMODE(os.stat(file_path).st_mode)
+        blob = f"{path_digest(file_path)}-{mode:o}"
+        blob_path = self._blob_path(blob)
+        if not os.path.exists(blob_path):
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            tmp_path = f"{blob_path}.{os.getpid()}.tmp"
+            shutil.copy2(file_path, tmp_path)
+            os.replace(tmp_path, blob_path)
+        return blob
+
+    def store(self, key: str, dependencies, path: str, exclude=()) -> None:
+        """Store the tree at path, produced by reading dependencies.
+
+        Relative directories in exclude (nested targets) are skipped.
+        """
+        entry = {
+            "dependencies": {
+                dependency: self.digest(dependency)
+                for dependency in sorted(
+                    {normalise_path(dependency) for dependency in dependencies}
+                )
+            },
+            "dirs": [],
+            "links": {},
+            "files": {},
+        }
+        for dirpath, dirnames, filenames in os.walk(path):
+            rel_dir = os.path.relpath(dirpath, path)
+            for name in list(dirnames):
+                rel_path = os.path.normpath(os.path.join(rel_dir, name))
+                if rel_path in exclude:
+                    dirnames.remove(name)
+                elif os.path.islink(os.path.join(dirpath, name)):
+                    entry["links"][rel_path] = os.readlink(os.path.join(dirpath, name))
+                else:
+                    entry["dirs"].append(rel_path)
+            for name in filenames:
+                file_path = os.path.join(dirpath, name)
+                rel_path = os.path.normpath(os.path.join(rel_dir, name))
+                if os.path.islink(file_path):
+                    entry["links"][rel_path] = os.readlink(file_path)
+                else:
+                    entry["files"][rel_path] = self._store_blob(file_path)
+
+        entries = [
+            other
+            for other in self._load_entries(key)
+            if other["dependencies"] != entry["dependencies"]
+        ]
+        entries = [entry, *entries][:MAX_ENTRIES]
+        manifest_path = self._manifest_path(key)
+        os.makedirs(os.path.dirname(manifest_path), exist_ok=True)
+        tmp_path = f"{manifest_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as fp:
+            json.dump(entries, fp, sort_keys=True)
+        os.replace(tmp_path, manifest_path)
@@ -7,50 +7,479 @@
 
 "kapitan targets"
 
+import contextlib
+import difflib
+import fnmatch
+import glob
 import logging
 import multiprocessing
 import os
+import pickle
 import shutil
+import socket
+import sys
 import tempfile
+import threading
 import time
+from collections import defaultdict, deque
+from dataclasses import dataclass, field
 from functools import partial
+from multiprocessing.pool import ThreadPool
 
 from reclass.errors import NotFoundError, ReclassException
 
 from kapitan import cached
 from kapitan.dependency_manager.base import fetch_dependencies
 from kapitan.errors import CompileError, InventoryError, KapitanError
+from kapitan.incremental import (
+    LOOKUP_PREFIX,
+    FingerprintStore,
+    args_digest,
+    lookup_dependency,
+    object_digest,
+    parse_lookup,
+    tracking,
+)
 from kapitan.inputs import CACHEABLE_INPUT_TYPES, get_compiler
-from kapitan.inputs.cache import CacheMetrics
+from kapitan.inputs.cache import CacheMetrics, count_lookups
+from kapitan.inventory.model.input_types import InputTypes
+from kapitan.inventory.snapshot import InventorySnapshot
+from kapitan.outputs import (
+    TreeDiff,
+    commit_tree,
+    diff_trees,
+    merge_tree,
+    remove_stale_paths,
+    write_changed_paths,
+)
 from kapitan.profiling import worker_profile
-from kapitan.resources import get_inventory
-from kapitan.utils import available_cpu_count
+from kapitan.report import (
+    build_compile_report,
+    current_rss,
+    peak_rss,
+    record_output_sizes,
+    reset_peak_rss,
+    write_compile_report,
+)
+from kapitan.resources import JSONNET_CACHE, get_inventory
+from kapitan.scheduling import (
+    CompileStats,
+    batch_tasks,
+    memory_bounded_workers,
+    order_dependencies_first,
+    order_longest_first,
+    predict_makespan,
+    run_task_graph,
+    target_dependencies,
+)
+from kapitan.sharding import shard_targets, write_shard_manifest
+from kapitan.target_cache import TargetCache, tool_versions
+from kapitan.tool_runner import new_tool_slots, set_tool_slots
+from kapitan.topics import consumed_topics_digest
+from kapitan.utils import available_cpu_count, available_memory, is_process_alive
+from kapitan.version import VERSION
 
 
 logger = logging.getLogger(__name__)
 
 
-def _pool_init(globals_cached, input_cache_metrics):
+@dataclass
+class TargetCompileResult:
+    """Outcome of compiling a single target, returned by compile_target().
+
+    ``dependencies`` holds every file (and the ``inventory_global``
+    pseudo-dependency) read while compiling, see :mod:`kapitan.incremental`.
+    The other fields feed the compile report, see :mod:`kapitan.report`.
+    ``files_written`` and ``bytes_written`` are filled in by the parent from
+    the staged output.
+    """
+
+    target_name: str
+    target_full_path: str
+    dependencies: set[str] = field(default_factory=set)
+    duration: float = 0.0
+    input_type_durations: dict[str, float] = field(default_factory=dict)
+    files_written: int = 0
+    bytes_written: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    # peak RSS of the compiling process while compiling the target
+    peak_rss: int | None = None
+
+
+# Compile entries that act on the output of the entries before them. With
+# --parallel-entries they wait for every earlier entry of their target, and
+# every later entry waits for them, see _is_barrier().
+BARRIER_INPUT_TYPES = (InputTypes.REMOVE, InputTypes.COPY, InputTypes.EXTERNAL)
+
+# Directory in the output path, next to compiled/, holding the directories
+# targets are staged in while compiling, see new_staging_path().
+STAGING_DIR = ".kapitan-staging"
+
+
+# Compile context of a pool worker, set once by _pool_init() so pool tasks
+# only need to carry target names.
+_worker_context: dict = {}
+
+
+@dataclass
+class CompileUnit:
+    """A single compile entry of a target, scheduled on its own with --parallel-entries.
+
+    ``compile_path`` is private to the unit when other entries of the same
+    target run concurrently, and is merged into the target output afterwards.
+    """
+
+    target_name: str
+    index: int
+    compile_path: str
+
+
+@dataclass
+class CompileUnitResult:
+    target_name: str
+    index: int
+    input_type: str
+    dependencies: set[str] = field(default_factory=set)
+    duration: float = 0.0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    peak_rss: int | None = None
+
+
+def _pool_init(
+    inventory_snapshot, input_cache_metrics, worker_context=None, tool_slots=None
+):
     """Pool initializer: seed each worker's `cached` module from the parent.
 
-    Called once per worker after fork/spawn. ``initargs`` is pickled once per
-    worker process, so the inventory snapshot is paid for at most once per
-    worker rather than once per task.
+    Called once per worker after fork/spawn. ``inventory_snapshot`` is an
+    :class:`InventorySnapshot` handle: the parent wrote the `cached` state to
+    a file once, workers map it and only unpickle the targets (and
+    ``inventory_global`` entries and topics) they actually look up.
 
-    On fork the parent's state is already inherited via copy-on-write so the
-    restore is skipped; on spawn the worker's `cached` is empty and gets
-    populated from the snapshot. When ``--inventory-pool-cache=False``
-    (``globals_cached is None``), workers keep whatever state they inherited
-    (the full cache on fork, an empty module on spawn).
+    On fork the parent's state is already inherited via copy-on-write so no
+    snapshot is written and the restore is skipped; on spawn/forkserver the
+    worker's `cached` is empty and gets populated from the snapshot. When
+    ``--inventory-pool-cache=False`` (``inventory_snapshot is None``), workers
+    keep whatever state they inherited (the full cache on fork, an empty
+    module on spawn).
 
     ``input_cache_metrics`` is a dict mapping input_type_name to a
     ``CacheMetrics`` backed by shared ``multiprocessing.Value`` counters.
     Forwarding it explicitly keeps the spawn start method working, where
     module globals don't cross the process boundary.
+
+    ``worker_context`` holds the ``search_paths``, ``compile_path``,
+    ``ref_controller`` and ``args`` shared by every compile task, so they are
+    sent once per worker instead of once per task.
+
+    ``tool_slots`` is the :class:`kapitan.tool_runner.ToolSlots` bounding the
+    external tools running at once in all workers.
     """
-    if globals_cached and not cached.inv:
-        cached.from_dict(globals_cached)
+    if inventory_snapshot is not None and not cached.inv:
+        cached.from_dict(inventory_snapshot.load())
     cached.input_cache_metrics = input_cache_metrics
+    if tool_slots is not None:
+        set_tool_slots(tool_slots)
+    _worker_context.clear()
+    _worker_context.update(worker_context or {})
+    if _worker_context and not cached.inv:
+        # the inventory gets rendered on first use, with the same flags
+        cached.args = _worker_context["args"]
+
+
+def new_cache_metrics(args):
+    """One shared CacheMetrics per cacheable input type, None without --cache."""
+    if not args.cache:
+        return None
+    return {name: CacheMetrics() for name in CACHEABLE_INPUT_TYPES}
+
+
+def _pool_task(func, args):
+    """Run func(*args) in a pool worker, return (RSS of the worker, result)."""
+    result = func(*args)
+    return current_rss(), result
+
+
+class WorkerPool:
+    """A process pool whose workers are replaced once they use too much memory.
+
+    Every task reports the RSS of its worker once done. At most ``processes``
+    tasks are sent to the workers at a time, the others wait in the order they
+    were submitted and are sent as results come in. When a worker is above
+    max_rss bytes, no more tasks are sent until the running ones are done, then
+    the pool is closed, its workers exit returning their memory to the system,
+    and the next tasks go to a new pool of fresh workers. maxtasksperchild is
+    passed on to the pools.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        initializer=None,
+        initargs=(),
+        maxtasksperchild: int | None = None,
+        max_rss: int | None = None,
+    ):
+        self.processes = processes
+        self.initializer = initializer
+        self.initargs = initargs
+        self.maxtasksperchild = maxtasksperchild
+        self.max_rss = max_rss
+        self.pool = self._new_pool()
+        self._retired: list = []
+        # tasks not sent to the workers yet, tasks running and whether the
+        # pool must be replaced, all guarded by _lock as results come in from
+        # the result handler thread of the pool
+        self._lock = threading.Lock()
+        self._pending: deque = deque()
+        self._running = 0
+        self._over_limit = False
+
+    def _new_pool(self):
+        return multiprocessing.Pool(
+            self.processes,
+            initializer=self.initializer,
+            initargs=self.initargs,
+            maxtasksperchild=self.maxtasksperchild,
+        )
+
+    def _replace_pool(self) -> None:
+        logger.debug(
+            "Recycling %d compile processes, one grew above %d MB",
+            self.processes,
+            self.max_rss // 2**20,
+        )
+        self.pool.close()
+        self._retired.append(self.pool)
+        self.pool = self._new_pool()
+        self._over_limit = False
+
+    def _dispatch(self) -> None:
+        """Send pending tasks to the workers, called with _lock held."""
+        if self._over_limit:
+            if self._running:
+                return
+            self._replace_pool()
+        while self._pending and self._running < self.processes:
+            func, args, callback, error_callback = self._pending.popleft()
+            self._running += 1
+            self.pool.apply_async(
+                _pool_task,
+                (func, args),
+                callback=partial(self._on_result, callback),
+                error_callback=partial(self._on_error, error_callback),
+            )
+
+    def _on_result(self, callback, measured) -> None:
+        rss, result = measured
+        with self._lock:
+            self._running -= 1
+            if self.max_rss is not None and rss is not None and rss > self.max_rss:
+                self._over_limit = True
+            self._dispatch()
+        if callback is not None:
+            callback(result)
+
+    def _on_error(self, error_callback, error) -> None:
+        with self._lock:
+            self._running -= 1
+            self._dispatch()
+        if error_callback is not None:
+            error_callback(error)
+
+    def apply_async(self, func, args=(), callback=None, error_callback=None) -> None:
+        """Run func(*args) in a worker, like multiprocessing.Pool.apply_async()
+        but without returning an AsyncResult, results come through callback."""
+        with self._lock:
+            self._pending.append((func, args, callback, error_callback))
+            self._dispatch()
+            retired, self._retired = self._retired, []
+        # pools are replaced from result handler threads, which can't join them
+        for pool in retired:
+            pool.join()
+
+    def close(self) -> None:
+        self.pool.close()
+
+    def join(self) -> None:
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for pool in [*retired, self.pool]:
+            pool.join()
+
+    def terminate(self) -> None:
+        with self._lock:
+            retired, self._retired = self._retired, []
+        for pool in [*retired, self.pool]:
+            pool.terminate()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.terminate()
+
+
+def worker_task_limit(args) -> int | None:
+    """maxtasksperchild of compile pools, from --max-tasks-per-worker.
+
+    None keeps workers for the whole run.
+    """
+    return getattr(args, "max_tasks_per_worker", None) or None
+
+
+def worker_memory_limit(args) -> int | None:
+    """RSS in bytes above which compile workers are replaced, from
+    --max-worker-memory (in MB)."""
+    max_memory = getattr(args, "max_worker_memory", None)
+    return max_memory * 2**20 if max_memory else None
+
+
+def compile_executor(args) -> str:
+    """--executor: "threads" on free-threaded Python builds, else "processes".
+
+    Without the GIL, targets compile in parallel on threads of the parent
+    process, which saves pickling tasks and results, starting workers and
+    copying the inventory into each of them.
+    """
+    executor = getattr(args, "executor", None)
+    if executor in ("processes", "threads"):
+        return executor
+    gil_enabled = getattr(sys, "_is_gil_enabled", lambda: True)()
+    return "processes" if gil_enabled else "threads"
+
+
+def default_parallelism(targets, available_cpus: int, compile_stats) -> int:
+    """Default --parallelism: min(len(targets), available_cpus), bounded by memory.
+
+    Workers are assumed to grow as large as the largest peak RSS recorded while
+    compiling any of targets, and only as many as fit in the memory available to the
+    container (minus the parent process) are started.
+    """
+    parallelism = min(len(targets), available_cpus)
+    worker_rss = compile_stats.peak_rss(targets)
+    memory = available_memory()
+    if not worker_rss or not memory:
+        return parallelism
+    memory_workers = memory_bounded_workers(memory - (current_rss() or 0), worker_rss)
+    if memory_workers < parallelism:
+        logger.info(
+            "Limiting parallelism to %d: %d MB available, workers need up to %d MB",
+            memory_workers,
+            memory // 2**20,
+            worker_rss // 2**20,
+        )
+    return min(parallelism, memory_workers)
+
+
+# Set in the workers of a CompilePool: the seed directory, the shared seed
+# generation and the generation the worker was last seeded with.
+_worker_seed: dict = {}
+
+
+class CompilePool:
+    """A process pool reused by several compile_targets() runs (compile --watch).
+
+    Workers are started once. Before every run the parent writes the
+    inventory snapshot and worker context to a seed file and bumps a shared
+    generation counter; every worker reloads the seed before its next task,
+    keeping its other caches (e.g. jsonnet imports) warm across runs.
+    """
+
+    def __init__(
+        self,
+        processes: int,
+        seed_path: str,
+        input_cache_metrics=None,
+        maxtasksperchild: int | None = None,
+        tool_slots=None,
+        max_rss: int | None = None,
+    ):
+        self.processes = processes
+        self.seed_path = seed_path
+        self.input_cache_metrics = input_cache_metrics
+        self.tool_slots = tool_slots
+        # every file that changed since the workers started, dropped from
+        # their caches when they reload the seed
+        self.changed_paths: set[str] = set()
+        self.generation = multiprocessing.Value("i", 0)
+        self.pool = WorkerPool(
+            processes,
+            initializer=_compile_pool_init,
+            initargs=(seed_path, self.generation, input_cache_metrics, tool_slots),
+            maxtasksperchild=maxtasksperchild,
+            max_rss=max_rss,
+        )
+
+    @staticmethod
+    def seed_file(seed_path: str, generation: int) -> str:
+        return os.path.join(seed_path, f"seed-{generation}.pickle")
+
+    def invalidate(self, paths) -> None:
+        """Make workers forget what they cached about the files in paths."""
+        self.changed_paths.update(os.path.abspath(path) for path in paths)
+
+    def seed(self, inventory_snapshot, worker_context) -> None:
+        """Hand the state of the next run to the workers."""
+        generation = self.generation.value + 1
+        with open(self.seed_file(self.seed_path, generation), "wb") as fp:
+            pickle.dump(
+                (inventory_snapshot, worker_context, self.changed_paths),
+                fp,
+                protocol=pickle.HIGHEST_PROTOCOL,
+            )
+        # no task is in flight between runs, so the previous seed is unused
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(self.seed_file(self.seed_path, generation - 1))
+        self.generation.value = generation
+
+    def close(self) -> None:
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.pool.terminate()
+
+
+def _compile_pool_init(seed_path, generation, input_cache_metrics, tool_slots=None):
+    """Pool initializer of a CompilePool, the state is loaded per run."""
+    _pool_init(None, input_cache_metrics, tool_slots=tool_slots)
+    _worker_seed.update(path=seed_path, generation=generation, loaded=0)
+
+
+def _refresh_worker():
+    """Reload the worker state if its CompilePool was seeded for a new run."""
+    if not _worker_seed:
+        return
+    generation = _worker_seed["generation"].value
+    if generation == _worker_seed["loaded"]:
+        return
+    with open(CompilePool.seed_file(_worker_seed["path"], generation), "rb") as fp:
+        inventory_snapshot, worker_context, changed_paths = pickle.load(fp)
+    reset_compile_caches(changed_paths)
+    cached.inv = {}
+    _pool_init(inventory_snapshot, cached.input_cache_metrics, worker_context)
+    _worker_seed["loaded"] = generation
+
+
+def reset_compile_caches(changed_paths=()) -> None:
+    """Drop the kadet inventory wrappers and cached reads of changed_paths.
+
+    changed_paths holds absolute paths.
+    """
+    from kapitan.inputs.kadet import clear_inventory_cache
+
+    clear_inventory_cache()
+    for path in list(JSONNET_CACHE):
+        if os.path.abspath(path) in changed_paths:
+            del JSONNET_CACHE[path]
 
 
 def _log_cache_metrics(metrics_by_type):
@@ -82,14 +511,307 @@ def _log_cache_metrics(metrics_by_type):
         logger.info("Compile cache: no lookups")
 
 
-def compile_targets(inventory_path, search_paths, ref_controller, args):
+def _fingerprint_base(target_config, args) -> dict:
+    """The parts of a target fingerprint that are known before compiling it."""
+    target_name = target_config.vars.target
+    topics_digest = consumed_topics_digest(target_name)
+    return {
+        "inventory": object_digest(cached.global_inv[target_name]),
+        "args": args_digest(args),
+        "version": VERSION,
+        "topics": topics_digest.hex() if topics_digest else None,
+    }
+
+
+def _skip_unchanged_targets(
+    target_objs, fingerprints, compile_path, args, dependencies
+):
+    """Return (stale target objects, fingerprint bases keyed by target name).
+
+    Targets depending on a stale target are stale too.
+    """
+    bases = {}
+    stale_objs = []
+    stale_names = set()
+    for target_config in order_dependencies_first(target_objs, dependencies):
+        target_name = target_config.vars.target
+        bases[target_name] = _fingerprint_base(target_config, args)
+        compiled_target_path = os.path.join(
+            compile_path, target_config.target_full_path
+        )
+        if dependencies.get(target_name, set()) & stale_names:
+            logger.debug("Recompiling %s, a target it depends on changed", target_name)
+        elif fingerprints.is_fresh(
+            target_name, bases[target_name], compiled_target_path
+        ):
+            logger.debug("Skipping unchanged target %s", target_name)
+            continue
+        stale_objs.append(target_config)
+        stale_names.add(target_name)
+
+    logger.info(
+        "Incremental compile: %d/%d targets changed",
+        len(stale_objs),
+        len(target_objs),
+    )
+    return stale_objs, bases
+
+
+def _restore_cached_targets(
+    target_objs, target_cache, staging_path, search_paths, args, bases, dependencies
+):
+    """Restore the targets found in target_cache into staging_path.
+
+    bases holds the fingerprint bases already computed by --incremental.
+    Targets depending on a target compiled in this run are not looked up,
+    their inputs are not known yet.
+    Returns (target objects to compile, results of the restored targets,
+    cache keys by target name).
+    """
+    keys = {}
+    compile_objs = []
+    compile_names = set()
+    results = []
+    for target_config in order_dependencies_first(target_objs, dependencies):
+        target_name = target_config.vars.target
+        base = bases.get(target_name) or _fingerprint_base(target_config, args)
+        keys[target_name] = target_cache.key(
+            base,
+            search_paths,
+            tool_versions(target_config, args),
+        )
+        entry = None
+        if not dependencies.get(target_name, set()) & compile_names:
+            entry = target_cache.lookup(keys[target_name])
+        staged_path = os.path.join(staging_path, target_config.target_full_path)
+        if entry is not None and target_cache.restore(entry, staged_path):
+            logger.debug("Restored %s from the target cache", target_name)
+            results.append(
+                TargetCompileResult(
+                    target_name,
+                    target_config.target_full_path,
+                    dependencies=set(entry["dependencies"]),
+                )
+            )
+        else:
+            compile_objs.append(target_config)
+            compile_names.add(target_name)
+
+    logger.info("Target cache: %d/%d targets restored", len(results), len(target_objs))
+    return compile_objs, results, keys
+
+
+def _prune_removed_targets(fingerprints, discovered_targets, compile_path):
+    """Drop fingerprints and compiled output of targets no longer in the inventory."""
+    for target_name in set(fingerprints.entries) - set(discovered_targets):
+        entry = fingerprints.remove(target_name)
+        compiled_target_path = os.path.join(compile_path, entry["target_full_path"])
+        if entry["target_full_path"] and os.path.isdir(compiled_target_path):
+            shutil.rmtree(compiled_target_path)
+            logger.info("Removed compiled output of deleted target %s", target_name)
+
+
+def _selects_all(args) -> bool:
+    """True unless the compile was restricted with --targets or --labels."""
+    return not args.targets and not args.labels
+
+
+def _nested_paths(path, target_paths) -> set[str]:
+    """Output paths of the targets nested in path, relative to path.
+
+    Targets are nested with --compose-target-name.
+    """
+    return {
+        os.path.relpath(other, path)
+        for other in target_paths
+        if other.startswith(path + os.sep)
+    }
+
+
+def _unstage_dependencies(results, staging_path, output_path) -> None:
+    """Record the compiled output of other targets read while it was staged
+    as read from the output path it was committed to."""
+    staging_path = os.path.abspath(staging_path)
+    output_path = os.path.abspath(output_path)
+
+    def unstage(path):
+        if path == staging_path:
+            return output_path
+        if os.path.abspath(path).startswith(staging_path + os.sep):
+            return os.path.join(output_path, os.path.relpath(path, staging_path))
+        return path
+
+    def unstage_dependency(dependency):
+        if dependency.startswith(LOOKUP_PREFIX):
+            # the staging path is a search path of its own
+            input_path, search_paths = parse_lookup(dependency)
+            return lookup_dependency(input_path, map(unstage, search_paths))
+        return unstage(dependency)
+
+    for result in results:
+        result.dependencies = set(map(unstage_dependency, result.dependencies))
+
+
+def _commit_targets(results, staging_path, compile_path, target_paths) -> TreeDiff:
+    """Move the staged output of finished targets into compile_path."""
+    record_output_sizes(results, staging_path, target_paths)
+    diff = TreeDiff()
+    for result in results:
+        path = result.target_full_path
+        staged_path = os.path.join(staging_path, path)
+        os.makedirs(staged_path, exist_ok=True)
+        # nested targets are committed on their own
+        diff.extend(
+            commit_tree(
+                staged_path,
+                os.path.join(compile_path, path),
+                exclude=_nested_paths(path, target_paths),
+            ),
+            prefix=path,
+        )
+    return diff
+
+
+def _diff_targets(results, staging_path, compile_path, target_paths) -> TreeDiff:
+    """Compare the staged output of finished targets with compile_path."""
+    record_output_sizes(results, staging_path, target_paths)
+    diff = TreeDiff()
+    for result in results:
+        path = result.target_full_path
+        diff.extend(
+            diff_trees(
+                os.path.join(staging_path, path),
+                os.path.join(compile_path, path),
+                exclude=_nested_paths(path, target_paths),
+            ),
+            prefix=path,
+        )
+    return diff
+
+
+def _print_file_diff(path, staging_path, compile_path) -> None:
+    """Print a unified diff of the compiled file path and its staged version."""
+    contents = []
+    for root in (compile_path, staging_path):
+        try:
+            with open(os.path.join(root, path), "rb") as fp:
+                contents.append(fp.read())
+        except FileNotFoundError:
+            contents.append(b"")
+    old, new = contents
+    compiled_path = os.path.join("compiled", path)
+    if b"\0" in old or b"\0" in new:
+        print(f"Binary file {compiled_path} differs")
+        return
+    sys.stdout.writelines(
+        difflib.unified_diff(
+            old.decode(errors="replace").splitlines(keepends=True),
+            new.decode(errors="replace").splitlines(keepends=True),
+            fromfile=f"a/{compiled_path}",
+            tofile=f"b/{compiled_path}",
+        )
+    )
+
+
+def _log_output_drift(diff, staging_path, compile_path, args):
+    """Log (and with --diff print) the compiled files that are out of date."""
+    for kind, paths in (
+        ("Added", diff.added),
+        ("Changed", diff.changed),
+        ("Removed", diff.removed),
+    ):
+        for path in paths:
+            logger.info("%s: %s", kind, os.path.join("compiled", path))
+    logger.info(
+        "Compiled output check: %d added, %d changed, %d removed, %d unchanged files",
+        len(diff.added),
+        len(diff.changed),
+        len(diff.removed),
+        len(diff.unchanged),
+    )
+    if diff.modified:
+        logger.error("Compiled output is out of date, run kapitan compile")
+    else:
+        logger.info("Compiled output is up to date")
+    if getattr(args, "diff", False):
+        for path in diff.modified:
+            _print_file_diff(path, staging_path, compile_path)
+    if changed_paths_output := getattr(args, "changed_paths_output", None):
+        write_changed_paths(
+            changed_paths_output,
+            [os.path.join("compiled", path) for path in diff.modified],
+        )
+
+
+def _log_output_changes(diff, args):
+    """Log and optionally write out the compiled files that were updated."""
+    logger.info(
+        "Updated compiled output: %d added, %d changed, %d removed, %d unchanged files",
+        len(diff.added),
+        len(diff.changed),
+        len(diff.removed),
+        len(diff.unchanged),
+    )
+    changed_paths = [os.path.join("compiled", path) for path in diff.modified]
+    for path in changed_paths:
+        logger.debug("Changed: %s", path)
+    if changed_paths_output := getattr(args, "changed_paths_output", None):
+        write_changed_paths(changed_paths_output, changed_paths)
+
+
+def new_staging_path(output_path: str) -> str:
+    """A new directory to stage compiled targets in, below STAGING_DIR.
+
+    Its name starts with the host name and pid of the compile, so the
+    directories of compiles that died on this host are removed on the next
+    compile instead of piling up.
+    """
+    staging_root = os.path.join(output_path, STAGING_DIR)
+    os.makedirs(staging_root, exist_ok=True)
+    host = socket.gethostname()
+    for name in os.listdir(staging_root):
+        owner = name.rsplit(".", 2)
+        if len(owner) != 3 or owner[0] != host or not owner[1].isdigit():
+            continue
+        if not is_process_alive(int(owner[1])):
+            logger.debug("Removing staging directory %s of a dead compile", name)
+            shutil.rmtree(os.path.join(staging_root, name), ignore_errors=True)
+    while True:
+        try:
+            return tempfile.mkdtemp(prefix=f"{host}.{os.getpid()}.", dir=staging_root)
+        except FileNotFoundError:
+            # removed by a compile that just finished, see remove_staging_path()
+            os.makedirs(staging_root, exist_ok=True)
+
+
+def remove_staging_path(staging_path: str) -> None:
+    """Remove staging_path, and STAGING_DIR once no other compile uses it."""
+    shutil.rmtree(staging_path)
+    staging_root = os.path.dirname(staging_path)
+    if os.path.basename(staging_root) == STAGING_DIR:
+        with contextlib.suppress(OSError):
+            os.rmdir(staging_root)
+
+
+def compile_targets(
+    inventory_path, search_paths, ref_controller, args, compile_pool=None
+):
     """
     Searches and loads target files, and runs compile_target() on a
     multiprocessing pool with parallel number of processes.
     kwargs are passed to compile_target()
+    compile_pool is a CompilePool to run on instead of a new pool
     """
-    # temp_path will hold compiled items
-    temp_path = tempfile.mkdtemp(suffix=".kapitan")
+    # temp_path will hold compiled items. It lives in the output path, on the
+    # same filesystem as compiled/, so finished targets are moved into place
+    # rather than copied. With --check (or --diff) nothing is moved and the
+    # output path is left alone.
+    output_path = args.output_path
+    check = getattr(args, "check", False) or getattr(args, "diff", False)
+    if check:
+        temp_path = tempfile.mkdtemp(prefix="kapitan-check-")
+    else:
+        temp_path = new_staging_path(output_path)
     # enable previously compiled items to be reference in other compile inputs
     search_paths.append(temp_path)
     temp_compile_path = os.path.join(temp_path, "compiled")
@@ -98,16 +820,20 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
     rendering_start = time.time()
     inventory = get_inventory(inventory_path)
     discovered_targets = inventory.targets.keys()
+    # phase durations for --report-json
+    timings = {"inventory": time.time() - rendering_start}
 
     logger.info(
         f"Rendered inventory (%.2fs): discovered {len(discovered_targets)} targets.",
-        time.time() - rendering_start,
+        timings["inventory"],
     )
 
     if discovered_targets == 0:
         raise CompileError("No inventory targets discovered at path: {inventory_path}")
 
-    targets = args.targets or discovered_targets
+    targets = expand_target_patterns(args.targets, discovered_targets) or list(
+        discovered_targets
+    )
     labels = args.labels
 
     try:
@@ -121,11 +847,35 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
             f"No matching targets found in inventory: {labels if labels else args.targets}"
         )
 
+    # with --shard, only compile the targets assigned to this shard
+    shard = getattr(args, "shard", None)
+    if shard is not None:
+        selected_targets = list(targets)
+        targets = shard_targets(selected_targets, shard)
+        if not targets:
+            logger.info("Shard %s: no targets assigned", shard)
+            write_shard_manifest(
+                args.output_path, shard, [], selected_targets, _selects_all(args)
+            )
+            remove_staging_path(temp_path)
+            return
+
     available_cpus = available_cpu_count()
-    parallelism = args.parallelism or min(len(targets), available_cpus)
+    compile_stats = CompileStats(output_path)
+    # threads share the memory of the parent, it doesn't bound parallelism
+    threads = compile_executor(args) == "threads"
+    if threads:
+        compile_pool = None
+        parallelism = args.parallelism or min(len(targets), available_cpus)
+    else:
+        parallelism = args.parallelism or default_parallelism(
+            targets, available_cpus, compile_stats
+        )
+    if compile_pool is not None:
+        parallelism = compile_pool.processes
 
     logger.info(
-        f"Compiling {len(targets)}/{len(discovered_targets)} targets using {parallelism} concurrent processes: ({available_cpus} CPU available)"
+        f"Compiling {len(targets)}/{len(discovered_targets)} targets using {parallelism} concurrent {'threads' if threads else 'processes'}: ({available_cpus} CPU available)"
     )
 
     # check if --fetch or --force-fetch is enabled
@@ -150,19 +900,103 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
 
     if not target_objs:
         raise CompileError("Error: no targets found")
+    # every target of this shard, including those skipped by --incremental
+    shard_objs = target_objs
+    # targets of this run each target waits for, see depends_on
+    try:
+        dependencies = target_dependencies(target_objs, discovered_targets)
+    except CompileError as e:
+        logger.error(e)
+        raise
 
     # append "compiled" to output_path so we can safely overwrite it
-    output_path = args.output_path
     compile_path = os.path.join(output_path, "compiled")
 
+    # with --incremental, only compile targets whose fingerprint changed.
+    # --check compares every selected target.
+    fingerprints = None
+    fingerprint_bases = {}
+    if getattr(args, "incremental", False) and not check:
+        fingerprints = FingerprintStore(
+            output_path, global_inventory=lambda: cached.global_inv
+        )
+        selected_objs = len(target_objs)
+        target_objs, fingerprint_bases = _skip_unchanged_targets(
+            target_objs, fingerprints, compile_path, args, dependencies
+        )
+        # every discovered target was considered: anything else was deleted
+        if _selects_all(args):
+            _prune_removed_targets(fingerprints, discovered_targets, compile_path)
+        if not target_objs:
+            fingerprints.save()
+            logger.info("All %d targets are up to date", selected_objs)
+            if shard is not None:
+                write_shard_manifest(
+                    output_path,
+                    shard,
+                    shard_objs,
+                    selected_targets,
+                    _selects_all(args),
+                )
+            remove_staging_path(temp_path)
+            return
+
+    # with --target-cache, restore the targets compiled before from the same
+    # inputs instead of compiling them
+    target_cache = None
+    cache_keys = {}
+    cached_results = []
+    if getattr(args, "target_cache", False):
+        target_cache = TargetCache(global_inventory=lambda: cached.global_inv)
+        target_objs, cached_results, cache_keys = _restore_cached_targets(
+            target_objs,
+            target_cache,
+            temp_compile_path,
+            [path for path in search_paths if path != temp_path],
+            args,
+            fingerprint_bases,
+            dependencies,
+        )
+
+    # dispatch the longest running targets first, based on previous runs,
+    # but never before the targets they depend on
+    estimates = compile_stats.estimates(target_objs)
+    target_objs = order_dependencies_first(
+        order_longest_first(target_objs, estimates), dependencies
+    )
+    target_names = [target.vars.target for target in target_objs]
+    dependencies = {
+        target_name: dependencies[target_name] & set(target_names)
+        for target_name in target_names
+    }
+    if getattr(args, "profile_serial", False):
+        batches = [[target_name] for target_name in target_names]
+        compile_workers = 1
+    else:
+        batches = batch_tasks(target_names, estimates, parallelism)
+        compile_workers = parallelism
+    logger.debug(
+        "Dispatching %d targets as %d pool tasks", len(target_names), len(batches)
+    )
+    predicted_makespan = predict_makespan(
+        [sum(estimates[name] for name in batch) for batch in batches],
+        compile_workers,
+    )
+
     # Allocate one shared CacheMetrics per cacheable input type so workers
     # bump the same counters as the parent. The dict is pre-populated here
     # (eagerly, before pool spawn) because multiprocessing.Value objects
     # have to be created in the parent to be sharable across workers.
-    cached.input_cache_metrics = (
-        {name: CacheMetrics() for name in CACHEABLE_INPUT_TYPES} if args.cache else None
-    )
+    if compile_pool is not None:
+        cached.input_cache_metrics = compile_pool.input_cache_metrics
+    else:
+        cached.input_cache_metrics = new_cache_metrics(args)
+    # external tools started by all workers (or threads) share these slots
+    tool_slots = getattr(compile_pool, "tool_slots", None) or new_tool_slots(args)
+    set_tool_slots(tool_slots)
 
+    # with --check, the compiled files that differ from the staged output
+    out_of_date = []
     try:
         fetching_start = time.time()
 
@@ -181,7 +1015,7 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
             if fetch_objs:
                 fetch_targets = (fetch_objs, True)
 
-        if fetch_targets is not None:
+        if fetch_targets is not None and fetch_targets[0]:
             with multiprocessing.Pool(parallelism) as fetch_pool:
                 fetch_dependencies(
                     output_path,
@@ -190,20 +1024,54 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
                     fetch_targets[1],
                     fetch_pool,
                 )
-            logger.info("Fetched dependencies (%.2fs)", time.time() - fetching_start)
-
-        # snapshot `cached` once and pass it to the compile pool via
-        # initargs so each worker is seeded a single time. Per-target
-        # mutations (e.g. target_full_path) travel with the target object
-        # itself via imap_unordered.
+            timings["fetch"] = time.time() - fetching_start
+            logger.info("Fetched dependencies (%.2fs)", timings["fetch"])
+
+        # snapshot `cached` once into a file that every worker maps, so
+        # each worker is seeded a single time and lazily. Everything else
+        # shared by all tasks is sent once per worker too: tasks only carry
+        # target names, resolved against the worker's inventory.
+        # workers of a CompilePool started before the inventory was (re)rendered
+        inventory_snapshot = None
+        if args.inventory_pool_cache and (
+            compile_pool is not None or multiprocessing.get_start_method() != "fork"
+        ):
+            inventory_snapshot = InventorySnapshot.write(
+                os.path.join(temp_path, "inventory.snapshot"), cached.as_dict()
+            )
+        worker_context = {
+            "search_paths": search_paths,
+            "compile_path": temp_compile_path,
+            "ref_controller": ref_controller,
+            "args": args,
+        }
         pool_initargs = (
-            cached.as_dict() if args.inventory_pool_cache else None,
+            inventory_snapshot,
             cached.input_cache_metrics,
+            worker_context,
+            tool_slots,
         )
 
-        with multiprocessing.Pool(
-            parallelism, initializer=_pool_init, initargs=pool_initargs
-        ) as pool:
+        if not target_objs:
+            # every target was restored from the target cache
+            pool_context = contextlib.nullcontext()
+        elif threads:
+            # tasks run in this process, on the `cached` state it rendered
+            _pool_init(None, cached.input_cache_metrics, worker_context)
+            pool_context = ThreadPool(parallelism)
+        elif compile_pool is not None:
+            compile_pool.seed(inventory_snapshot, worker_context)
+            pool_context = contextlib.nullcontext(compile_pool.pool)
+        else:
+            pool_context = WorkerPool(
+                parallelism,
+                initializer=_pool_init,
+                initargs=pool_initargs,
+                maxtasksperchild=worker_task_limit(args),
+                max_rss=worker_memory_limit(args),
+            )
+
+        with pool_context as pool:
             compile_start = time.time()
             worker = partial(
                 compile_target,
@@ -213,9 +1081,31 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
                 args=args,
             )
 
-            # compile_target() returns None on success
-            # so p is only not None when raising an exception
-            if getattr(args, "profile_serial", False):
+            # targets are moved into compiled/ as soon as they finish, only
+            # writing files that changed and leaving everything else untouched
+            target_paths = [target.target_full_path for target in target_objs] + [
+                result.target_full_path for result in cached_results
+            ]
+            diff = TreeDiff()
+            timings["commit"] = 0.0
+
+            def commit(finished):
+                commit_start = time.time()
+                commit_or_diff = _diff_targets if check else _commit_targets
+                diff.extend(
+                    commit_or_diff(
+                        finished, temp_compile_path, compile_path, target_paths
+                    )
+                )
+                timings["commit"] += time.time() - commit_start
+
+            commit(cached_results)
+
+            # compile_target() returns a TargetCompileResult on success and
+            # raises on failure, which run_task_graph() re-raises here
+            if not target_objs:
+                results = []
+            elif getattr(args, "profile_serial", False):
                 # Serial in-process mode: bypass the Pool so a single
                 # pyinstrument profile in the parent contains the full
                 # call tree (kadet/jinja/jsonnet internals included).
@@ -224,36 +1114,110 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
                     "--profile-serial: compiling %d targets serially in the parent process",
                     len(target_objs),
                 )
-                for target_obj in target_objs:
-                    worker(target_obj)
+                results = [worker(target_obj) for target_obj in target_objs]
+                commit(results)
+            elif getattr(args, "parallel_entries", False):
+                results = _compile_units(
+                    pool,
+                    target_objs,
+                    temp_path,
+                    lambda result: commit([result]),
+                    dependencies,
+                )
             else:
-                [p.get() for p in pool.imap_unordered(worker, target_objs) if p]
-
-            os.makedirs(compile_path, exist_ok=True)
+                results = []
+
+                def on_batch(key, batch_results):
+                    results.extend(batch_results)
+                    commit(batch_results)
+
+                tasks = dict(enumerate(batches))
+                if any(dependencies.values()):
+                    # one task per target, each dispatched once the targets it
+                    # depends on are compiled and committed
+                    tasks = {target_name: [target_name] for target_name in target_names}
+                run_task_graph(
+                    pool, _compile_target_batch, tasks, dependencies, on_batch
+                )
 
-            # if '-t' is set on compile or only a few changed, only override selected targets
-            if len(target_objs) < len(discovered_targets):
-                for target in target_objs:
-                    path = target.target_full_path
-                    compile_path_target = os.path.join(compile_path, path)
-                    temp_path_target = os.path.join(temp_compile_path, path)
+            # when every target was compiled, remove output of unknown targets
+            if len(target_paths) == len(discovered_targets):
+                commit_start = time.time()
+                diff.removed.extend(
+                    remove_stale_paths(compile_path, target_paths, dry_run=check)
+                )
+                timings["commit"] += time.time() - commit_start
 
-                    os.makedirs(compile_path_target, exist_ok=True)
+            timings["compile"] = time.time() - compile_start
+            if getattr(args, "parallel_entries", False):
+                logger.info("Compile makespan: actual %.2fs", timings["compile"])
+            else:
+                logger.info(
+                    "Compile makespan: predicted %.2fs, actual %.2fs",
+                    predicted_makespan,
+                    timings["compile"],
+                )
+            # in serial mode and on threads, peak_rss is the one of the
+            # parent process
+            record_rss = not (threads or getattr(args, "profile_serial", False))
+            for result in results:
+                compile_stats.record(
+                    result.target_name,
+                    result.duration,
+                    result.peak_rss if record_rss else None,
+                )
+            compile_stats.save()
 
-                    shutil.rmtree(compile_path_target)
-                    shutil.copytree(temp_path_target, compile_path_target)
-                    logger.debug(
-                        "Copied %s into %s", temp_path_target, compile_path_target
-                    )
-            # otherwise override all targets
+            if check:
+                _log_output_drift(diff, temp_compile_path, compile_path, args)
+                out_of_date = diff.modified
             else:
-                shutil.rmtree(compile_path)
-                shutil.copytree(temp_compile_path, compile_path)
-                logger.debug("Copied %s into %s", temp_compile_path, compile_path)
+                _log_output_changes(diff, args)
+            if shard is not None:
+                write_shard_manifest(
+                    output_path,
+                    shard,
+                    shard_objs,
+                    selected_targets,
+                    _selects_all(args),
+                )
             logger.info(
-                f"Compiled {len(targets)} targets in %.2fs", time.time() - compile_start
+                f"Compiled {len(target_objs)} targets in %.2fs",
+                time.time() - compile_start,
             )
             _log_cache_metrics(cached.input_cache_metrics)
+
+            _unstage_dependencies(results, temp_path, output_path)
+            if fingerprints is not None:
+                # refs may have been created while compiling
+                fingerprints.invalidate()
+                for result in cached_results + results:
+                    fingerprints.update(
+                        result.target_name,
+                        result.target_full_path,
+                        fingerprint_bases[result.target_name],
+                        result.dependencies,
+                    )
+                fingerprints.save()
+
+            if target_cache is not None and not check:
+                target_cache.invalidate()
+                for result in results:
+                    target_cache.store(
+                        cache_keys[result.target_name],
+                        result.dependencies,
+                        os.path.join(compile_path, result.target_full_path),
+                        exclude=_nested_paths(result.target_full_path, target_paths),
+                    )
+
+            if report_json := getattr(args, "report_json", None):
+                timings["total"] = time.time() - rendering_start
+                write_compile_report(
+                    report_json,
+                    build_compile_report(
+                        cached_results + results, timings, compile_workers
+                    ),
+                )
     except ReclassException as e:
         if isinstance(e, NotFoundError):
             logger.error("Inventory reclass error: inventory not found")
@@ -273,9 +1237,14 @@ def compile_targets(inventory_path, search_paths, ref_controller, args):
         raise CompileError(f"Error compiling targets: {e}") from e
 
     finally:
-        shutil.rmtree(temp_path)
+        if threads:
+            _worker_context.clear()
+        remove_staging_path(temp_path)
         logger.debug("Removed %s", temp_path)
 
+    if out_of_date:
+        raise CompileError(f"{len(out_of_date)} compiled files are out of date")
+
 
 def load_target_inventory(inventory, requested_targets, ignore_class_not_found=False):
     """returns a list of target objects from the inventory"""
@@ -317,40 +1286,43 @@ def load_target_inventory(inventory, requested_targets, ignore_class_not_found=F
     return target_objs
 
 
+def expand_target_patterns(patterns, target_names) -> list:
+    """
+    returns patterns with the glob patterns (e.g. prod-*) replaced by the
+    target_names they match, in their inventory order
+    """
+    expanded = []
+    for pattern in patterns:
+        if not glob.has_magic(pattern):
+            expanded.append(pattern)
+            continue
+        matches = fnmatch.filter(target_names, pattern)
+        if not matches:
+            raise CompileError(f"No targets found matching: {pattern}")
+        expanded.extend(matches)
+    # a target can match several patterns
+    return list(dict.fromkeys(expanded))
+
+
 def search_targets(inventory, targets, labels):
-    """returns a list of targets where the labels match, otherwise just return the original targets"""
+    """
+    returns the targets matching the label selectors, see kapitan.inventory.labels,
+    otherwise just return the original targets. targets=None searches all targets
+    """
     if not labels:
         return targets
 
     try:
-        labels_dict = dict(label.split("=") for label in labels)
+        selected = inventory.label_index.select(labels)
     except ValueError as e:
         raise CompileError(
-            "Compile error: Failed to parse labels, should be formatted like: kapitan compile -l env=prod app=example"
+            f"Compile error: Failed to parse labels, {e}. Should be formatted like: "
+            "kapitan compile -l env=prod 'tier in (web,api)' '!canary'"
         ) from e
 
-    targets_found = []
-    # It should come back already rendered
-
-    for target in inventory.targets.values():
-        target_labels = target.parameters.kapitan.labels
-        matched_all_labels = False
-        for label, value in labels_dict.items():
-            try:
-                if target_labels[label] == value:
-                    matched_all_labels = True
-                    continue
-            except KeyError:
-                logger.debug(
-                    f"search_targets: label {label}={value} didn't match target {target.name} {target_labels}"
-                )
-
-            matched_all_labels = False
-            break
-
-        if matched_all_labels:
-            targets_found.append(target.name)
-
+    targets_found = [
+        name for name in (targets or inventory.targets) if name in selected
+    ]
     if len(targets_found) == 0:
         raise CompileError(f"No targets found with labels: {labels}")
 
@@ -361,47 +1333,280 @@ def compile_target(target_config, search_paths, compile_path, ref_controller, ar
     """Compiles target_obj and writes to compile_path"""
     # worker_profile() is a no-op unless the parent set the
     # KAPITAN_PROFILE_WORKERS_DIR env var (i.e. user passed --profile-workers).
-    with worker_profile():
-        return _compile_target_impl(
+    reset_peak_rss()
+    with worker_profile(), tracking() as dependencies, count_lookups() as lookups:
+        duration, input_type_durations = _compile_target_impl(
             target_config,
             search_paths,
             compile_path,
             ref_controller,
             args,
         )
+    return TargetCompileResult(
+        target_name=target_config.vars.target,
+        target_full_path=target_config.target_full_path,
+        dependencies=dependencies,
+        duration=duration,
+        input_type_durations=input_type_durations,
+        cache_hits=lookups["hits"],
+        cache_misses=lookups["misses"],
+        peak_rss=peak_rss(),
+    )
+
+
+def _resolve_target_config(target_name):
+    """Look up the kapitan settings of target_name in the worker's inventory."""
+    inv = cached.inv or get_inventory(_worker_context["args"].inventory_path)
+    target = inv.get_target(target_name)
+    target_config = target.parameters.kapitan
+    target_config.target_full_path = target.name.replace(".", "/")
+    return target_config
+
+
+def _compile_target_batch(target_names):
+    """Pool task: compile a batch of targets, given by name"""
+    _refresh_worker()
+    return [
+        compile_target(
+            _resolve_target_config(target_name),
+            _worker_context["search_paths"],
+            _worker_context["compile_path"],
+            _worker_context["ref_controller"],
+            _worker_context["args"],
+        )
+        for target_name in target_names
+    ]
+
+
+def _compile_pool_unit(unit):
+    """Pool task: compile a single compile entry of a target"""
+    _refresh_worker()
+    return compile_unit(
+        unit,
+        _worker_context["search_paths"],
+        _worker_context["ref_controller"],
+        _worker_context["args"],
+    )
+
+
+def compile_unit(unit, search_paths, ref_controller, args):
+    """Compiles a single compile entry of a target, see --parallel-entries"""
+    target_name = unit.target_name
+    target_config = _resolve_target_config(target_name)
+    compile_config = target_config.compile[unit.index]
+    reset_peak_rss()
+    with worker_profile(), tracking() as dependencies, count_lookups() as lookups:
+        start = time.time()
+        _compile_entry(
+            compile_config,
+            target_name,
+            search_paths,
+            unit.compile_path,
+            ref_controller,
+            args,
+        )
+    return CompileUnitResult(
+        target_name=target_name,
+        index=unit.index,
+        input_type=str(compile_config.input_type),
+        dependencies=dependencies,
+        duration=time.time() - start,
+        cache_hits=lookups["hits"],
+        cache_misses=lookups["misses"],
+        peak_rss=peak_rss(),
+    )
+
+
+def _compile_phases(target_config):
+    """Split the compile entries of a target into phases of entry indexes.
+
+    Entries within a phase are independent and may run concurrently, phases
+    run one after the other. Barrier entries (see _is_barrier()) get a phase
+    of their own.
+    """
+    phases = []
+    previous_is_barrier = True
+    for index, compile_config in enumerate(target_config.compile):
+        is_barrier = _is_barrier(compile_config)
+        if is_barrier or previous_is_barrier:
+            phases.append([index])
+        else:
+            phases[-1].append(index)
+        previous_is_barrier = is_barrier
+    return phases
+
+
+def _is_barrier(compile_config) -> bool:
+    """True if the entry reads or modifies the output of the entries before
+    it: entries in BARRIER_INPUT_TYPES, and entries whose input paths are
+    in compiled/."""
+    if compile_config.input_type in BARRIER_INPUT_TYPES:
+        return True
+    return any(
+        os.path.normpath(input_path).split(os.sep)[0] == "compiled"
+        for input_path in compile_config.input_paths
+    )
+
+
+def _merge_units(target_name, phase, unit_paths, compile_path):
+    """Merge the private output of the units of a phase into compile_path.
+
+    Raises CompileError if several entries of the phase write the same file:
+    compiled concurrently, neither sees the output of the other.
+    """
+    written_by = {}
+    for index in phase:
+        for path in merge_tree(unit_paths[index], compile_path):
+            if path in written_by:
+                raise CompileError(
+                    f"Compile entries {written_by[path]} and {index} of target "
+                    f"{target_name} both write {path}, compile without "
+                    "--parallel-entries or write to different paths"
+                )
+            written_by[path] = index
+
+
+def _compile_units(pool, target_objs, temp_path, on_target=None, depends_on=None):
+    """Compile every compile entry of target_objs as its own task on pool.
+
+    Returns a TargetCompileResult per target. on_target(result) is called as
+    soon as all entries of a target compiled. depends_on maps a target name
+    to the targets whose entries must all compile before any of its own.
+    """
+    compile_path = os.path.join(temp_path, "compiled")
+    units_path = os.path.join(temp_path, "units")
+    tasks = {}
+    dependencies = {}
+    unit_paths = {}
+    phase_of = {}
+    pending = {}
+    for target_config in target_objs:
+        target_name = target_config.vars.target
+        previous_phase = []
+        for phase_index, phase in enumerate(_compile_phases(target_config)):
+            for index in phase:
+                key = (target_name, index)
+                unit_path = compile_path
+                # entries running next to others of the same target write to
+                # a private directory, merged once the whole phase is done
+                if len(phase) > 1:
+                    unit_path = os.path.join(units_path, target_name, str(index))
+                    unit_paths[key] = unit_path
+                tasks[key] = CompileUnit(target_name, index, unit_path)
+                dependencies[key] = {(target_name, i) for i in previous_phase}
+                phase_of[key] = (phase_index, phase)
+            pending[target_name, phase_index] = len(phase)
+            previous_phase = phase
+
+    if depends_on:
+        units_of = defaultdict(set)
+        for key in tasks:
+            units_of[key[0]].add(key)
+        for target_config in target_objs:
+            target_name = target_config.vars.target
+            producer_units = set().union(
+                *(units_of[name] for name in depends_on.get(target_name, ()))
+            )
+            for key in units_of[target_name]:
+                dependencies[key] |= producer_units
+
+    results = {
+        target_config.vars.target: TargetCompileResult(
+            target_name=target_config.vars.target,
+            target_full_path=target_config.target_full_path,
+        )
+        for target_config in target_objs
+    }
+    remaining_units = {
+        target_config.vars.target: len(target_config.compile)
+        for target_config in target_objs
+    }
+
+    def on_result(key, unit_result):
+        target_name = unit_result.target_name
+        result = results[target_name]
+        result.dependencies |= unit_result.dependencies
+        result.duration += unit_result.duration
+        result.input_type_durations[unit_result.input_type] = (
+            result.input_type_durations.get(unit_result.input_type, 0.0)
+            + unit_result.duration
+        )
+        result.cache_hits += unit_result.cache_hits
+        result.cache_misses += unit_result.cache_misses
+        if unit_result.peak_rss is not None:
+            result.peak_rss = max(result.peak_rss or 0, unit_result.peak_rss)
+
+        phase_index, phase = phase_of[key]
+        pending[target_name, phase_index] -= 1
+        if not pending[target_name, phase_index] and len(phase) > 1:
+            _merge_units(
+                target_name,
+                phase,
+                {index: unit_paths[target_name, index] for index in phase},
+                compile_path,
+            )
+
+        remaining_units[target_name] -= 1
+        if not remaining_units[target_name]:
+            logger.info("Compiled %s (%.2fs)", result.target_full_path, result.duration)
+            if on_target is not None:
+                on_target(result)
+
+    run_task_graph(pool, _compile_pool_unit, tasks, dependencies, on_result)
+    return list(results.values())
+
+
+def _compile_entry(
+    compile_config, target_name, search_paths, compile_path, ref_controller, args
+):
+    try:
+        input_type = compile_config.input_type
+        input_compiler = get_compiler(input_type)(
+            compile_path, search_paths, ref_controller, target_name, args
+        )
+        input_compiler.compile_obj(compile_config)
+    except AttributeError as e:
+        import traceback
+
+        traceback.print_exception(type(e), e, e.__traceback__)
+        raise CompileError(
+            f'Invalid input_type: "{compile_config.input_type}" {e}'
+        ) from e
+
+    except Exception as e:
+        if compile_config.continue_on_compile_error:
+            logger.error("Error compiling %s: %s", target_name, e)
+            return
+        import traceback
+
+        traceback.print_exception(type(e), e, e.__traceback__)
+        raise CompileError(f"Error compiling {target_name}: {e}") from e
 
 
 def _compile_target_impl(
     target_config, search_paths, compile_path, ref_controller, args
 ):
+    """Compile every entry of target_config, returns (duration, duration per
+    input type)"""
     start = time.time()
-    compile_configs = target_config.compile
     target_name = target_config.vars.target
+    input_type_durations = {}
 
-    for compile_config in compile_configs:
-        try:
-            input_type = compile_config.input_type
-            input_compiler = get_compiler(input_type)(
-                compile_path, search_paths, ref_controller, target_name, args
-            )
-            input_compiler.compile_obj(compile_config)
-        except AttributeError as e:
-            import traceback
-
-            traceback.print_exception(type(e), e, e.__traceback__)
-            raise CompileError(
-                f'Invalid input_type: "{compile_config.input_type}" {e}'
-            ) from e
-
-        except Exception as e:
-            if compile_config.continue_on_compile_error:
-                logger.error("Error compiling %s: %s", target_name, e)
-                continue
-            import traceback
-
-            traceback.print_exception(type(e), e, e.__traceback__)
-            raise CompileError(f"Error compiling {target_name}: {e}") from e
+    for compile_config in target_config.compile:
+        entry_start = time.time()
+        _compile_entry(
+            compile_config,
+            target_name,
+            search_paths,
+            compile_path,
+            ref_controller,
+            args,
+        )
+        input_type = str(compile_config.input_type)
+        input_type_durations[input_type] = (
+            input_type_durations.get(input_type, 0.0) + time.time() - entry_start
+        )
 
-    logger.info(
-        "Compiled %s (%.2fs)", target_config.target_full_path, time.time() - start
-    )
+    duration = time.time() - start
+    logger.info("Compiled %s (%.2fs)", target_config.target_full_path, duration)
+    return duration, input_type_durations
@@ -0,0 +1,257 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+Bounded execution of the external tools run by input types.
+
+The helm, kustomize, cuelang and external input types spend most of their
+time waiting for a subprocess. They start it with :func:`run_tool` or
+:func:`stream_tool`, which run it from the calling compile thread: stdout goes
+straight to the output file, or is read by the caller while the tool writes
+it, so e.g. kustomize output is parsed while it renders. stderr is spooled to
+a temporary file, so a tool writing a lot of it never blocks.
+
+The number of tools running at the same time is bounded by :class:`ToolSlots`
+shared by every worker of the compile pool (see :func:`new_tool_slots` and
+``kapitan compile --max-tool-processes``), so compiling many tool heavy
+targets or entries in parallel does not oversubscribe the machine.
+"""
+
+import contextlib
+import logging
+import multiprocessing
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+from dataclasses import dataclass
+
+from kapitan.utils import available_cpu_count, is_process_alive
+
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 65536
+
+# Seconds between checks for slots held by dead processes, while waiting for
+# a tool slot.
+RECLAIM_INTERVAL = 1.0
+
+# Bounds the tools running at once, see set_tool_slots()
+_slots = None
+
+
+@dataclass
+class ToolResult:
+    """Exit status and output of a tool.
+
+    stdout is only set when it was captured.
+    """
+
+    returncode: int
+    stderr: bytes
+    stdout: bytes | None = None
+
+
+class ToolSlots:
+    """A semaphore bounding the tools running at once in several processes.
+
+    Every slot records the pid of the process holding it. A compile worker
+    killed while it ran a tool never releases its slot, which is then
+    reclaimed by the next process waiting for one instead of being lost.
+    """
+
+    def __init__(self, slots: int):
+        self._owners = multiprocessing.Array("i", slots, lock=False)
+        self._condition = multiprocessing.Condition()
+
+    def _free_slot(self) -> int | None:
+        for slot, owner in enumerate(self._owners):
+            if not owner:
+                return slot
+        for slot, owner in enumerate(self._owners):
+            if not is_process_alive(owner):
+                logger.debug("Reclaiming the tool slot of dead process %d", owner)
+                return slot
+        return None
+
+    def acquire(self, blocking: bool = True) -> bool:
+        with self._condition:
+            while (slot := self._free_slot()) is None:
+                if not blocking:
+                    return False
+                self._condition.wait(RECLAIM_INTERVAL)
+            self._owners[slot] = os.getpid()
+            return True
+
+    def release(self) -> None:
+        pid = os.getpid()
+        with self._condition:
+            for slot, owner in enumerate(self._owners):
+                if owner == pid:
+                    self._owners[slot] = 0
+                    self._condition.notify()
+                    return
+        raise ValueError(f"Process {pid} holds no tool slot")
+
+
+def new_tool_slots(args) -> ToolSlots:
+    """ToolSlots bounding the tools running at once in all compile workers.
+
+    Sized by --max-tool-processes, default the available CPU count. It has to
+    be created in the parent and handed to the workers when they start.
+    """
+    slots = getattr(args, "max_tool_processes", None)
+    if not isinstance(slots, int) or slots < 1:
+        slots = available_cpu_count()
+    return ToolSlots(slots)
+
+
+def set_tool_slots(slots) -> None:
+    """Use slots to bound the tools run by this process, see new_tool_slots()."""
+    global _slots
+    _slots = slots
+
+
+def _tool_slots():
+    global _slots
+    if _slots is None:
+        # e.g. input types used outside of compile_targets()
+        _slots = threading.BoundedSemaphore(available_cpu_count())
+    return _slots
+
+
+def _has_fileno(stream) -> bool:
+    try:
+        stream.fileno()
+    except (AttributeError, OSError, ValueError):
+        return False
+    return True
+
+
+class ToolStream:
+    """A running tool, see stream_tool()."""
+
+    def __init__(self, command, process, stderr, timeout):
+        self.stdout = process.stdout
+        self._command = command
+        self._process = process
+        self._stderr = stderr
+        self._timeout = timeout
+        self._timed_out = False
+        self._result = None
+        self._timer = None
+        if timeout is not None:
+            self._timer = threading.Timer(timeout, self._expire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _expire(self) -> None:
+        self._timed_out = True
+        self.kill()
+
+    def _finish(self) -> None:
+        """Collect the exit status and stderr of the exited tool."""
+        if self._timer is not None:
+            self._timer.cancel()
+        if self._result is None:
+            returncode = self._process.wait()
+            self._stderr.seek(0)
+            self._result = ToolResult(returncode, self._stderr.read())
+
+    def wait(self) -> ToolResult:
+        """Wait for the tool to exit, the result has no stdout.
+
+        Raises subprocess.TimeoutExpired if it was killed for running longer
+        than its timeout.
+        """
+        self._finish()
+        if self._timed_out:
+            raise subprocess.TimeoutExpired(self._command, self._timeout)
+        return self._result
+
+    def kill(self) -> None:
+        """Kill the tool, it still has to be waited for."""
+        with contextlib.suppress(ProcessLookupError):
+            self._process.kill()
+
+
+@contextlib.contextmanager
+def _start_tool(command, *, stdout, cwd, env, shell, timeout):
+    """Start command once a tool slot is free, yielding its ToolStream.
+
+    The tool is killed if the block exits with an exception, and waited for
+    on exit in any case.
+    """
+    slots = _tool_slots()
+    slots.acquire()
+    try:
+        logger.debug("Running tool: %s", command)
+        with tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(
+                command, stdout=stdout, stderr=stderr, cwd=cwd, env=env, shell=shell
+            )
+            tool = ToolStream(command, process, stderr, timeout)
+            try:
+                # closes stdout and waits for the tool
+                with process:
+                    try:
+                        yield tool
+                    except BaseException:
+                        tool.kill()
+                        raise
+            finally:
+                tool._finish()
+    finally:
+        slots.release()
+
+
+def run_tool(
+    command, *, stdout=None, cwd=None, env=None, shell=False, timeout=None
+) -> ToolResult:
+    """Run command and wait for it to exit.
+
+    stdout is a file the tool writes its output to, a binary stream the
+    output is copied to in chunks as it is produced, subprocess.DEVNULL to
+    discard it, or None to capture it in the result.
+    With shell=True, command is a string run by the shell. Raises
+    FileNotFoundError if the tool does not exist and
+    subprocess.TimeoutExpired once it ran longer than timeout seconds.
+    """
+    capture = stdout is None
+    copy_to = None
+    if not capture and stdout is not subprocess.DEVNULL and not _has_fileno(stdout):
+        copy_to = stdout
+    if capture or copy_to is not None:
+        stdout = subprocess.PIPE
+    captured = None
+    with _start_tool(
+        command, stdout=stdout, cwd=cwd, env=env, shell=shell, timeout=timeout
+    ) as tool:
+        if capture:
+            captured = tool.stdout.read()
+        elif copy_to is not None:
+            shutil.copyfileobj(tool.stdout, copy_to, CHUNK_SIZE)
+        result = tool.wait()
+    result.stdout = captured
+    return result
+
+
+@contextlib.contextmanager
+def stream_tool(command, *, cwd=None, env=None, timeout=None):
+    """Run command, yielding a ToolStream to read its stdout while it runs.
+
+    The tool is killed if the block exits with an exception, and waited for
+    on exit in any case. Check its exit status with ToolStream.wait().
+    """
+    with _start_tool(
+        command,
+        stdout=subprocess.PIPE,
+        cwd=cwd,
+        env=env,
+        shell=False,
+        timeout=timeout,
+    ) as tool:
+        yield tool
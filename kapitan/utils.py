@@ -29,6 +29,7 @@ import yaml
 
 from kapitan import cached, defaults
 from kapitan.errors import CompileError
+from kapitan.incremental import track_dependency
 from kapitan.jinja2_filters import (
     _jinja_error_info,
     load_jinja2_filters,
@@ -42,6 +43,8 @@ logger = logging.getLogger(__name__)
 _CGROUP_V2_CPU_MAX = "/sys/fs/cgroup/cpu.max"
 _CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
 _CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+_CGROUP_V2_MEMORY_MAX = "/sys/fs/cgroup/memory.max"
+_CGROUP_V1_MEMORY_LIMIT = "/sys/fs/cgroup/memory/memory.limit_in_bytes"
 
 
 try:
@@ -65,6 +68,17 @@ for _YamlLoader in {YamlLoader, yaml.SafeLoader}:
     )
 
 
+def is_process_alive(pid: int) -> bool:
+    """True if a process with pid runs on this host."""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
 def available_cpu_count():
     """Return CPUs available to this process, accounting for container limits."""
     os_cpu_count = os.cpu_count() or 1
@@ -122,6 +136,39 @@ def _read_cpu_file(path):
         return cpu_file.read().strip()
 
 
+def available_memory():
+    """Return bytes of memory available, accounting for container limits, or None."""
+    limits = [_physical_memory(), _memory_from_cgroup()]
+    limits = [limit for limit in limits if limit]
+    return min(limits) if limits else None
+
+
+def _physical_memory():
+    try:
+        return os.sysconf("SC_PHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+def _memory_from_cgroup():
+    try:
+        if os.path.exists(_CGROUP_V2_MEMORY_MAX):
+            limit = _read_cpu_file(_CGROUP_V2_MEMORY_MAX)
+        elif os.path.exists(_CGROUP_V1_MEMORY_LIMIT):
+            limit = _read_cpu_file(_CGROUP_V1_MEMORY_LIMIT)
+        else:
+            return None
+
+        # cgroup v1 reports "no limit" as a number close to 2**63
+        if limit == "max" or int(limit) >= 2**62:
+            return None
+        return int(limit)
+    except (OSError, ValueError):
+        logger.debug("Unable to detect memory limit from cgroup files", exc_info=True)
+
+    return None
+
+
 def fatal_error(message):
     "Logs error message, sys.exit(1)"
     logger.error(message)
@@ -688,6 +735,16 @@ def copy_tree(src: str, dst: str, clobber_files=False) -> list:
     return list(after - before)
 
 
+class TrackingFileSystemLoader(jinja2.FileSystemLoader):
+    """FileSystemLoader that records every template file it loads, including
+    ``include``/``import``/``extends`` targets, as a compile dependency."""
+
+    def get_source(self, environment, template):
+        source, filename, uptodate = super().get_source(environment, template)
+        track_dependency(filename)
+        return source, filename, uptodate
+
+
 def render_jinja2_file(
     name,
     context,
@@ -699,7 +756,7 @@ def render_jinja2_file(
     search_paths = [path or "./"] + (search_paths or [])
     env = jinja2.Environment(
         undefined=jinja2.StrictUndefined,
-        loader=jinja2.FileSystemLoader(search_paths),
+        loader=TrackingFileSystemLoader(search_paths),
         trim_blocks=True,
         lstrip_blocks=True,
         extensions=["jinja2.ext.do"],
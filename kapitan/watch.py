@@ -0,0 +1,239 @@
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""
+``kapitan compile --watch``: recompile affected targets when files change.
+
+The watching process stays alive between compiles, keeping the rendered
+inventory, the jsonnet import cache, the kadet caches and a
+:class:`kapitan.targets.CompilePool` warm. Changes are detected by polling
+modification times and sizes of the inventory and of every file read by the
+last compile, as recorded in the incremental compile fingerprints, so no OS
+specific file notification API is needed. Input paths looked up in the search
+paths are watched for newly matching files.
+
+When inventory files change only the targets using them are rendered again
+(see :meth:`kapitan.inventory.Inventory.targets_affected_by`), every compile
+is incremental so only targets whose inputs changed are recompiled.
+"""
+
+import contextlib
+import logging
+import os
+import tempfile
+import time
+
+from kapitan import cached
+from kapitan.errors import InventoryError, KapitanError
+from kapitan.incremental import (
+    GLOBAL_INVENTORY,
+    LOOKUP_PREFIX,
+    FingerprintStore,
+    lookup_digest,
+)
+from kapitan.resources import get_inventory
+from kapitan.targets import (
+    CompilePool,
+    compile_executor,
+    compile_targets,
+    new_cache_metrics,
+    reset_compile_caches,
+    worker_memory_limit,
+    worker_task_limit,
+)
+from kapitan.tool_runner import new_tool_slots
+from kapitan.utils import available_cpu_count
+
+
+logger = logging.getLogger(__name__)
+
+# Seconds between two scans for changed files.
+POLL_INTERVAL = 0.5
+
+
+def _stat(path: str) -> tuple | str | None:
+    if path.startswith(LOOKUP_PREFIX):
+        return lookup_digest(path)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class PollingWatcher:
+    """Detect changed, added and removed files by polling.
+
+    Every file below ``directories`` is watched, together with the files and
+    input path lookups (see :func:`kapitan.incremental.track_lookup`) passed
+    to :meth:`add_files`.
+    """
+
+    def __init__(self, directories, interval: float = POLL_INTERVAL):
+        self.directories = list(directories)
+        self.interval = interval
+        self.files: set[str] = set()
+        self.state = self._scan()
+
+    def _scan(self) -> dict:
+        state = {path: _stat(path) for path in self.files}
+        for directory in self.directories:
+            for root, dirs, filenames in os.walk(directory):
+                dirs[:] = [d for d in dirs if not d.startswith(".")]
+                for name in filenames:
+                    path = os.path.join(root, name)
+                    state[path] = _stat(path)
+        return state
+
+    def add_files(self, paths) -> None:
+        """Watch paths too, taking their current state as unchanged."""
+        for path in set(paths) - self.files:
+            self.files.add(path)
+            self.state.setdefault(path, _stat(path))
+
+    def poll(self) -> set[str]:
+        """Paths that changed since the previous poll."""
+        state = self._scan()
+        changed = {
+            path
+            for path in state.keys() | self.state.keys()
+            if state.get(path) != self.state.get(path)
+        }
+        self.state = state
+        return changed
+
+    def wait(self) -> set[str]:
+        """Block until files changed and return them.
+
+        Polling goes on until a scan finds no further changes, so a burst of
+        writes (e.g. a git checkout) is handled as a single change.
+        """
+        changed = set()
+        while True:
+            time.sleep(self.interval)
+            new_changes = self.poll()
+            if not new_changes and changed:
+                return changed
+            changed |= new_changes
+
+
+class CompileWatch:
+    """Compile, wait for changes and recompile what they affect, in a loop."""
+
+    def __init__(self, inventory_path, search_paths, ref_controller, args):
+        self.inventory_path = inventory_path
+        self.search_paths = search_paths
+        self.ref_controller = ref_controller
+        self.args = args
+        # only recompile targets whose fingerprint changed
+        self.args.incremental = True
+        self.watcher = PollingWatcher([inventory_path])
+
+    def compile(self, compile_pool=None) -> bool:
+        """Run one incremental compile, returns False if it failed."""
+        try:
+            compile_targets(
+                self.inventory_path,
+                list(self.search_paths),
+                self.ref_controller,
+                self.args,
+                compile_pool=compile_pool,
+            )
+        # get_inventory() exits on inventory errors, keep watching instead
+        except (KapitanError, SystemExit) as e:
+            logger.error("Compile failed: %s", e)
+            return False
+        finally:
+            self.watcher.add_files(self._dependencies())
+        return True
+
+    def _dependencies(self) -> set[str]:
+        """Every file read and input path looked up by the targets compiled so far."""
+        fingerprints = FingerprintStore(self.args.output_path)
+        return {
+            dependency
+            for entry in fingerprints.entries.values()
+            for dependency in entry.get("dependencies", {})
+            if dependency != GLOBAL_INVENTORY
+        }
+
+    def apply(self, changed, compile_pool=None) -> None:
+        """Drop the cached state derived from the changed files."""
+        changed = {
+            os.path.abspath(path)
+            for path in changed
+            if not path.startswith(LOOKUP_PREFIX)
+        }
+        inventory_path = os.path.abspath(self.inventory_path) + os.sep
+        inventory_changes = {
+            path for path in changed if path.startswith(inventory_path)
+        }
+        reset_compile_caches(changed)
+        if compile_pool is not None:
+            compile_pool.invalidate(changed)
+        if inventory_changes:
+            self._rerender_inventory(inventory_changes)
+
+    def _rerender_inventory(self, changed) -> None:
+        inventory = cached.inv
+        affected = None
+        # with class wildcards targets are rendered from an expanded copy
+        if inventory and inventory.inventory_path == inventory.original_inventory_path:
+            affected = inventory.targets_affected_by(changed)
+        if affected is None:
+            logger.info("Inventory changed, rendering all targets")
+            cached.inv = {}
+            try:
+                get_inventory(self.inventory_path)
+            except SystemExit as e:
+                raise InventoryError("Inventory could not be rendered") from e
+            return
+        logger.info("Inventory changed, rendering %d targets", len(affected))
+        try:
+            inventory.rerender_targets(affected)
+        except KapitanError:
+            # render everything once the inventory is fixed
+            cached.inv = {}
+            raise
+        cached.global_inv = inventory.inventory
+
+    def run(self) -> None:
+        processes = self.args.parallelism or available_cpu_count()
+        with contextlib.ExitStack() as stack:
+            # with --executor threads, the caches of this process stay warm
+            compile_pool = None
+            if compile_executor(self.args) == "processes":
+                seed_path = stack.enter_context(
+                    tempfile.TemporaryDirectory(prefix="kapitan-watch-")
+                )
+                compile_pool = stack.enter_context(
+                    CompilePool(
+                        processes,
+                        seed_path,
+                        new_cache_metrics(self.args),
+                        worker_task_limit(self.args),
+                        new_tool_slots(self.args),
+                        worker_memory_limit(self.args),
+                    )
+                )
+            self.compile(compile_pool)
+            while True:
+                logger.info("Watching for changes, press Ctrl+C to stop")
+                changed = self.watcher.wait()
+                for path in sorted(changed):
+                    logger.debug("Changed: %s", path)
+                try:
+                    self.apply(changed, compile_pool)
+                except KapitanError as e:
+                    logger.error("Inventory rendering failed: %s", e)
+                    continue
+                self.compile(compile_pool)
+
+
+def watch_compile(inventory_path, search_paths, ref_controller, args) -> None:
+    """Compile and keep recompiling on changes until interrupted."""
+    try:
+        CompileWatch(inventory_path, search_paths, ref_controller, args).run()
+    except KeyboardInterrupt:
+        logger.info("Stopped watching")
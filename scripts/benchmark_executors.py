@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+"""Compare the wall time of `kapitan compile` on processes and on threads.
+
+Compiles a copy of an example inventory (examples/kubernetes by default) with
+every executor a few times and prints the best and median run of each.
+Arguments after `--` are passed to `kapitan compile`, e.g. to leave out
+targets whose tools aren't installed.
+
+Usage:
+    make benchmark-executors
+    # or directly:
+    uv run python scripts/benchmark_executors.py --runs 5 -- -t minikube-es minikube-mysql
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import sysconfig
+import tempfile
+import time
+
+
+REPO_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+EXECUTORS = ("processes", "threads")
+
+
+def compile_once(work: str, executor: str, compile_args: list[str]) -> float:
+    """Wall time of one compile of the inventory in work, from scratch."""
+    shutil.rmtree(os.path.join(work, "compiled"), ignore_errors=True)
+    env = os.environ.copy()
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    start = time.perf_counter()
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-m",
+            "kapitan",
+            "compile",
+            "--executor",
+            executor,
+            *compile_args,
+        ],
+        cwd=work,
+        check=False,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"[benchmark] compile with --executor {executor} failed")
+    return elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--example",
+        default=os.path.join(REPO_ROOT, "examples", "kubernetes"),
+        help="inventory to compile, default examples/kubernetes",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per executor")
+    parser.add_argument("compile_args", nargs="*", help="kapitan compile arguments")
+    args = parser.parse_args()
+
+    free_threaded = bool(sysconfig.get_config_var("Py_GIL_DISABLED"))
+    print(
+        f"[benchmark] Python {sys.version.split()[0]}"
+        f"{' free-threaded' if free_threaded else ''}, {os.cpu_count()} CPUs",
+        flush=True,
+    )
+    with tempfile.TemporaryDirectory(prefix="kapitan_benchmark_") as tmp:
+        work = os.path.join(tmp, os.path.basename(args.example))
+        shutil.copytree(args.example, work)
+        # warm up imports and the filesystem cache
+        compile_once(work, EXECUTORS[0], args.compile_args)
+
+        timings = {executor: [] for executor in EXECUTORS}
+        for _ in range(args.runs):
+            # interleave the executors so both see the same system noise
+            for executor in EXECUTORS:
+                timings[executor].append(
+                    compile_once(work, executor, args.compile_args)
+                )
+
+    for executor, runs in timings.items():
+        print(
+            f"[benchmark] {executor:>9}: best {min(runs):.2f}s, "
+            f"median {statistics.median(runs):.2f}s over {len(runs)} runs"
+        )
+    speedup = statistics.median(timings["processes"]) / statistics.median(
+        timings["threads"]
+    )
+    print(f"[benchmark] threads vs processes: {speedup:.2f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
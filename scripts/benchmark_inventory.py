@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: Apache-2.0
+"""Measure how long the OmegaConf backend takes to render inventories of growing size.
+
+Generates synthetic inventories of 100, 1,000 and 5,000 targets (or the sizes
+given with --targets), sharing a few layers of classes with interpolations,
+and prints the best and median render time of each.
+
+Usage:
+    make benchmark-inventory
+    # or directly:
+    uv run python scripts/benchmark_inventory.py --runs 3 --targets 100 1000 5000
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+
+REPO_ROOT = os.path.abspath(os.path.dirname(os.path.dirname(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from kapitan.inventory.backends.omegaconf import OmegaConfInventory  # noqa: E402
+
+
+COMPONENTS = 20
+
+
+def _write(path: str, content: str) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(content)
+
+
+def generate_inventory(path: str, targets: int) -> None:
+    """Write an inventory of targets sharing common and component classes."""
+    _write(
+        os.path.join(path, "classes", "common.yml"),
+        "parameters:\n"
+        "  namespace: ${_kapitan_.name.short}\n"
+        "  kapitan:\n"
+        "    vars:\n"
+        "      target: ${_kapitan_.name.full}\n"
+        "  labels:\n"
+        "    team: platform\n"
+        "    target: ${_kapitan_.name.short}\n",
+    )
+    for component in range(COMPONENTS):
+        _write(
+            os.path.join(path, "classes", "components", f"app{component}.yml"),
+            "classes:\n"
+            "  - common\n"
+            "parameters:\n"
+            f"  app{component}:\n"
+            f"    image: registry.example.com/app{component}:1.0\n"
+            "    replicas: 2\n"
+            "    namespace: ${namespace}\n"
+            "    args: ['--port', '8080']\n"
+            "    env:\n" + "".join(f"      VAR_{i}: value-{i}\n" for i in range(20)),
+        )
+    for target in range(targets):
+        _write(
+            os.path.join(path, "targets", f"target{target}.yml"),
+            "classes:\n"
+            f"  - components.app{target % COMPONENTS}\n"
+            f"  - components.app{(target + 1) % COMPONENTS}\n"
+            "parameters:\n"
+            f"  target_name: target{target}\n",
+        )
+
+
+def render_once(path: str) -> float:
+    """Wall time of rendering the inventory at path."""
+    start = time.perf_counter()
+    OmegaConfInventory(inventory_path=path)
+    return time.perf_counter() - start
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--targets",
+        type=int,
+        nargs="+",
+        default=[100, 1000, 5000],
+        help="inventory sizes to render, default 100 1000 5000",
+    )
+    parser.add_argument("--runs", type=int, default=3, help="runs per size")
+    args = parser.parse_args()
+
+    print(f"[benchmark] Python {sys.version.split()[0]}, {os.cpu_count()} CPUs")
+    with tempfile.TemporaryDirectory(prefix="kapitan_benchmark_") as tmp:
+        for targets in args.targets:
+            path = os.path.join(tmp, str(targets))
+            generate_inventory(path, targets)
+            runs = [render_once(path) for _ in range(args.runs)]
+            print(
+                f"[benchmark] {targets:>6} targets: best {min(runs):.2f}s, "
+                f"median {statistics.median(runs):.2f}s over {len(runs)} runs",
+                flush=True,
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,228 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.incremental and `kapitan compile --incremental`."""
+
+import os
+
+import pytest
+
+from kapitan.cached import reset_cache
+from kapitan.cli import main as kapitan
+from kapitan.incremental import (
+    ABSENT,
+    GLOBAL_INVENTORY,
+    FingerprintStore,
+    TrackedMapping,
+    path_digest,
+    track_dependency,
+    track_lookup,
+    tracking,
+)
+
+
+@pytest.fixture
+def cache_home(temp_dir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    return temp_dir
+
+
+def test_track_dependency_outside_tracking_is_noop():
+    track_dependency("some/file")  # must not raise
+
+
+def test_tracking_records_absolute_paths():
+    with tracking() as dependencies:
+        track_dependency("some/file")
+    assert dependencies == {os.path.abspath("some/file")}
+
+
+def test_tracked_mapping_records_global_inventory_access():
+    inventory = TrackedMapping({"t1": {"parameters": {}}})
+    with tracking() as dependencies:
+        assert len(inventory) == 1
+    assert dependencies == set()
+
+    with tracking() as dependencies:
+        inventory["t1"]
+    assert dependencies == {GLOBAL_INVENTORY}
+
+
+def test_path_digest(temp_dir):
+    file_path = os.path.join(temp_dir, "a.txt")
+    assert path_digest(file_path) == ABSENT
+
+    with open(file_path, "w") as fp:
+        fp.write("a")
+    file_digest = path_digest(file_path)
+    dir_digest = path_digest(temp_dir)
+
+    with open(file_path, "w") as fp:
+        fp.write("b")
+    assert path_digest(file_path) != file_digest
+    assert path_digest(temp_dir) != dir_digest
+
+
+def test_fingerprint_store_roundtrip(cache_home):
+    compiled_target_path = os.path.join(cache_home, "compiled", "t1")
+    os.makedirs(compiled_target_path)
+    input_path = os.path.join(cache_home, "input.jsonnet")
+    with open(input_path, "w") as fp:
+        fp.write("{}")
+
+    base = {"inventory": "abc"}
+    store = FingerprintStore(cache_home)
+    store.update("t1", "t1", base, {input_path})
+    store.save()
+
+    store = FingerprintStore(cache_home)
+    assert store.is_fresh("t1", base, compiled_target_path)
+    assert not store.is_fresh("t1", {"inventory": "def"}, compiled_target_path)
+    assert not store.is_fresh("t2", base, compiled_target_path)
+
+    with open(input_path, "w") as fp:
+        fp.write("{a: 1}")
+    assert not FingerprintStore(cache_home).is_fresh("t1", base, compiled_target_path)
+
+
+def test_fingerprint_store_records_absolute_paths(cache_home, monkeypatch):
+    monkeypatch.chdir(cache_home)
+    with tracking() as dependencies:
+        track_lookup("templates/*.txt", ["."])
+    store = FingerprintStore(cache_home)
+    store.update("t1", "t1", {}, dependencies | {"input.jsonnet", GLOBAL_INVENTORY})
+    assert sorted(store.entries["t1"]["dependencies"]) == sorted(
+        [
+            os.path.join(cache_home, "input.jsonnet"),
+            GLOBAL_INVENTORY,
+            *dependencies,
+        ]
+    )
+    assert cache_home in next(iter(dependencies))
+
+
+def test_fingerprint_store_global_inventory(cache_home):
+    compiled_target_path = os.path.join(cache_home, "compiled", "t1")
+    os.makedirs(compiled_target_path)
+    inventory = {"t1": {"a": 1}, "t2": {"b": 1}}
+
+    store = FingerprintStore(cache_home, global_inventory=lambda: inventory)
+    store.update("t1", "t1", {}, {GLOBAL_INVENTORY})
+    store.save()
+
+    assert FingerprintStore(cache_home, global_inventory=lambda: inventory).is_fresh(
+        "t1", {}, compiled_target_path
+    )
+    inventory["t2"]["b"] = 2
+    assert not FingerprintStore(
+        cache_home, global_inventory=lambda: inventory
+    ).is_fresh("t1", {}, compiled_target_path)
+
+
+def test_fingerprint_store_lookups(cache_home):
+    compiled_target_path = os.path.join(cache_home, "compiled", "t1")
+    os.makedirs(compiled_target_path)
+    first, second = (os.path.join(cache_home, name) for name in ("first", "second"))
+    os.makedirs(os.path.join(second, "templates"))
+    with open(os.path.join(second, "templates", "one.txt"), "w") as fp:
+        fp.write("one")
+
+    with tracking() as dependencies:
+        track_lookup("templates/*.txt", [first, second])
+        track_lookup("templates/one.txt", [first, second])
+    store = FingerprintStore(cache_home)
+    store.update("t1", "t1", {}, dependencies)
+    store.save()
+    assert FingerprintStore(cache_home).is_fresh("t1", {}, compiled_target_path)
+
+    # a file newly matching the glob
+    with open(os.path.join(second, "templates", "two.txt"), "w") as fp:
+        fp.write("two")
+    assert not FingerprintStore(cache_home).is_fresh("t1", {}, compiled_target_path)
+    store = FingerprintStore(cache_home)
+    store.update("t1", "t1", {}, dependencies)
+
+    # a file shadowing the input path in an earlier search path
+    os.makedirs(os.path.join(first, "templates"))
+    with open(os.path.join(first, "templates", "one.md"), "w") as fp:
+        fp.write("one")
+    assert store.is_fresh("t1", {}, compiled_target_path)
+    os.rename(
+        os.path.join(first, "templates", "one.md"),
+        os.path.join(first, "templates", "one.txt"),
+    )
+    store.invalidate()
+    assert not store.is_fresh("t1", {}, compiled_target_path)
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+class TestIncrementalCompile:
+    """Skipped targets are detected by deleting one of their compiled files:
+    recompiling a target restores it, skipping it does not."""
+
+    targets = ("-t", "minikube-mysql", "minikube-es")
+    mysql_manifest = "compiled/minikube-mysql/manifests/mysql_secret.yml"
+    es_manifest = "compiled/minikube-es/README.md"
+
+    def _compile(self):
+        reset_cache()
+        kapitan("compile", "--incremental", *self.targets)
+
+    def _compile_and_delete_manifests(self):
+        self._compile()
+        os.remove(self.mysql_manifest)
+        os.remove(self.es_manifest)
+
+    def test_unchanged_targets_are_skipped(self):
+        self._compile_and_delete_manifests()
+
+        self._compile()
+        assert not os.path.exists(self.mysql_manifest)
+        assert not os.path.exists(self.es_manifest)
+
+    def test_changed_class_only_recompiles_dependent_targets(self):
+        self._compile_and_delete_manifests()
+        with open("inventory/classes/component/mysql.yml", "a") as fp:
+            fp.write("  incremental_test: true\n")
+
+        self._compile()
+        assert os.path.exists(self.mysql_manifest)
+        assert not os.path.exists(self.es_manifest)
+
+    def test_changed_component_recompiles_target(self):
+        self._compile_and_delete_manifests()
+        with open("components/mysql/main.jsonnet", "a") as fp:
+            fp.write("\n")
+
+        self._compile()
+        assert os.path.exists(self.mysql_manifest)
+        assert not os.path.exists(self.es_manifest)
+
+    def test_missing_compiled_output_recompiles_target(self):
+        self._compile()
+        os.rename("compiled/minikube-es", "minikube-es.bak")
+
+        self._compile()
+        assert os.path.isdir("compiled/minikube-es")
+
+    def test_file_matching_input_glob_recompiles_target(self):
+        es_class = "inventory/classes/component/elasticsearch.yml"
+        with open(es_class) as fp:
+            content = fp.read()
+        with open(es_class, "w") as fp:
+            fp.write(
+                content.replace(
+                    "docs/elasticsearch/README.md", "docs/elasticsearch/*.md"
+                )
+            )
+        self._compile_and_delete_manifests()
+
+        with open("docs/elasticsearch/CHANGES.md", "w") as fp:
+            fp.write("# Changes\n")
+        self._compile()
+        assert os.path.exists(self.es_manifest)
+        assert os.path.exists("compiled/minikube-es/CHANGES.md")
+        assert not os.path.exists(self.mysql_manifest)
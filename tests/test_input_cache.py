@@ -5,7 +5,7 @@ from pathlib import Path
 from unittest.mock import patch
 
 from kapitan.errors import CompileError
-from kapitan.inputs.cache import CacheMetrics, InputCache
+from kapitan.inputs.cache import CacheMetrics, InputCache, count_lookups
 
 
 class InputCacheTest(unittest.TestCase):
@@ -223,6 +223,22 @@ class InputCacheTest(unittest.TestCase):
                     metrics.snapshot(), {"hits": 2, "misses": 2, "fills": 2}
                 )
 
+    def test_count_lookups_per_target(self):
+        """
+        count_lookups() counts the hits and misses made inside the block only.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.dict(os.environ, {"HOME": tmpdir}, clear=True):
+                cache = InputCache("test_input")
+                cache.get("hash_a")  # miss, outside of the block
+                cache.set("hash_a", {"x": 1})
+
+                with count_lookups() as counts:
+                    cache.get("hash_a")  # hit
+                    cache.get("hash_b")  # miss
+
+                self.assertEqual(counts, {"hits": 1, "misses": 1})
+
     def test_dump_and_load_output(self):
         """
         tests the dump_output and load_output methods
@@ -20,7 +20,7 @@ import yaml
 from kapitan import cached
 from kapitan.cached import reset_cache
 from kapitan.errors import CompileError, KapitanError
-from kapitan.inputs.base import CompiledFile, InputType
+from kapitan.inputs.base import CompiledFile, InputType, OutputWriter
 from kapitan.inventory.model.input_types import (
     KapitanInputTypeCopyConfig,
     OutputType,
@@ -37,6 +37,19 @@ class MockInputType(InputType):
         return ""
 
 
+class ManyFilesInputType(InputType):
+    """Writes one plain file per item of the input file."""
+
+    def compile_file(self, config, input_path, compile_path):
+        self.pipelined = self.output_writer is not None
+        with open(input_path) as fp:
+            for line in fp.read().splitlines():
+                self.to_file(config, os.path.join(compile_path, line), line)
+
+    def inputs_hash(self, *inputs, **kwargs):
+        return ""
+
+
 @pytest.mark.usefixtures("reset_cached_args")
 class ToFileTest(unittest.TestCase):
     def setUp(self):
@@ -260,3 +273,77 @@ class CompiledFileTest(unittest.TestCase):
             compiler.compile_input_path(config, "/some/path")
         self.assertIn("test-target", str(ctx.exception))
         self.assertIn("simulated failure", str(ctx.exception))
+
+
+class OutputWriterTest(unittest.TestCase):
+    def test_writes_in_order(self):
+        written = []
+        with OutputWriter(maxsize=2) as writer:
+            for i in range(100):
+                writer.submit(written.append, i)
+        self.assertEqual(written, list(range(100)))
+
+    def test_write_error_is_raised(self):
+        def write(i):
+            if i == 3:
+                raise KapitanError("write failed")
+            written.append(i)
+
+        written = []
+        with self.assertRaises(KapitanError), OutputWriter(maxsize=1) as writer:
+            for i in range(100):
+                writer.submit(write, i)
+        # writes after the failed one are dropped
+        self.assertEqual(written, [0, 1, 2])
+
+    def test_queued_writes_dropped_on_error(self):
+        written = []
+        with self.assertRaises(ValueError), OutputWriter() as writer:
+            writer.submit(written.append, 1)
+            raise ValueError("input failed")
+        self.assertIn(written, ([], [1]))
+
+
+@pytest.mark.usefixtures("reset_cached_args")
+class CompileObjOutputTest(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(prefix="kapitan_base_test_")
+        self.compile_path = os.path.join(self.temp_dir, "compiled")
+        cached.args = Namespace(reveal=False, indent=2, pipeline_writes=True)
+        cached.inv = {"test-target": {"parameters": {}}}
+        with open(os.path.join(self.temp_dir, "items"), "w") as fp:
+            fp.write("\n".join(f"file-{i}" for i in range(200)))
+
+    def tearDown(self):
+        reset_cache()
+        import shutil
+
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_compile_obj_writes_every_file_before_returning(self):
+        compiler = ManyFilesInputType(
+            self.compile_path, [self.temp_dir], None, "test-target", cached.args
+        )
+        config = KapitanInputTypeCopyConfig(
+            input_paths=["items"], output_path=".", output_type=OutputType.PLAIN
+        )
+        compiler.compile_obj(config)
+
+        self.assertTrue(compiler.pipelined)
+        self.assertIsNone(compiler.output_writer)
+        target_path = os.path.join(self.compile_path, "test-target")
+        self.assertEqual(len(os.listdir(target_path)), 200)
+        with open(os.path.join(target_path, "file-199")) as fp:
+            self.assertEqual(fp.read(), "file-199")
+
+    def test_compile_obj_raises_write_errors(self):
+        compiler = ManyFilesInputType(
+            self.compile_path, [self.temp_dir], None, "test-target", cached.args
+        )
+        config = KapitanInputTypeCopyConfig(
+            input_paths=["items"], output_path=".", output_type=OutputType.YAML
+        )
+        config.output_type = "UNSUPPORTED"
+        with self.assertRaises(ValueError) as ctx:
+            compiler.compile_obj(config)
+        self.assertIn("not supported", str(ctx.exception))
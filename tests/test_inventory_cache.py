@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.inventory.cache — the persistent rendered-inventory cache."""
+
+import os
+from argparse import Namespace
+
+import pytest
+
+from kapitan import cached
+from kapitan.cached import reset_cache
+from kapitan.inventory.backends.reclass import ReclassInventory
+from kapitan.inventory.cache import inventory_cache_key
+from kapitan.resources import get_inventory
+
+
+@pytest.fixture
+def inventory_cache(isolated_kubernetes_inventory, temp_dir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    renders = []
+    render_targets = ReclassInventory.render_targets
+
+    def counting_render_targets(self, targets=None, ignore_class_not_found=False):
+        renders.append(set(targets))
+        return render_targets(self, targets, ignore_class_not_found)
+
+    monkeypatch.setattr(ReclassInventory, "render_targets", counting_render_targets)
+    return renders
+
+
+def test_inventory_cache_skips_rendering(inventory_cache):
+    rendered = ReclassInventory(inventory_path="inventory", cache=True)
+    loaded = ReclassInventory(inventory_path="inventory", cache=True)
+
+    assert len(inventory_cache) == 1
+    assert loaded.targets == rendered.targets
+    assert loaded.inventory == rendered.inventory
+
+    # without --inventory-cache the inventory is always rendered
+    ReclassInventory(inventory_path="inventory")
+    assert len(inventory_cache) == 2
+
+
+def test_inventory_cache_key_covers_files_and_flags(inventory_cache):
+    inventory = ReclassInventory(inventory_path="inventory", initialise=False)
+    key = inventory_cache_key(inventory)
+    assert inventory_cache_key(inventory) == key
+
+    inventory.compose_target_name = True
+    assert inventory_cache_key(inventory) != key
+    inventory.compose_target_name = False
+
+    with open(os.path.join("inventory", "reclass-config.yml"), "w") as fp:
+        fp.write("ignore_class_notfound: false\n")
+    config_key = inventory_cache_key(inventory)
+    assert config_key != key
+
+    with open(os.path.join("inventory", "classes", "common.yml"), "a") as fp:
+        fp.write("\n# a comment\n")
+    assert inventory_cache_key(inventory) != config_key
+
+
+def test_get_inventory_uses_inventory_cache(inventory_cache):
+    cached.args = Namespace(inventory_cache=True)
+    inventory = get_inventory("inventory")
+    es_parameters = inventory.get_parameters("minikube-es")
+
+    reset_cache()
+    cached.args = Namespace(inventory_cache=True)
+    with open(os.path.join("inventory", "classes", "common.yml")) as fp:
+        common = fp.read()
+    assert get_inventory("inventory").get_parameters("minikube-es") == es_parameters
+    assert len(inventory_cache) == 1
+
+    # changing a class renders the inventory again
+    with open(os.path.join("inventory", "classes", "common.yml"), "w") as fp:
+        fp.write(common.replace("parameters:", "parameters:\n  cache_test: 1", 1))
+    reset_cache()
+    cached.args = Namespace(inventory_cache=True)
+    assert get_inventory("inventory").get_parameters("minikube-es").cache_test == 1
+    assert len(inventory_cache) == 2
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(content)
+
+
+def _rendered(inventory):
+    return {name: target.model_dump() for name, target in inventory.targets.items()}
+
+
+def test_inventory_cache_renders_changed_targets(inventory_cache):
+    ReclassInventory(inventory_path="inventory", cache=True)
+    mysql_class = os.path.join("inventory", "classes", "component", "mysql.yml")
+    with open(mysql_class) as fp:
+        mysql = fp.read()
+    _write(mysql_class, mysql.replace("parameters:", "parameters:\n  changed: 1", 1))
+    os.remove(os.path.join("inventory", "targets", "minikube-es.yml"))
+    _write(
+        os.path.join("inventory", "targets", "added.yml"),
+        "classes:\n  - common\nparameters:\n  target_name: added\n",
+    )
+
+    inventory = ReclassInventory(inventory_path="inventory", cache=True)
+    assert inventory_cache[-1] == {"minikube-mysql", "added"}
+    assert "minikube-es" not in inventory.targets
+    assert inventory.get_parameters("minikube-mysql").changed == 1
+    assert _rendered(inventory) == _rendered(ReclassInventory("inventory"))
+
+    # reclass-config.yml isn't read by any single target: render everything
+    _write(os.path.join("inventory", "reclass-config.yml"), "{}\n")
+    renders = len(inventory_cache)
+    ReclassInventory(inventory_path="inventory", cache=True)
+    assert inventory_cache[renders:] == [set(inventory.targets)]
+
+
+def test_inventory_cache_renders_all_targets_when_exports_change(inventory_cache):
+    exporter = os.path.join("inventory", "targets", "exporter.yml")
+    _write(exporter, "exports:\n  address: a\n")
+    ReclassInventory(inventory_path="inventory", cache=True)
+
+    # inventory queries of other targets may read the exports
+    _write(exporter, "exports:\n  address: b\n")
+    inventory = ReclassInventory(inventory_path="inventory", cache=True)
+    assert inventory_cache[-2:] == [{"exporter"}, set(inventory.targets)]
+    assert inventory.get_target("exporter").exports == {"address": "b"}
+
+
+def test_omegaconf_inventory_cache_resolves_relative_classes(temp_dir, monkeypatch):
+    from kapitan.inventory.backends.omegaconf import OmegaConfInventory
+
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    monkeypatch.chdir(temp_dir)
+    _write(
+        os.path.join("inventory", "classes", "app", "init.yml"),
+        "classes:\n  - .settings\n",
+    )
+    settings = os.path.join("inventory", "classes", "app", "settings.yml")
+    _write(settings, "parameters:\n  replicas: 1\n")
+    _write(os.path.join("inventory", "classes", "common.yml"), "parameters: {}\n")
+    _write(os.path.join("inventory", "targets", "app.yml"), "classes:\n  - app\n")
+    _write(os.path.join("inventory", "targets", "other.yml"), "classes:\n  - common\n")
+    OmegaConfInventory(inventory_path="inventory", cache=True)
+
+    renders = []
+    render_targets = OmegaConfInventory.render_targets
+
+    def counting_render_targets(self, targets=None, ignore_class_not_found=False):
+        renders.append(set(targets))
+        return render_targets(self, targets, ignore_class_not_found)
+
+    monkeypatch.setattr(OmegaConfInventory, "render_targets", counting_render_targets)
+    _write(settings, "parameters:\n  replicas: 3\n")
+    inventory = OmegaConfInventory(inventory_path="inventory", cache=True)
+    assert renders == [{"app"}]
+    assert inventory.get_parameters("app").replicas == 3
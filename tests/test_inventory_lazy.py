@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for lazy inventories — rendering only the targets looked up."""
+
+import os
+from argparse import Namespace
+
+import pytest
+
+from kapitan import cached
+from kapitan.inventory.backends.reclass import ReclassInventory
+from kapitan.inventory.snapshot import InventorySnapshot
+from kapitan.resources import get_inventory
+
+
+@pytest.fixture
+def renders(isolated_kubernetes_inventory, monkeypatch):
+    renders = []
+    render_targets = ReclassInventory.render_targets
+
+    def counting_render_targets(self, targets=None, ignore_class_not_found=False):
+        renders.append(set(targets))
+        return render_targets(self, targets, ignore_class_not_found)
+
+    monkeypatch.setattr(ReclassInventory, "render_targets", counting_render_targets)
+    return renders
+
+
+def test_lazy_inventory_renders_targets_on_lookup(renders):
+    inventory = ReclassInventory(inventory_path="inventory", lazy=True)
+    assert renders == []
+    assert "minikube-mysql" in inventory.inventory
+
+    es_parameters = inventory.get_parameters("minikube-es")
+    assert inventory.inventory["minikube-es"]["parameters"]["target_name"] == (
+        "minikube-es"
+    )
+    inventory.get_targets(["minikube-es", "minikube-mysql"])
+    assert renders == [{"minikube-es"}, {"minikube-mysql"}]
+
+    rendered = ReclassInventory(inventory_path="inventory")
+    assert es_parameters == rendered.get_parameters("minikube-es")
+    # iterating the global inventory renders every other target
+    assert dict(inventory.inventory) == rendered.inventory
+    assert renders[3] == set(rendered.targets) - {"minikube-es", "minikube-mysql"}
+    assert inventory.topics == rendered.topics
+
+
+def test_get_inventory_renders_requested_targets(renders):
+    cached.args = Namespace(targets=["minikube-es"])
+    inventory = get_inventory("inventory")
+    assert inventory.get_target("minikube-es").parameters.target_name == "minikube-es"
+    assert renders == [{"minikube-es"}]
+
+
+def test_snapshot_renders_pending_targets(renders, temp_dir):
+    cached.args = Namespace(targets=["minikube-es"])
+    inventory = get_inventory("inventory")
+    inventory.get_target("minikube-es")
+    snapshot = InventorySnapshot.write(
+        os.path.join(temp_dir, "inventory.snapshot"), cached.as_dict()
+    )
+    state = snapshot.load()
+
+    rendered = ReclassInventory(inventory_path="inventory")
+    assert state["global_inv"]["minikube-es"] == rendered.inventory["minikube-es"]
+    assert renders[1:] == [set(rendered.targets)]
+    # the snapshot doesn't hold minikube-mysql, it's rendered on lookup
+    assert state["global_inv"]["minikube-mysql"] == rendered.inventory["minikube-mysql"]
+    assert state["inv"].topics == rendered.topics
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.inventory.snapshot — lazily loaded inventory snapshots."""
+
+import os
+import pickle
+
+import pytest
+
+from kapitan import cached
+from kapitan.errors import InventoryError
+from kapitan.inventory.snapshot import InventorySnapshot, SnapshotInventory
+from kapitan.resources import get_inventory
+
+
+@pytest.fixture
+def snapshot_state(isolated_kubernetes_inventory, temp_dir):
+    inv = get_inventory("inventory")
+    snapshot = InventorySnapshot.write(
+        os.path.join(temp_dir, "inventory.snapshot"), cached.as_dict()
+    )
+    # workers receive the handle through the pool initializer
+    return inv, pickle.loads(pickle.dumps(snapshot)).load()
+
+
+def test_snapshot_restores_inventory(snapshot_state):
+    inv, state = snapshot_state
+    restored = state["inv"]
+
+    assert isinstance(restored, SnapshotInventory)
+    assert set(restored.targets) == set(inv.targets)
+    assert dict(state["global_inv"]) == inv.inventory
+    assert restored.topics == inv.topics
+    assert restored.get_target("minikube-es") == inv.get_target("minikube-es")
+    assert restored["minikube-es"] == inv["minikube-es"]
+    assert state["args"] == cached.args
+
+
+def test_snapshot_loads_targets_lazily(snapshot_state):
+    _, state = snapshot_state
+    restored = state["inv"]
+
+    assert len(restored.targets) > 1
+    assert restored.targets._values == {}
+    restored.get_parameters("minikube-es")
+    assert list(restored.targets._values) == ["minikube-es"]
+    assert state["global_inv"]._values == {}
+
+
+def test_snapshot_is_read_only(snapshot_state):
+    _, state = snapshot_state
+    with pytest.raises(InventoryError, match="read-only"):
+        state["inv"].render_targets()
@@ -17,7 +17,7 @@ from kapitan import cached
 from kapitan.cached import reset_cache
 from kapitan.errors import InventoryError
 from kapitan.inventory import get_inventory_backend
-from kapitan.inventory.backends.omegaconf import OmegaConfInventory
+from kapitan.inventory.backends.omegaconf import OmegaConfInventory, OmegaConfTarget
 from kapitan.inventory.backends.omegaconf.migrate import migrate_dir, migrate_str
 from kapitan.inventory.backends.omegaconf.resolvers import register_resolvers
 from kapitan.resources import get_inventory
@@ -163,6 +163,72 @@ class TestOmegaConfClassResolution(unittest.TestCase):
         shutil.rmtree(temp_dir)
 
 
+class TestOmegaConfRenderTargets(unittest.TestCase):
+    """Tests for rendering targets in the OmegaConf worker pool."""
+
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        os.makedirs(os.path.join(self.temp_dir, "classes"))
+        os.makedirs(os.path.join(self.temp_dir, "targets"))
+        with open(os.path.join(self.temp_dir, "classes", "common.yml"), "w") as f:
+            f.write("parameters:\n  namespace: ${_kapitan_.name.short}\n")
+        for name in ("first", "second", "third"):
+            with open(os.path.join(self.temp_dir, "targets", f"{name}.yml"), "w") as f:
+                f.write("classes:\n  - common\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_render_targets_in_pool(self):
+        inventory = OmegaConfInventory(inventory_path=self.temp_dir)
+        for name in ("first", "second", "third"):
+            target = inventory.get_target(name)
+            self.assertEqual(target.parameters.namespace, name)
+            self.assertEqual(target.classes, ["common"])
+
+    def test_render_targets_reports_every_failed_target(self):
+        for name in ("first", "third"):
+            with open(os.path.join(self.temp_dir, "targets", f"{name}.yml"), "a") as f:
+                f.write("  - missing\n")
+
+        with self.assertRaisesRegex(InventoryError, "could not render: first, third"):
+            OmegaConfInventory(inventory_path=self.temp_dir)
+
+    def test_merged_classes_are_shared_between_targets(self):
+        inventory = OmegaConfInventory(inventory_path=self.temp_dir, initialise=False)
+        register_resolvers(self.temp_dir)
+        targets = [
+            OmegaConfTarget(name=name, path=f"{name}.yml")
+            for name in ("first", "second")
+        ]
+        for target in targets:
+            inventory.load_target(target)
+
+        common = os.path.join(self.temp_dir, "classes", "common.yml")
+        self.assertEqual(list(inventory._merged_classes), [common])
+        # the shared class still resolves per target
+        self.assertEqual(targets[0].parameters.namespace, "first")
+        self.assertEqual(targets[1].parameters.namespace, "second")
+
+    def test_load_target_resolves_escaped_interpolations(self):
+        inventory = OmegaConfInventory(inventory_path=self.temp_dir, initialise=False)
+        register_resolvers(self.temp_dir)
+        with open(os.path.join(self.temp_dir, "targets", "first.yml"), "a") as f:
+            f.write("parameters:\n  literal: ${escape:namespace}\n")
+        with open(os.path.join(self.temp_dir, "targets", "second.yml"), "a") as f:
+            f.write("parameters:\n  deferred: \\${namespace}\n")
+
+        # ${escape:} only needs a single resolve pass
+        first = OmegaConfTarget(name="first", path="first.yml")
+        inventory.load_target(first)
+        self.assertEqual(first.parameters.literal, "${namespace}")
+
+        # escaped interpolations are resolved by a second pass
+        second = OmegaConfTarget(name="second", path="second.yml")
+        inventory.load_target(second)
+        self.assertEqual(second.parameters.deferred, "second")
+
+
 class TestOmegaConfInventoryMigrationTiming(unittest.TestCase):
     """Tests that --migrate runs before inventory initialisation."""
 
@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.outputs — committing compiled output with write-if-changed."""
+
+import os
+import socket
+
+import pytest
+
+from kapitan.cached import reset_cache
+from kapitan.cli import main as kapitan
+from kapitan.outputs import (
+    commit_tree,
+    diff_trees,
+    files_equal,
+    merge_tree,
+    remove_stale_paths,
+    sync_tree,
+)
+from kapitan.targets import STAGING_DIR
+
+
+def _write(path, content, mode=None):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(content)
+    if mode is not None:
+        os.chmod(path, mode)
+
+
+@pytest.fixture
+def trees(temp_dir):
+    src = os.path.join(temp_dir, "src")
+    dst = os.path.join(temp_dir, "dst")
+    _write(os.path.join(src, "same.yml"), "a: 1\n")
+    _write(os.path.join(src, "changed.yml"), "b: 2\n")
+    _write(os.path.join(src, "new/added.yml"), "c: 3\n")
+    _write(os.path.join(dst, "same.yml"), "a: 1\n")
+    _write(os.path.join(dst, "changed.yml"), "b: 1\n")
+    _write(os.path.join(dst, "stale/removed.yml"), "d: 4\n")
+    return src, dst
+
+
+def test_files_equal_compares_mode_and_content(temp_dir):
+    a = os.path.join(temp_dir, "a")
+    b = os.path.join(temp_dir, "b")
+    _write(a, "x", mode=0o644)
+    _write(b, "x", mode=0o644)
+    assert files_equal(a, b)
+
+    os.chmod(b, 0o755)
+    assert not files_equal(a, b)
+
+    _write(b, "y", mode=0o644)
+    assert not files_equal(a, b)
+
+    # same size, differing only after the first chunk
+    _write(a, "x" * 100_000 + "a", mode=0o644)
+    _write(b, "x" * 100_000 + "b", mode=0o644)
+    assert not files_equal(a, b)
+
+
+def test_diff_trees(trees):
+    src, dst = trees
+    diff = diff_trees(src, dst)
+    assert diff.added == ["new/added.yml"]
+    assert diff.changed == ["changed.yml"]
+    assert diff.removed == ["stale/removed.yml"]
+    assert diff.unchanged == ["same.yml"]
+    assert diff.modified == ["changed.yml", "new/added.yml", "stale/removed.yml"]
+
+
+def test_sync_tree_only_writes_changes(trees):
+    src, dst = trees
+    same = os.path.join(dst, "same.yml")
+    os.utime(same, ns=(0, 0))
+    same_inode = os.stat(same).st_ino
+
+    sync_tree(src, dst)
+
+    assert diff_trees(src, dst).modified == []
+    assert not os.path.exists(os.path.join(dst, "stale"))
+    assert os.stat(same).st_mtime_ns == 0
+    assert os.stat(same).st_ino == same_inode
+
+
+def test_sync_tree_file_replaced_by_directory(temp_dir):
+    src = os.path.join(temp_dir, "src")
+    dst = os.path.join(temp_dir, "dst")
+    _write(os.path.join(src, "item/file.yml"), "a: 1\n")
+    _write(os.path.join(dst, "item"), "a: 1\n")
+
+    sync_tree(src, dst)
+    assert os.path.isfile(os.path.join(dst, "item/file.yml"))
+
+
+def test_sync_tree_directory_replaced_by_file(temp_dir):
+    src = os.path.join(temp_dir, "src")
+    dst = os.path.join(temp_dir, "dst")
+    _write(os.path.join(src, "item"), "a: 1\n")
+    _write(os.path.join(dst, "item/file.yml"), "a: 1\n")
+
+    sync_tree(src, dst)
+    assert os.path.isfile(os.path.join(dst, "item"))
+
+
+def test_merge_tree_moves_files_and_replaces_existing(temp_dir):
+    src = os.path.join(temp_dir, "src")
+    dst = os.path.join(temp_dir, "dst")
+    _write(os.path.join(src, "t1/a.yml"), "a: 2\n")
+    _write(os.path.join(src, "t1/new/b.yml"), "b: 1\n")
+    _write(os.path.join(dst, "t1/a.yml"), "a: 1\n")
+    _write(os.path.join(dst, "t1/c.yml"), "c: 1\n")
+
+    assert merge_tree(src, dst) == ["t1/a.yml", "t1/new/b.yml"]
+    assert not os.path.exists(src)
+    with open(os.path.join(dst, "t1/a.yml")) as fp:
+        assert fp.read() == "a: 2\n"
+    assert os.path.isfile(os.path.join(dst, "t1/c.yml"))
+
+
+def test_commit_tree_renames_new_target(temp_dir):
+    src = os.path.join(temp_dir, "staging/t1")
+    dst = os.path.join(temp_dir, "compiled/t1")
+    _write(os.path.join(src, "a.yml"), "a: 1\n")
+    inode = os.stat(os.path.join(src, "a.yml")).st_ino
+
+    assert commit_tree(src, dst).added == ["a.yml"]
+    assert not os.path.exists(src)
+    assert os.stat(os.path.join(dst, "a.yml")).st_ino == inode
+
+
+def test_commit_tree_skips_nested_targets(temp_dir):
+    src = os.path.join(temp_dir, "staging/t1")
+    dst = os.path.join(temp_dir, "compiled/t1")
+    _write(os.path.join(src, "a.yml"), "a: 2\n")
+    _write(os.path.join(dst, "a.yml"), "a: 1\n")
+    _write(os.path.join(dst, "nested/b.yml"), "b: 1\n")
+
+    diff = commit_tree(src, dst, exclude={"nested"})
+    assert diff.changed == ["a.yml"]
+    assert diff.removed == []
+    assert os.path.isfile(os.path.join(dst, "nested/b.yml"))
+
+
+def test_remove_stale_paths(temp_dir):
+    for path in ("t1/a.yml", "group/t2/b.yml", "group/old/c.yml", "old/d.yml", "e"):
+        _write(os.path.join(temp_dir, path), "x\n")
+
+    removed = remove_stale_paths(temp_dir, ["t1", "group/t2"])
+    assert removed == ["e", "group/old/c.yml", "old/d.yml"]
+    assert sorted(os.listdir(temp_dir)) == ["group", "t1"]
+    assert os.listdir(os.path.join(temp_dir, "group")) == ["t2"]
+
+
+def test_remove_stale_paths_dry_run(temp_dir):
+    for path in ("t1/a.yml", "old/d.yml"):
+        _write(os.path.join(temp_dir, path), "x\n")
+
+    assert remove_stale_paths(temp_dir, ["t1"], dry_run=True) == ["old/d.yml"]
+    assert os.path.isfile(os.path.join(temp_dir, "old/d.yml"))
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+class TestCompileWritesOnlyChanges:
+    def _compile(self, *argv):
+        reset_cache()
+        kapitan("compile", "-t", "minikube-mysql", "minikube-es", *argv)
+
+    def test_recompile_keeps_unchanged_files(self, temp_dir):
+        self._compile()
+        manifest = "compiled/minikube-mysql/manifests/mysql_secret.yml"
+        os.utime(manifest, ns=(0, 0))
+        _write("compiled/minikube-es/stale.yml", "stale: true\n")
+
+        changed_paths_output = os.path.join(temp_dir, "changed.txt")
+        self._compile("--changed-paths-output", changed_paths_output)
+
+        assert os.stat(manifest).st_mtime_ns == 0
+        assert not os.path.exists("compiled/minikube-es/stale.yml")
+        # targets are staged next to compiled/ and the staging dir is removed
+        assert not [name for name in os.listdir() if name.startswith(".kapitan-")]
+        with open(changed_paths_output) as fp:
+            assert fp.read() == "compiled/minikube-es/stale.yml\n"
+
+    def test_stale_staging_directories_are_removed(self):
+        host = socket.gethostname()
+        # a compile that died, one still running and one of another host
+        dead = os.path.join(STAGING_DIR, f"{host}.999999999.dead")
+        running = os.path.join(STAGING_DIR, f"{host}.{os.getpid()}.running")
+        remote = os.path.join(STAGING_DIR, "elsewhere.999999999.remote")
+        for path in (dead, running, remote):
+            _write(os.path.join(path, "compiled", "leftover.yml"), "a: 1\n")
+
+        self._compile()
+        assert sorted(os.listdir(STAGING_DIR)) == sorted(
+            os.path.basename(path) for path in (running, remote)
+        )
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+class TestCompileCheck:
+    def _compile(self, *argv):
+        reset_cache()
+        kapitan("compile", "-t", "minikube-mysql", "minikube-es", *argv)
+
+    def _tree(self):
+        tree = {}
+        for root, _, files in os.walk("compiled"):
+            for name in files:
+                path = os.path.join(root, name)
+                with open(path) as fp:
+                    tree[path] = (fp.read(), os.stat(path).st_mtime_ns)
+        return tree
+
+    def test_check_without_output(self):
+        with pytest.raises(SystemExit) as e:
+            self._compile("--check")
+        assert e.value.code == 1
+        assert not os.path.exists("compiled")
+
+    def test_check_reports_drift_without_writing(self, temp_dir, capsys):
+        self._compile()
+        self._compile("--check")
+
+        manifest = "compiled/minikube-es/manifests/es-master.yml"
+        with open(manifest) as fp:
+            content = fp.read()
+        _write(manifest, content.replace("replicas: 2", "replicas: 9"))
+        _write("compiled/minikube-es/stale.yml", "stale: true\n")
+        tree = self._tree()
+        capsys.readouterr()
+
+        changed_paths_output = os.path.join(temp_dir, "changed.txt")
+        with pytest.raises(SystemExit):
+            self._compile("--diff", "--changed-paths-output", changed_paths_output)
+
+        assert self._tree() == tree
+        assert "-  replicas: 9\n+  replicas: 2\n" in capsys.readouterr().out
+        with open(changed_paths_output) as fp:
+            assert fp.read().splitlines() == [
+                "compiled/minikube-es/manifests/es-master.yml",
+                "compiled/minikube-es/stale.yml",
+            ]
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.report and `kapitan compile --report-json`."""
+
+import json
+import os
+
+import pytest
+
+from kapitan.cached import reset_cache
+from kapitan.cli import main as kapitan
+from kapitan.report import (
+    build_compile_report,
+    current_rss,
+    peak_rss,
+    record_output_sizes,
+    reset_peak_rss,
+)
+from kapitan.targets import TargetCompileResult
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(content)
+
+
+def test_rss():
+    assert peak_rss() > 0
+    assert current_rss() > 0
+
+
+@pytest.mark.skipif(
+    not os.path.exists("/proc/self/clear_refs"), reason="needs Linux to reset peak"
+)
+def test_reset_peak_rss():
+    reset_peak_rss()
+    block = b"x" * 2**26
+    peak = peak_rss()
+    assert peak >= 2**26
+    del block
+    reset_peak_rss()
+    # the peak of the next task doesn't include memory freed since
+    assert peak_rss() <= peak - 2**25
+
+
+def test_record_output_sizes_excludes_nested_targets(temp_dir):
+    _write(os.path.join(temp_dir, "a/file.yml"), "abc")
+    _write(os.path.join(temp_dir, "a/b/file.yml"), "abcdef")
+    results = [
+        TargetCompileResult(target_name="a", target_full_path="a"),
+        TargetCompileResult(target_name="a.b", target_full_path="a/b"),
+    ]
+
+    record_output_sizes(results, temp_dir)
+    assert (results[0].files_written, results[0].bytes_written) == (1, 3)
+    assert (results[1].files_written, results[1].bytes_written) == (1, 6)
+
+
+def test_build_compile_report():
+    results = [
+        TargetCompileResult(
+            target_name="fast",
+            target_full_path="fast",
+            duration=1.0,
+            input_type_durations={"jsonnet": 1.0},
+            files_written=1,
+            bytes_written=10,
+            cache_hits=1,
+            peak_rss=100,
+        ),
+        TargetCompileResult(
+            target_name="slow",
+            target_full_path="slow",
+            duration=3.0,
+            input_type_durations={"jsonnet": 1.0, "helm": 2.0},
+            files_written=2,
+            bytes_written=20,
+            cache_misses=2,
+            peak_rss=300,
+        ),
+    ]
+
+    report = build_compile_report(results, {"compile": 3.5}, parallelism=2)
+    assert list(report["targets"]) == ["slow", "fast"]
+    assert report["targets"]["slow"]["input_types"] == {"helm": 2.0, "jsonnet": 1.0}
+    assert report["timings"] == {"compile": 3.5}
+    assert report["totals"] == {
+        "targets": 2,
+        "wall_time": 4.0,
+        "input_types": {"helm": 2.0, "jsonnet": 2.0},
+        "files_written": 3,
+        "bytes_written": 30,
+        "cache_hits": 1,
+        "cache_misses": 2,
+        "peak_rss": 300,
+    }
+    assert report["targets"]["fast"]["peak_rss"] == 100
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+def test_compile_report_json(temp_dir):
+    report_path = os.path.join(temp_dir, "report.json")
+    reset_cache()
+    kapitan(
+        "compile", "-t", "minikube-mysql", "minikube-es", "--report-json", report_path
+    )
+
+    with open(report_path) as fp:
+        report = json.load(fp)
+    assert set(report["targets"]) == {"minikube-mysql", "minikube-es"}
+    mysql = report["targets"]["minikube-mysql"]
+    assert "jsonnet" in mysql["input_types"]
+    assert mysql["files_written"] == len(
+        [f for _, _, files in os.walk("compiled/minikube-mysql") for f in files]
+    )
+    assert mysql["bytes_written"] > 0
+    assert mysql["peak_rss"] > 0
+    assert {"inventory", "compile", "commit", "total"} <= set(report["timings"])
@@ -0,0 +1,418 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.scheduling — cost-aware ordering of compile tasks."""
+
+import json
+import os
+import shutil
+import sys
+from multiprocessing.pool import ThreadPool
+from unittest.mock import patch
+
+import pytest
+from pydantic import ValidationError
+
+from kapitan import cached
+from kapitan.cached import reset_cache
+from kapitan.cli import build_parser
+from kapitan.cli import main as kapitan
+from kapitan.errors import CompileError
+from kapitan.inventory.model import KapitanInventorySettings
+from kapitan.scheduling import (
+    CompileStats,
+    batch_tasks,
+    find_cycle,
+    memory_bounded_workers,
+    order_dependencies_first,
+    order_longest_first,
+    predict_makespan,
+    run_task_graph,
+    target_dependencies,
+    target_weight,
+)
+from kapitan.targets import (
+    WorkerPool,
+    _compile_target_batch,
+    _pool_init,
+    compile_executor,
+    default_parallelism,
+    worker_memory_limit,
+    worker_task_limit,
+)
+
+
+@pytest.fixture
+def cache_home(temp_dir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    return temp_dir
+
+
+def _target(name, *input_types, depends_on=()):
+    return KapitanInventorySettings(
+        vars={"target": name},
+        compile=[
+            {"input_type": input_type, "input_paths": [], "output_path": "."}
+            for input_type in input_types
+        ],
+        depends_on=list(depends_on),
+    )
+
+
+def test_predict_makespan():
+    assert predict_makespan([], 2) == 0
+    assert predict_makespan([1, 1, 1, 1], 2) == 2
+    # a long task dispatched last keeps one worker busy on its own
+    assert predict_makespan([1, 1, 4], 2) == 5
+    assert predict_makespan([4, 1, 1], 2) == 4
+
+
+def test_batch_tasks_groups_tiny_targets():
+    estimates = {"slow": 10.0, "a": 0.1, "b": 0.1, "c": 0.1, "d": 0.1, "e": 0.1}
+    batches = batch_tasks(list(estimates), estimates, workers=1)
+    assert batches == [["slow"], ["a", "b", "c"], ["d", "e"]]
+
+
+def test_batch_tasks_keeps_enough_tasks_per_worker():
+    estimates = {name: 0.01 for name in "abcdefgh"}
+    batches = batch_tasks(list(estimates), estimates, workers=2)
+    assert [name for batch in batches for name in batch] == list("abcdefgh")
+    assert len(batches) == 8
+
+
+def test_target_weight_prefers_external_tools():
+    assert target_weight(_target("empty")) == 1.0
+    assert target_weight(_target("jsonnet", "jsonnet", "jinja2")) == 2.0
+    assert target_weight(_target("helm", "helm")) > target_weight(
+        _target("jsonnet", "jsonnet")
+    )
+
+
+def test_estimates_use_history_and_size_heuristic(cache_home):
+    stats = CompileStats(cache_home)
+    stats.record("slow", 8.0)
+    stats.record("fast", 1.0)
+    targets = [
+        _target("fast", "jsonnet"),
+        _target("new", "jsonnet", "jsonnet"),
+        _target("slow", "jsonnet"),
+    ]
+
+    estimates = stats.estimates(targets)
+    assert estimates["slow"] == 8.0
+    assert estimates["fast"] == 1.0
+    # 9s over 2 weight units of known targets
+    assert estimates["new"] == pytest.approx(9.0)
+
+    ordered = order_longest_first(targets, estimates)
+    assert [target.vars.target for target in ordered] == ["new", "slow", "fast"]
+
+
+def test_compile_stats_roundtrip_and_smoothing(cache_home):
+    stats = CompileStats(cache_home)
+    stats.record("t1", 2.0)
+    stats.save()
+
+    stats = CompileStats(cache_home)
+    assert stats.durations == {"t1": 2.0}
+    stats.record("t1", 4.0)
+    assert stats.durations == {"t1": 3.0}
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_compile_records_durations():
+    reset_cache()
+    kapitan("compile", "-t", "minikube-mysql", "minikube-es")
+
+    stats = CompileStats(os.getcwd())
+    with open(stats.path) as fp:
+        recorded = json.load(fp)
+    assert set(recorded["durations"]) == {"minikube-mysql", "minikube-es"}
+    assert set(recorded["peak_rss"]) == {"minikube-mysql", "minikube-es"}
+
+
+def test_compile_stats_peak_rss(cache_home):
+    stats = CompileStats(cache_home)
+    stats.record("small", 1.0, 100)
+    stats.record("large", 1.0, 300)
+    stats.record("unknown", 1.0)
+    stats.save()
+
+    stats = CompileStats(cache_home)
+    assert stats.rss == {"small": 100, "large": 300}
+    assert stats.peak_rss(["small", "large", "unknown"]) == 300
+    assert stats.peak_rss(["small"]) == 100
+    assert stats.peak_rss(["unknown"]) is None
+
+
+def test_memory_bounded_workers():
+    assert memory_bounded_workers(8 * 2**30, 2**30) == 8
+    assert memory_bounded_workers(8 * 2**30, 3 * 2**30) == 2
+    assert memory_bounded_workers(2**30, 3 * 2**30) == 1
+    assert memory_bounded_workers(-(2**30), 2**30) == 1
+
+
+def test_default_parallelism_fits_memory(cache_home):
+    stats = CompileStats(cache_home)
+    targets = [f"t{i}" for i in range(8)]
+    # no history: CPU bound
+    with patch("kapitan.targets.available_memory", return_value=8 * 2**30):
+        assert default_parallelism(targets, 4, stats) == 4
+
+    stats.record("t0", 1.0, 3 * 2**30)
+    with (
+        patch("kapitan.targets.available_memory", return_value=8 * 2**30),
+        patch("kapitan.targets.current_rss", return_value=2**30),
+    ):
+        assert default_parallelism(targets, 4, stats) == 2
+        assert default_parallelism(targets[1:], 4, stats) == 4
+        assert default_parallelism(targets[:1], 4, stats) == 1
+    with patch("kapitan.targets.available_memory", return_value=None):
+        assert default_parallelism(targets, 4, stats) == 4
+
+
+def test_worker_limits_from_args():
+    args = build_parser().parse_args(["compile"])
+    assert worker_task_limit(args) is None
+    assert worker_memory_limit(args) is None
+
+    args = build_parser().parse_args(["compile", "--max-tasks-per-worker", "3"])
+    assert worker_task_limit(args) == 3
+    assert worker_memory_limit(args) is None
+
+    args = build_parser().parse_args(["compile", "--max-worker-memory", "512"])
+    assert worker_task_limit(args) is None
+    assert worker_memory_limit(args) == 512 * 2**20
+
+
+def _pid(_):
+    return os.getpid()
+
+
+def _run_pids(pool, tasks, chained=True):
+    pids = {}
+    run_task_graph(
+        pool,
+        _pid,
+        dict.fromkeys(range(tasks)),
+        {c: {c - 1} for c in range(1, tasks)} if chained else {},
+        pids.__setitem__,
+    )
+    return set(pids.values())
+
+
+def test_worker_pool_recycles_workers_over_memory_limit():
+    # every worker is above 1 byte of RSS, so is replaced after each task
+    with WorkerPool(1, max_rss=1) as pool:
+        assert len(_run_pids(pool, 3)) == 3
+        pool.close()
+        pool.join()
+
+    with WorkerPool(1) as pool:
+        assert len(_run_pids(pool, 3)) == 1
+
+
+def test_worker_pool_recycles_workers_running_independent_tasks():
+    # all the tasks are submitted at once, they must not all go to the first
+    # worker before its memory is known
+    with WorkerPool(1, max_rss=1) as pool:
+        assert len(_run_pids(pool, 4, chained=False)) == 4
+        pool.close()
+        pool.join()
+
+    with WorkerPool(2, max_rss=1) as pool:
+        assert len(_run_pids(pool, 6, chained=False)) >= 3
+
+
+@pytest.mark.parametrize("use_pool", [False, True])
+def test_run_task_graph_respects_dependencies(use_pool):
+    tasks = {"a": 1, "b": 2, "c": 3, "d": 4}
+    dependencies = {"c": {"a", "b"}, "d": {"c"}}
+    completed = []
+
+    def on_result(key, result):
+        assert all(dependency in completed for dependency in dependencies.get(key, ()))
+        assert result == tasks[key] * 10
+        completed.append(key)
+
+    if use_pool:
+        with ThreadPool(2) as pool:
+            run_task_graph(pool, lambda x: x * 10, tasks, dependencies, on_result)
+    else:
+        run_task_graph(None, lambda x: x * 10, tasks, dependencies, on_result)
+    assert sorted(completed) == ["a", "b", "c", "d"]
+
+
+def test_run_task_graph_reraises_worker_errors():
+    def worker(task):
+        raise ValueError(task)
+
+    with ThreadPool(2) as pool, pytest.raises(ValueError, match="boom"):
+        run_task_graph(pool, worker, {"a": "boom"}, {}, lambda key, result: None)
+
+
+def test_find_cycle():
+    assert find_cycle({}) is None
+    assert find_cycle({"a": ["b", "c"], "b": ["c"], "c": []}) is None
+    assert find_cycle({"a": ["a"]}) == ["a", "a"]
+    assert find_cycle({"a": ["b"], "b": ["c"], "c": ["b"]}) == ["b", "c", "b"]
+
+
+def test_target_dependencies():
+    targets = [
+        _target("app", depends_on=["db", "other"]),
+        _target("db"),
+        _target("web", depends_on=["app"]),
+    ]
+    known = ["app", "db", "other", "web"]
+    # other is not compiled in this run, its output is used as is
+    assert target_dependencies(targets, known) == {
+        "app": {"db"},
+        "db": set(),
+        "web": {"app"},
+    }
+
+    with pytest.raises(CompileError, match="unknown targets: \\['missing'\\]"):
+        target_dependencies([_target("app", depends_on=["missing"])], known)
+
+    cycle = [_target("app", depends_on=["web"]), _target("web", depends_on=["app"])]
+    with pytest.raises(CompileError, match="cycle: app -> web -> app"):
+        target_dependencies(cycle, known)
+
+    # depends_on is validated with the inventory
+    with pytest.raises(ValidationError):
+        KapitanInventorySettings(vars={"target": "app"}, depends_on="db")
+
+
+def test_order_dependencies_first_keeps_order_otherwise():
+    targets = [_target("c"), _target("b", depends_on=["a"]), _target("a"), _target("d")]
+    dependencies = target_dependencies(targets, "abcd")
+    ordered = order_dependencies_first(targets, dependencies)
+    assert [target.vars.target for target in ordered] == ["c", "a", "b", "d"]
+
+
+def test_compile_executor(monkeypatch):
+    args = build_parser().parse_args(["compile"])
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: True, raising=False)
+    assert compile_executor(args) == "processes"
+    monkeypatch.setattr(sys, "_is_gil_enabled", lambda: False, raising=False)
+    assert compile_executor(args) == "threads"
+    args = build_parser().parse_args(["compile", "--executor", "processes"])
+    assert compile_executor(args) == "processes"
+
+
+def _read_tree(root):
+    contents = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as fp:
+                contents[os.path.relpath(path, root)] = fp.read()
+    return contents
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_parallel_entries_matches_serial_compile(temp_dir):
+    targets = ("-t", "minikube-mysql", "minikube-es", "removal")
+    reset_cache()
+    kapitan("compile", *targets)
+    serial_path = os.path.join(temp_dir, "serial")
+    shutil.move("compiled", serial_path)
+
+    reset_cache()
+    kapitan("compile", "--parallel-entries", *targets)
+
+    assert _read_tree("compiled") == _read_tree(serial_path)
+    assert not os.path.exists("compiled/removal/copy_target")
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+@pytest.mark.parametrize("flags", [[], ["--parallel-entries"]])
+def test_thread_executor_matches_process_pool(temp_dir, flags):
+    targets = ("-t", "minikube-mysql", "minikube-es", "minikube-nginx-kadet")
+    reset_cache()
+    kapitan("compile", *targets)
+    processes_path = os.path.join(temp_dir, "processes")
+    shutil.move("compiled", processes_path)
+
+    reset_cache()
+    kapitan("compile", "--executor", "threads", "-p", "3", *flags, *targets)
+
+    assert _read_tree("compiled") == _read_tree(processes_path)
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_compile_target_batch_resolves_targets_by_name(temp_dir):
+    args = build_parser().parse_args(["compile"])
+    compile_path = os.path.join(temp_dir, "out")
+    # a spawned worker without inventory snapshot renders the inventory itself
+    reset_cache()
+    _pool_init(
+        None,
+        None,
+        {
+            "search_paths": [os.getcwd()],
+            "compile_path": compile_path,
+            "ref_controller": None,
+            "args": args,
+        },
+    )
+    try:
+        results = _compile_target_batch(["minikube-es"])
+    finally:
+        _pool_init(None, None)
+        cached.args = args
+
+    assert [result.target_name for result in results] == ["minikube-es"]
+    assert results[0].target_full_path == "minikube-es"
+    assert os.path.isfile(os.path.join(compile_path, "minikube-es/README.md"))
+
+
+def _write_reader_target(*depends_on):
+    """A target copying the compiled output of minikube-es."""
+    with open(os.path.join("inventory", "targets", "reader.yml"), "w") as fp:
+        json.dump(
+            {
+                "parameters": {
+                    "kapitan": {
+                        "vars": {"target": "reader"},
+                        "depends_on": list(depends_on),
+                        "compile": [
+                            {
+                                "input_type": "copy",
+                                "input_paths": [
+                                    "compiled/minikube-es/manifests/es-master.yml"
+                                ],
+                                "output_path": ".",
+                            }
+                        ],
+                    }
+                }
+            },
+            fp,
+        )
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+@pytest.mark.parametrize("flags", [[], ["--parallel-entries"]])
+def test_compile_dependents_after_their_dependencies(flags):
+    _write_reader_target("minikube-es")
+    reset_cache()
+    kapitan("compile", *flags, "-t", "reader", "minikube-es", "minikube-mysql")
+
+    with open("compiled/minikube-es/manifests/es-master.yml") as fp:
+        es_master = fp.read()
+    with open("compiled/reader/es-master.yml") as fp:
+        assert fp.read() == es_master
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_compile_rejects_dependency_cycles():
+    _write_reader_target("minikube-es", "reader")
+    reset_cache()
+    with pytest.raises(SystemExit):
+        kapitan("compile", "-t", "reader", "minikube-es")
+    assert not os.path.exists("compiled/minikube-es")
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for `kapitan serve` (kapitan.server) and kapitan.client."""
+
+import os
+import stat
+import threading
+
+import pytest
+import yaml
+
+from kapitan import cached
+from kapitan.cli import build_parser
+from kapitan.client import main as client_main
+from kapitan.client import request
+from kapitan.resources import get_inventory
+from kapitan.server import CompileServer, exit_code
+from kapitan.targets import CompilePool
+
+
+ES_TARGET = os.path.join("inventory", "targets", "minikube-es.yml")
+ES_OUTPUT = os.path.join("compiled", "minikube-es", "manifests", "es-master.yml")
+
+
+@pytest.fixture
+def server(isolated_kubernetes_inventory, temp_dir, monkeypatch, request):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    parser = build_parser()
+    args = parser.parse_args(["serve", *getattr(request, "param", [])])
+    cached.args = args
+    get_inventory(args.inventory_path)
+    socket_path = os.path.join(temp_dir, "kapitan.sock")
+    with (
+        CompilePool(1, temp_dir) as compile_pool,
+        CompileServer(socket_path, parser, args, compile_pool) as compile_server,
+    ):
+        thread = threading.Thread(target=compile_server.serve_forever)
+        thread.start()
+        yield socket_path
+        compile_server.shutdown()
+        thread.join()
+    assert not os.path.exists(socket_path)
+
+
+def test_serve_socket_is_private(server):
+    assert stat.S_IMODE(os.stat(server).st_mode) == 0o600
+
+
+def test_exit_code(capsys):
+    assert exit_code(SystemExit()) == 0
+    assert exit_code(SystemExit(2)) == 2
+    assert exit_code(SystemExit("no targets")) == 1
+    assert capsys.readouterr().err == "no targets\n"
+
+
+def test_serve_compile(server):
+    response = request(server, ["compile", "-t", "minikube-es"])
+    assert response["exit_code"] == 0, response["stderr"]
+    with open(ES_OUTPUT) as fp:
+        assert "replicas: 2" in fp.read()
+
+    response = request(server, ["compile", "-t", "minikube-es"])
+    assert "All 1 targets are up to date" in response["stderr"]
+
+    with open(ES_TARGET) as fp:
+        content = fp.read()
+    with open(ES_TARGET, "w") as fp:
+        fp.write(content.replace("replicas: 2", "replicas: 3"))
+    os.utime(ES_TARGET, ns=(0, 0))
+
+    response = request(server, ["compile", "-t", "minikube-es"])
+    assert response["exit_code"] == 0, response["stderr"]
+    with open(ES_OUTPUT) as fp:
+        assert "replicas: 3" in fp.read()
+
+
+@pytest.mark.parametrize("server", [["--no-incremental"]], indirect=True)
+def test_serve_compile_not_incremental(server):
+    response = request(server, ["compile", "-t", "minikube-es"])
+    assert response["exit_code"] == 0, response["stderr"]
+    os.remove(ES_OUTPUT)
+
+    response = request(server, ["compile", "-t", "minikube-es"])
+    assert response["exit_code"] == 0, response["stderr"]
+    assert os.path.exists(ES_OUTPUT)
+
+    # the first incremental compile records the fingerprints
+    request(server, ["compile", "--incremental", "-t", "minikube-es"])
+    response = request(server, ["compile", "--incremental", "-t", "minikube-es"])
+    assert "All 1 targets are up to date" in response["stderr"]
+
+
+def test_serve_inventory(server):
+    response = request(server, ["inventory", "-t", "minikube-es"])
+    assert response["exit_code"] == 0, response["stderr"]
+    inventory = yaml.safe_load(response["stdout"])
+    assert inventory["parameters"]["elasticsearch"]["replicas"] == 2
+
+
+def test_serve_rejects_other_commands(server):
+    response = request(server, ["lint"])
+    assert response["exit_code"] == 1
+    assert "only runs compile, inventory and refs --reveal" in response["stderr"]
+
+    response = request(server, ["inventory", "--inventory-path", "elsewhere"])
+    assert response["exit_code"] == 1
+
+
+def test_client_without_server(temp_dir, capsys):
+    socket_path = os.path.join(temp_dir, "missing.sock")
+    assert client_main(["--socket", socket_path, "inventory"]) == 1
+    assert "Start one with `kapitan serve`" in capsys.readouterr().err
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.sharding and `kapitan compile --shard/--merge-shards`."""
+
+import argparse
+import json
+import os
+import shutil
+
+import pytest
+
+from kapitan.cached import reset_cache
+from kapitan.cli import main as kapitan
+from kapitan.errors import CompileError
+from kapitan.inventory.model import KapitanInventorySettings
+from kapitan.sharding import (
+    Shard,
+    merge_shards,
+    parse_shard,
+    shard_targets,
+    write_shard_manifest,
+)
+
+
+TARGETS = ("-t", "minikube-mysql", "minikube-es", "busybox")
+
+
+def _read_tree(root):
+    contents = {}
+    for dirpath, _, filenames in os.walk(root):
+        for name in filenames:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as fp:
+                contents[os.path.relpath(path, root)] = fp.read()
+    return contents
+
+
+def test_parse_shard():
+    assert parse_shard("2/4") == Shard(2, 4)
+    for value in ("0/4", "5/4", "1", "a/b", "1/0"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            parse_shard(value)
+
+
+def test_shard_targets_partition_is_stable():
+    names = [f"target-{i}" for i in range(100)]
+    shards = [shard_targets(names, Shard(index, 4)) for index in range(1, 5)]
+    assert sorted(name for shard in shards for name in shard) == sorted(names)
+    assert all(shards)
+    # adding targets doesn't move existing ones to another shard
+    assert shard_targets(names + ["new"], Shard(1, 4))[: len(shards[0])] == shards[0]
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+def test_merge_shards_matches_full_compile(temp_dir):
+    reset_cache()
+    kapitan("compile", *TARGETS)
+    full_path = os.path.join(temp_dir, "full")
+    shutil.move("compiled", full_path)
+
+    shard_paths = []
+    for index in (1, 2):
+        shard_path = os.path.join(temp_dir, f"shard{index}")
+        reset_cache()
+        kapitan(
+            "compile", *TARGETS, "--shard", f"{index}/2", "--output-path", shard_path
+        )
+        shard_paths.append(shard_path)
+
+    kapitan("compile", "--merge-shards", *shard_paths)
+    assert _read_tree("compiled") == _read_tree(full_path)
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+def test_merge_shards_requires_every_shard(temp_dir):
+    shard_path = os.path.join(temp_dir, "shard1")
+    reset_cache()
+    kapitan("compile", *TARGETS, "--shard", "1/2", "--output-path", shard_path)
+
+    with pytest.raises(CompileError, match=r"Missing output of shards \[2\]"):
+        merge_shards([shard_path], temp_dir)
+
+
+def test_merge_shards_accepts_skipped_targets(temp_dir):
+    names = [f"target-{i}" for i in range(10)]
+    shard_paths = []
+    compiled = []
+    for index in (1, 2):
+        shard = Shard(index, 2)
+        shard_path = os.path.join(temp_dir, f"shard{index}")
+        # the first target of each shard has no kapitan parameters
+        target_objs = [
+            KapitanInventorySettings(vars={"target": name}, target_full_path=name)
+            for name in shard_targets(names, shard)[1:]
+        ]
+        for target in target_objs:
+            os.makedirs(os.path.join(shard_path, "compiled", target.target_full_path))
+            compiled.append(target.target_full_path)
+        manifest_path = write_shard_manifest(
+            shard_path, shard, target_objs, names, complete=True
+        )
+        shard_paths.append(shard_path)
+
+    output_path = os.path.join(temp_dir, "merged")
+    merge_shards(shard_paths, output_path)
+    assert sorted(os.listdir(os.path.join(output_path, "compiled"))) == sorted(compiled)
+
+    # targets neither compiled nor skipped are still missing
+    with open(manifest_path) as fp:
+        manifest = json.load(fp)
+    del manifest["skipped"]
+    with open(manifest_path, "w") as fp:
+        json.dump(manifest, fp)
+    with pytest.raises(CompileError, match="don't cover the selected targets"):
+        merge_shards(shard_paths, output_path)
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.target_cache and `kapitan compile --target-cache`."""
+
+import json
+import os
+import shutil
+import stat
+
+import pytest
+
+from kapitan.cached import reset_cache
+from kapitan.cli import main as kapitan
+from kapitan.inventory.model import KapitanInventorySettings
+from kapitan.target_cache import TargetCache, tool_version, tool_versions
+
+
+ES_OUTPUT = os.path.join("compiled", "minikube-es", "manifests", "es-master.yml")
+ES_COMPONENT = os.path.join("components", "elasticsearch", "main.jsonnet")
+
+
+@pytest.fixture
+def cache_home(temp_dir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    return temp_dir
+
+
+def _write(path, content, mode=0o644):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w") as fp:
+        fp.write(content)
+    os.chmod(path, mode)
+
+
+def _read(path):
+    with open(path) as fp:
+        return fp.read()
+
+
+def test_store_and_restore_tree(temp_dir):
+    source = os.path.join(temp_dir, "source")
+    dependency = os.path.join(temp_dir, "input.jsonnet")
+    _write(dependency, "{}")
+    _write(os.path.join(source, "manifests", "a.yml"), "a: 1")
+    _write(os.path.join(source, "scripts", "run.sh"), "#!/bin/sh", mode=0o755)
+    _write(os.path.join(source, "nested", "other.yml"), "belongs to another target")
+    os.makedirs(os.path.join(source, "empty"))
+    os.symlink("manifests/a.yml", os.path.join(source, "link.yml"))
+
+    cache = TargetCache(path=os.path.join(temp_dir, "cache"))
+    key = cache.key({"inventory": "digest"}, [temp_dir], {})
+    assert cache.lookup(key) is None
+    cache.store(key, {dependency}, source, exclude={"nested"})
+
+    restored = os.path.join(temp_dir, "restored")
+    entry = cache.lookup(key)
+    assert cache.restore(entry, restored)
+    assert _read(os.path.join(restored, "manifests", "a.yml")) == "a: 1"
+    run_sh = os.stat(os.path.join(restored, "scripts", "run.sh"))
+    assert stat.S_IMODE(run_sh.st_mode) == 0o755
+    assert os.readlink(os.path.join(restored, "link.yml")) == "manifests/a.yml"
+    assert os.path.isdir(os.path.join(restored, "empty"))
+    assert not os.path.exists(os.path.join(restored, "nested"))
+
+    # a changed dependency is a miss
+    _write(dependency, "{ a: 1 }")
+    cache = TargetCache(path=os.path.join(temp_dir, "cache"))
+    assert cache.lookup(key) is None
+    # as is another key
+    assert cache.lookup(cache.key({"inventory": "other"}, [temp_dir], {})) is None
+
+
+def test_editing_restored_files_keeps_the_cache_intact(temp_dir):
+    source = os.path.join(temp_dir, "source")
+    _write(os.path.join(source, "a.yml"), "a: 1")
+    cache = TargetCache(path=os.path.join(temp_dir, "cache"))
+    key = cache.key({}, [], {})
+    cache.store(key, set(), source)
+    # e.g. sed -i or an editor rewriting the file in place
+    with open(os.path.join(source, "a.yml"), "w") as fp:
+        fp.write("a: edited at source")
+
+    restored = os.path.join(temp_dir, "restored")
+    assert cache.restore(cache.lookup(key), restored)
+    with open(os.path.join(restored, "a.yml"), "w") as fp:
+        fp.write("a: edited")
+
+    restored_again = os.path.join(temp_dir, "restored_again")
+    assert cache.restore(cache.lookup(key), restored_again)
+    assert _read(os.path.join(restored_again, "a.yml")) == "a: 1"
+
+
+def test_restore_with_missing_blob(temp_dir):
+    source = os.path.join(temp_dir, "source")
+    _write(os.path.join(source, "a.yml"), "a: 1")
+    cache = TargetCache(path=os.path.join(temp_dir, "cache"))
+    key = cache.key({}, [], {})
+    cache.store(key, set(), source)
+    shutil.rmtree(os.path.join(cache.path, "blobs"))
+
+    restored = os.path.join(temp_dir, "restored")
+    assert not cache.restore(cache.lookup(key), restored)
+    assert not os.path.exists(restored)
+
+
+def test_tool_versions(temp_dir, monkeypatch):
+    helm = os.path.join(temp_dir, "helm")
+    _write(helm, "#!/bin/sh\necho v3.0.0\n", mode=0o755)
+    monkeypatch.setenv("KAPITAN_HELM_PATH", helm)
+    target = KapitanInventorySettings(
+        vars={"target": "t"},
+        compile=[
+            {"input_type": "helm", "input_paths": ["chart"], "output_path": "."},
+            {"input_type": "jinja2", "input_paths": ["t.j2"], "output_path": "."},
+        ],
+    )
+    tool_version.cache_clear()
+    assert tool_versions(target, None) == {f"helm:{helm}": "v3.0.0"}
+
+
+def _compile_es():
+    """Compile minikube-es, return the input types it was compiled with."""
+    reset_cache()
+    kapitan("compile", "--target-cache", "-t", "minikube-es", "--report-json", "r.json")
+    with open("r.json") as fp:
+        return json.load(fp)["targets"]["minikube-es"]["input_types"]
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_compile_restores_cached_targets():
+    assert "jsonnet" in _compile_es()
+    compiled = _read(ES_OUTPUT)
+
+    shutil.rmtree("compiled")
+    assert _compile_es() == {}
+    assert _read(ES_OUTPUT) == compiled
+
+    # editing a file read while compiling is a miss
+    with open(ES_COMPONENT, "a") as fp:
+        fp.write("\n")
+    assert "jsonnet" in _compile_es()
+    assert _read(ES_OUTPUT) == compiled
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_compile_misses_on_file_matching_input_glob():
+    es_class = os.path.join("inventory", "classes", "component", "elasticsearch.yml")
+    _write(
+        es_class,
+        _read(es_class).replace(
+            "docs/elasticsearch/README.md", "docs/elasticsearch/*.md"
+        ),
+    )
+    assert "jinja2" in _compile_es()
+
+    shutil.rmtree("compiled")
+    _write(os.path.join("docs", "elasticsearch", "CHANGES.md"), "# Changes\n")
+    assert "jinja2" in _compile_es()
+    assert os.path.exists(os.path.join("compiled", "minikube-es", "CHANGES.md"))
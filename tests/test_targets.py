@@ -7,12 +7,19 @@
 
 """Tests for kapitan.targets — search_targets, load_target_inventory, compile_target."""
 
+import os
+import tempfile
 import unittest
 from unittest.mock import MagicMock
 
 from kapitan.errors import CompileError, InventoryError
+from kapitan.inventory.labels import LabelIndex
+from kapitan.inventory.model import KapitanInventorySettings
 from kapitan.targets import (
+    _compile_phases,
+    _merge_units,
     compile_target,
+    expand_target_patterns,
     load_target_inventory,
     search_targets,
 )
@@ -37,6 +44,7 @@ class MockTarget:
 class MockInventory:
     def __init__(self, targets):
         self.targets = targets
+        self.label_index = LabelIndex(targets)
 
     def get_targets(self, requested_targets):
         return {
@@ -114,6 +122,55 @@ class SearchTargetsTest(unittest.TestCase):
         result = search_targets(inv, ["t1"], [])
         self.assertEqual(result, ["t1"])
 
+    def test_set_based_selectors(self):
+        inv = MockInventory(
+            {
+                "t1": MockTarget("t1", labels={"env": "prod", "tier": "web"}),
+                "t2": MockTarget("t2", labels={"env": "stage", "tier": "db"}),
+                "t3": MockTarget("t3", labels={"env": "dev", "canary": "true"}),
+                "t4": MockTarget("t4", labels={"env": "prod", "tier": "db"}),
+            }
+        )
+        self.assertEqual(
+            search_targets(inv, None, ["env in (prod, stage)"]), ["t1", "t2", "t4"]
+        )
+        self.assertEqual(search_targets(inv, None, ["env notin (prod)"]), ["t2", "t3"])
+        # != also matches targets without the label
+        self.assertEqual(search_targets(inv, None, ["tier!=db"]), ["t1", "t3"])
+        self.assertEqual(
+            search_targets(inv, None, ["!canary", "env==prod"]), ["t1", "t4"]
+        )
+        self.assertEqual(
+            search_targets(inv, None, ["env in (prod,stage),tier=db"]), ["t2", "t4"]
+        )
+
+    def test_labels_restricted_to_targets(self):
+        inv = MockInventory(
+            {
+                "t1": MockTarget("t1", labels={"env": "prod"}),
+                "t2": MockTarget("t2", labels={"env": "prod"}),
+            }
+        )
+        self.assertEqual(search_targets(inv, ["t2"], ["env=prod"]), ["t2"])
+
+    def test_invalid_selector_raises_compile_error(self):
+        inv = MockInventory({"t1": MockTarget("t1")})
+        for selector in ("env in prod", "env=(prod)", "=prod", "!"):
+            with self.assertRaises(CompileError, msg=selector):
+                search_targets(inv, None, [selector])
+
+
+class ExpandTargetPatternsTest(unittest.TestCase):
+    def test_expand_target_patterns(self):
+        names = ["prod-web", "prod-db", "dev-web"]
+        self.assertEqual(
+            expand_target_patterns(["*-web", "prod-*", "other"], names),
+            ["prod-web", "dev-web", "prod-db", "other"],
+        )
+        self.assertEqual(expand_target_patterns([], names), [])
+        with self.assertRaises(CompileError):
+            expand_target_patterns(["stage-*"], names)
+
 
 class LoadTargetInventoryTest(unittest.TestCase):
     def test_load_all_targets(self):
@@ -234,3 +291,53 @@ class CompileTargetTest(unittest.TestCase):
 
         with self.assertRaises(CompileError):
             compile_target(target_config, [], "/tmp", None, args)
+
+
+class CompilePhasesTest(unittest.TestCase):
+    def _target(self, *input_types, input_paths=()):
+        return KapitanInventorySettings(
+            compile=[
+                {
+                    "input_type": input_type,
+                    "input_paths": list(input_paths),
+                    "output_path": ".",
+                }
+                for input_type in input_types
+            ]
+        )
+
+    def test_independent_entries_share_a_phase(self):
+        target = self._target("jsonnet", "jinja2", "kadet")
+        self.assertEqual(_compile_phases(target), [[0, 1, 2]])
+
+    def test_remove_and_copy_are_barriers(self):
+        target = self._target("jsonnet", "jinja2", "remove", "copy", "jsonnet", "kadet")
+        self.assertEqual(_compile_phases(target), [[0, 1], [2], [3], [4, 5]])
+
+    def test_external_is_a_barrier(self):
+        target = self._target("jsonnet", "external", "jinja2")
+        self.assertEqual(_compile_phases(target), [[0], [1], [2]])
+
+    def test_entries_reading_compiled_output_are_barriers(self):
+        target = self._target("jsonnet", "jinja2")
+        target.compile[1].input_paths = ["compiled/other/manifests"]
+        self.assertEqual(_compile_phases(target), [[0], [1]])
+
+    def test_no_entries(self):
+        self.assertEqual(_compile_phases(self._target()), [])
+
+
+class MergeUnitsTest(unittest.TestCase):
+    def test_entries_writing_the_same_file_fail(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            unit_paths = {}
+            for index in (0, 1):
+                unit_paths[index] = os.path.join(temp_dir, "units", str(index))
+                os.makedirs(unit_paths[index])
+                with open(os.path.join(unit_paths[index], "a.yml"), "w") as fp:
+                    fp.write(f"entry: {index}\n")
+            compile_path = os.path.join(temp_dir, "compiled")
+            with self.assertRaisesRegex(
+                CompileError, "entries 0 and 1 .* both write a.yml"
+            ):
+                _merge_units("t1", [0, 1], unit_paths, compile_path)
@@ -0,0 +1,164 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.tool_runner — bounded execution of external tools."""
+
+import io
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+import time
+from argparse import Namespace
+
+import pytest
+import yaml
+
+from kapitan.errors import KustomizeTemplateError
+from kapitan.inputs.kustomize import Kustomize
+from kapitan.inventory.model.input_types import KapitanInputTypeKustomizeConfig
+from kapitan.tool_runner import (
+    new_tool_slots,
+    run_tool,
+    set_tool_slots,
+    stream_tool,
+)
+
+
+@pytest.fixture
+def tool_slots():
+    slots = threading.BoundedSemaphore(2)
+    set_tool_slots(slots)
+    yield slots
+    set_tool_slots(None)
+
+
+def _write_script(path, content):
+    with open(path, "w") as fp:
+        fp.write(f"#!/bin/sh\n{content}\n")
+    os.chmod(path, 0o755)
+    return path
+
+
+def test_run_tool_output(temp_dir):
+    result = run_tool(["sh", "-c", "echo out; echo err >&2; exit 3"])
+    assert (result.returncode, result.stdout, result.stderr) == (3, b"out\n", b"err\n")
+
+    stdout = io.BytesIO()
+    assert run_tool(["echo", "chunked"], stdout=stdout).stdout is None
+    assert stdout.getvalue() == b"chunked\n"
+
+    with open(os.path.join(temp_dir, "out.txt"), "w+") as fp:
+        run_tool(["echo", "to file"], stdout=fp)
+        fp.seek(0)
+        assert fp.read() == "to file\n"
+
+    result = run_tool("echo $GREETING", shell=True, env={"GREETING": "hello"})
+    assert result.stdout == b"hello\n"
+
+
+def test_run_tool_errors():
+    with pytest.raises(FileNotFoundError):
+        run_tool(["kapitan-missing-tool"])
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_tool(["sleep", "5"], timeout=0.2)
+
+
+def test_run_tool_bounds_running_tools(tool_slots):
+    start = time.time()
+    threads = [
+        threading.Thread(target=run_tool, args=(["sleep", "0.3"],)) for _ in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # two slots: two rounds of two tools
+    assert time.time() - start >= 0.6
+    # every slot was released
+    assert tool_slots.acquire(False)
+    assert tool_slots.acquire(False)
+
+
+def test_stream_tool_reads_output_while_running(tool_slots):
+    script = "echo first; exec sleep 5"
+    with stream_tool(["sh", "-c", script], timeout=10) as tool:
+        # the first line is readable before the tool exits
+        assert tool.stdout.readline() == b"first\n"
+        with pytest.raises(ValueError, match="stop"):
+            with stream_tool(["sleep", "5"]):
+                raise ValueError("stop")
+        tool.kill()
+    # the tools were killed, their slots released
+    assert tool_slots.acquire(False)
+    assert tool_slots.acquire(False)
+
+
+def test_new_tool_slots():
+    slots = new_tool_slots(Namespace(max_tool_processes=1))
+    assert slots.acquire(False)
+    assert not slots.acquire(False)
+
+
+def _acquire_and_exit(slots):
+    slots.acquire()
+    os._exit(1)
+
+
+def test_tool_slots_of_dead_processes_are_reclaimed():
+    slots = new_tool_slots(Namespace(max_tool_processes=1))
+    process = multiprocessing.Process(target=_acquire_and_exit, args=(slots,))
+    process.start()
+    process.join()
+    # the slot of the process that exited without releasing it
+    assert slots.acquire(False)
+    assert not slots.acquire(False)
+    slots.release()
+    with pytest.raises(ValueError, match="holds no tool slot"):
+        slots.release()
+
+
+def test_kustomize_splits_streamed_output(temp_dir):
+    documents = [
+        {"kind": "Service", "metadata": {"name": "web"}},
+        {"kind": "Deployment", "metadata": {"name": "web"}},
+    ]
+    rendered = os.path.join(temp_dir, "rendered.yaml")
+    with open(rendered, "w") as fp:
+        yaml.safe_dump_all(documents, fp)
+    kustomize_path = _write_script(
+        os.path.join(temp_dir, "kustomize"), f"cat {rendered}"
+    )
+    overlay = os.path.join(temp_dir, "overlay")
+    os.makedirs(overlay)
+    compile_path = os.path.join(temp_dir, "compiled")
+    os.makedirs(compile_path)
+
+    kustomize = Kustomize(
+        compile_path, [], None, "t", Namespace(kustomize_path=kustomize_path)
+    )
+    config = KapitanInputTypeKustomizeConfig(input_paths=[overlay], output_path=".")
+    kustomize.compile_file(config, overlay, compile_path)
+    assert sorted(os.listdir(compile_path)) == [
+        "web-deployment.yaml",
+        "web-service.yaml",
+    ]
+
+    _write_script(kustomize_path, "echo broken >&2; exit 1")
+    with pytest.raises(KustomizeTemplateError, match="broken"):
+        kustomize.compile_file(config, overlay, compile_path)
+
+    # a build failing halfway writes nothing and reports its stderr
+    shutil.rmtree(compile_path)
+    os.makedirs(compile_path)
+    _write_script(
+        kustomize_path,
+        f"cat {rendered}; printf -- '---\\nkind: [' ; echo halfway >&2; exit 1",
+    )
+    with pytest.raises(KustomizeTemplateError, match="halfway"):
+        kustomize.compile_file(config, overlay, compile_path)
+    assert os.listdir(compile_path) == []
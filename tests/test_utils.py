@@ -21,6 +21,7 @@ from kapitan.utils import (
     SafeCopyError,
     YamlLoader,
     available_cpu_count,
+    available_memory,
     compare_versions,
     copy_tree,
     deep_get,
@@ -366,6 +367,51 @@ class AvailableCpuCountTest(unittest.TestCase):
             self.assertEqual(available_cpu_count(), 1)
 
 
+class AvailableMemoryTest(unittest.TestCase):
+    """Test available_memory honours cgroup memory limits."""
+
+    GIB = 2**30
+
+    def _available_memory(self, cgroup_files):
+        with (
+            patch("kapitan.utils._physical_memory", return_value=16 * self.GIB),
+            patch(
+                "kapitan.utils.os.path.exists",
+                side_effect=lambda path: path in cgroup_files,
+            ),
+            patch(
+                "kapitan.utils._read_cpu_file",
+                side_effect=lambda path: cgroup_files[path],
+            ),
+        ):
+            return available_memory()
+
+    def test_uses_cgroup_v2_limit(self):
+        cgroup_files = {"/sys/fs/cgroup/memory.max": str(8 * self.GIB)}
+        self.assertEqual(self._available_memory(cgroup_files), 8 * self.GIB)
+
+    def test_uses_cgroup_v1_limit(self):
+        cgroup_files = {
+            "/sys/fs/cgroup/memory/memory.limit_in_bytes": str(4 * self.GIB)
+        }
+        self.assertEqual(self._available_memory(cgroup_files), 4 * self.GIB)
+
+    def test_unlimited_cgroup_uses_physical_memory(self):
+        for cgroup_files in (
+            {},
+            {"/sys/fs/cgroup/memory.max": "max"},
+            {"/sys/fs/cgroup/memory/memory.limit_in_bytes": "9223372036854771712"},
+        ):
+            self.assertEqual(self._available_memory(cgroup_files), 16 * self.GIB)
+
+    def test_unknown_memory(self):
+        with (
+            patch("kapitan.utils._physical_memory", return_value=None),
+            patch("kapitan.utils.os.path.exists", return_value=False),
+        ):
+            self.assertIsNone(available_memory())
+
+
 class RenderJinja2TemplateTest(unittest.TestCase):
     """Test render_jinja2_template renders content with context.
 
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+# SPDX-FileCopyrightText: 2026 The Kapitan Authors <kapitan-admins@googlegroups.com>
+#
+# SPDX-License-Identifier: Apache-2.0
+
+"""Tests for kapitan.watch and `kapitan compile --watch`."""
+
+import logging
+import os
+
+import pytest
+
+from kapitan import cached
+from kapitan.cli import build_parser
+from kapitan.refs.base import RefController
+from kapitan.resources import get_inventory
+from kapitan.targets import CompilePool
+from kapitan.watch import CompileWatch, PollingWatcher
+
+
+ES_TARGET = os.path.join("inventory", "targets", "minikube-es.yml")
+ES_OUTPUT = os.path.join("compiled", "minikube-es", "manifests", "es-master.yml")
+
+
+@pytest.fixture
+def cache_home(temp_dir, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", os.path.join(temp_dir, "xdg"))
+    return temp_dir
+
+
+def _write(path, content):
+    with open(path, "w") as fp:
+        fp.write(content)
+
+
+def test_polling_watcher_detects_changes(temp_dir):
+    watched = os.path.join(temp_dir, "watched")
+    os.makedirs(os.path.join(watched, ".git"))
+    _write(os.path.join(watched, "a.yml"), "a: 1")
+    extra = os.path.join(temp_dir, "extra.jsonnet")
+    _write(extra, "{}")
+
+    watcher = PollingWatcher([watched])
+    watcher.add_files([extra])
+    assert watcher.poll() == set()
+
+    _write(os.path.join(watched, "a.yml"), "a: 22")
+    _write(os.path.join(watched, "b.yml"), "b: 1")
+    _write(os.path.join(watched, ".git", "index"), "ignored")
+    os.remove(extra)
+    assert watcher.poll() == {
+        os.path.join(watched, "a.yml"),
+        os.path.join(watched, "b.yml"),
+        extra,
+    }
+    assert watcher.poll() == set()
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory")
+def test_targets_affected_by():
+    get_inventory("inventory")
+    inventory = cached.inv
+
+    assert inventory.targets_affected_by([ES_TARGET]) == {"minikube-es"}
+    mysql_class = os.path.join("inventory", "classes", "component", "mysql.yml")
+    assert inventory.targets_affected_by([mysql_class]) == {"minikube-mysql"}
+
+    new_target = os.path.join("inventory", "targets", "new.yml")
+    _write(new_target, "parameters: {}")
+    assert inventory.targets_affected_by([new_target]) is None
+    assert inventory.targets_affected_by(["README.md"]) is None
+
+
+@pytest.mark.usefixtures("isolated_kubernetes_inventory", "cache_home")
+def test_watch_recompiles_changed_target(temp_dir, caplog):
+    args = build_parser().parse_args(
+        ["compile", "-t", "minikube-mysql", "minikube-es", "--watch"]
+    )
+    cached.args = args
+    search_paths = [os.path.abspath(path) for path in args.search_paths]
+    watch = CompileWatch(
+        args.inventory_path, search_paths, RefController(args.refs_path), args
+    )
+
+    with CompilePool(1, temp_dir) as compile_pool:
+        assert watch.compile(compile_pool)
+        with open(ES_OUTPUT) as fp:
+            assert "replicas: 2" in fp.read()
+
+        with open(ES_TARGET) as fp:
+            content = fp.read()
+        _write(ES_TARGET, content.replace("replicas: 2", "replicas: 3"))
+        # same size, make sure the modification time tells the change apart
+        os.utime(ES_TARGET, ns=(0, 0))
+        changed = watch.watcher.poll()
+        assert changed == {
+            os.path.join(args.inventory_path, "targets", "minikube-es.yml")
+        }
+
+        caplog.clear()
+        with caplog.at_level(logging.INFO):
+            watch.apply(changed, compile_pool)
+            assert watch.compile(compile_pool)
+
+    assert "rendering 1 targets" in caplog.text
+    assert "Incremental compile: 1/2 targets changed" in caplog.text
+    with open(ES_OUTPUT) as fp:
+        assert "replicas: 3" in fp.read()